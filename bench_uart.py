@@ -0,0 +1,176 @@
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+import serial
+
+from kinematics import DifferentialDriveRobot
+from serial_hub import SerialHub
+from simulation import SimulationRunner
+from uart_ingest import StreamParser, UartIngestor, QueueInput, encode_frame, encode_csv
+from virtual_serial import VirtualRobotDevice, sequence_source
+
+
+def bench_parse(fmt, n=20000):
+    # Chi phí tách mẫu thuần (không I/O), µs/mẫu
+    encode = encode_frame if fmt == "binary" else encode_csv
+    data = b"".join(encode(float(i), -float(i)) for i in range(n))
+    parser = StreamParser()
+    t0 = time.perf_counter()
+    for i in range(0, len(data), 4096):
+        parser.feed(data[i:i + 4096])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+# Thiết bị đã gửi xong và không còn byte nào tới trong IDLE_S giây -> kết thúc đo.
+# Có nhiễu (partial / garbage / burst) thì một số mẫu mất hẳn, không chờ đủ số đã gửi.
+IDLE_S = 0.25
+
+
+def _link_idle(devices, ingestors, t0):
+    if not all(d.done for d in devices):
+        return False
+    last = max((ing.last_recv for ing in ingestors if ing.last_recv is not None), default=t0)
+    return time.perf_counter() - last >= IDLE_S
+
+
+def _rate(ingestors, t0):
+    # Mẫu/s tính tới mẫu cuối cùng nhận được, không tính thời gian chờ lúc kết thúc
+    samples = sum(ing.samples for ing in ingestors)
+    last = max((ing.last_recv for ing in ingestors if ing.last_recv is not None), default=None)
+    return samples / (last - t0) if last is not None and last > t0 else 0.0
+
+
+def bench_link(args):
+    # Đầu cuối: thiết bị ảo -> pty -> UartIngestor -> QueueInput -> DifferentialDriveRobot.update
+    n = int(args.rate * args.seconds)
+    device = VirtualRobotDevice(sequence_source, rate=args.rate, baud=args.baud, fmt=args.format,
+                                count=n, partial=args.partial, garbage=args.garbage, burst=args.burst)
+    ser = serial.Serial(device.port, args.baud, timeout=0.05)
+    ingestor = UartIngestor(ser)
+
+    runner = SimulationRunner(DifferentialDriveRobot(), dt=args.dt)
+    runner.input_source = QueueInput(ingestor.queue, runner)
+    latencies = []
+    last = [-1]
+
+    def on_step(rn):
+        # Mẫu mới được robot dùng lần đầu -> độ trễ = lúc dùng - lúc ghi
+        seq = int(rn.wl)
+        if seq != last[0] and 0 <= seq < len(device.sent_at):
+            latencies.append(time.perf_counter() - device.sent_at[seq])
+            last[0] = seq
+
+    runner.on_step = on_step
+
+    ingestor.start()
+    device.start()
+    runner.sync_wall()
+    t0 = time.perf_counter()
+    deadline = t0 + args.seconds + 2.0
+    while time.perf_counter() < deadline:
+        runner.advance_realtime()
+        if not ingestor.queue and _link_idle([device], [ingestor], t0):
+            break
+        time.sleep(args.frame_ms / 1000)
+
+    ingestor.stop()
+    ser.close()
+    device.close()
+
+    lat = np.array(latencies) * 1e3 if latencies else np.array([np.nan])
+    return {
+        "sent": device.sent,
+        "received": ingestor.samples,
+        "consumed": runner.input_source.consumed,
+        "samples_per_s": _rate([ingestor], t0),
+        "loss": 1 - ingestor.samples / max(device.sent, 1),
+        "parse_errors": ingestor.parse_errors,
+        "dropped": ingestor.dropped,
+        "bytes": ingestor.bytes_read,
+        "latency_ms_p50": float(np.percentile(lat, 50)),
+        "latency_ms_p99": float(np.percentile(lat, 99)),
+        "latency_ms_max": float(np.max(lat)),
+    }
+
+
+def bench_hub(args):
+    # Nhiều cổng cùng lúc qua SerialHub (1 luồng asyncio cho mọi cổng)
+    n = int(args.rate * args.seconds)
+    devices = [VirtualRobotDevice(sequence_source, rate=args.rate, baud=args.baud, fmt=args.format,
+                                  count=n, partial=args.partial, garbage=args.garbage,
+                                  burst=args.burst, seed=i) for i in range(args.hub)]
+    threads_before = threading.active_count()
+    hub = SerialHub(dt=args.dt)
+    for d in devices:
+        hub.add_port(d.port, args.baud)
+    hub.start()
+    hub_threads = threading.active_count() - threads_before
+    # Chờ mọi cổng mở xong (pyserial xoá buffer vào khi mở)
+    while not all(rb.connected for rb in hub.robots.values()):
+        time.sleep(0.01)
+    for d in devices:
+        d.start()
+
+    t0 = time.perf_counter()
+    deadline = t0 + args.seconds + 2.0
+    ingestors = [rb.ingestor for rb in hub.robots.values()]
+    while time.perf_counter() < deadline:
+        if _link_idle(devices, ingestors, t0):
+            break
+        time.sleep(0.05)
+    rate = _rate(ingestors, t0)
+    stats = hub.stats()
+    hub.stop()
+    for d in devices:
+        d.close()
+
+    received = sum(st["samples"] for st in stats.values())
+    sent = sum(d.sent for d in devices)
+    return {
+        "ports": args.hub,
+        "hub_threads": hub_threads,
+        "sent": sent,
+        "received": received,
+        "samples_per_s": rate,
+        "loss": 1 - received / max(sent, 1),
+        "parse_errors": sum(st["parse_errors"] for st in stats.values()),
+        "min_port_samples": min(st["samples"] for st in stats.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark đường UART bằng thiết bị serial ảo (pty)")
+    parser.add_argument("--rate", type=float, default=1000, help="Mẫu/s thiết bị gửi")
+    parser.add_argument("--baud", type=int, default=921600)
+    parser.add_argument("--format", choices=["binary", "csv"], default="binary")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--dt", type=float, default=0.005, help="Bước vật lý (s)")
+    parser.add_argument("--frame-ms", type=float, default=20, help="Chu kỳ vòng GUI giả lập")
+    parser.add_argument("--partial", type=float, default=0.0)
+    parser.add_argument("--garbage", type=float, default=0.0)
+    parser.add_argument("--burst", type=float, default=0.0)
+    parser.add_argument("--hub", type=int, default=0,
+                        help="Số cổng ảo đọc đồng thời qua SerialHub (0 = 1 cổng qua UartIngestor)")
+    parser.add_argument("--json", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--min-rate", type=float, default=0.0,
+                        help="Thoát mã 1 nếu samples_per_s thấp hơn ngưỡng (dùng cho CI)")
+    args = parser.parse_args()
+
+    result = {"config": vars(args), "parse_us_per_sample": bench_parse(args.format)}
+    result.update(bench_hub(args) if args.hub else bench_link(args))
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text)
+    if result["samples_per_s"] < args.min_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
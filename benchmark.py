@@ -0,0 +1,239 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # Chạy không cần màn hình
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+
+from kinematics import DifferentialDriveRobot, RobotFleet
+from live_plot import LivePlot
+from path_lod import PathLOD
+from robot_draw import draw_robot, RobotRenderer
+from frame_tick import frame_tick, SIM_DT
+from path_follow import ReferencePath, PurePursuit, PathFollowInput
+from profiler import FrameProfiler
+from simulation import SimulationRunner, SimulationWorker
+from telemetry import TelemetryStore
+from world import OccupancyGrid, RangeSensor
+
+PATH_LENGTHS = [0, 200, 2000, 20000]
+HISTORY_LENGTHS = [200, 10000, 100000]
+
+
+def measure(fn, repeat, warmup=3):
+    # Đo từng lần gọi, trả về thống kê (µs)
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    samples *= 1e6
+    return {
+        "n": repeat,
+        "mean_us": float(samples.mean()),
+        "p50_us": float(np.percentile(samples, 50)),
+        "p99_us": float(np.percentile(samples, 99)),
+        "min_us": float(samples.min()),
+    }
+
+
+def robot_figure():
+    # Giống figure bên trái của RobotGUI
+    fig = Figure(figsize=(4, 4), dpi=100, facecolor='white')
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(left=0.18, bottom=0.15)
+    return fig, fig.add_subplot(111)
+
+
+def plot_figure():
+    # Giống figure bên phải của RobotGUI
+    fig = Figure(figsize=(4.5, 8), dpi=100, facecolor='white')
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(hspace=0.6, left=0.1, right=0.95, top=0.96, bottom=0.05)
+    return fig
+
+
+def sample_path(n):
+    t = np.linspace(0, 20, n)
+    return np.cos(t) * t * 0.1, np.sin(t) * t * 0.1
+
+
+def filled_telemetry(n, dt=0.01):
+    tel = TelemetryStore()
+    sim = SimulationRunner(DifferentialDriveRobot(), dt=dt)
+    sim.set_input(5.0, 6.0)
+    for _ in range(n):
+        s = sim.step()
+        tel.append(T=s.t, X=s.x, Y=s.y, V=s.v, W=s.w, Theta=s.theta, WL=s.wl, WR=s.wr)
+    return tel, sim
+
+
+def bench_physics(results, repeat):
+    robot = DifferentialDriveRobot()
+    results["robot_update"] = measure(lambda: robot.update(5.0, 6.0, 0.01), repeat * 10)
+
+    for n in (100, 1000, 10000):
+        fleet = RobotFleet(n)
+        stats = measure(lambda: fleet.update(5.0, 6.0, 0.01), repeat)
+        stats["per_robot_us"] = stats["mean_us"] / n
+        results[f"fleet_update[{n}]"] = stats
+
+
+def bench_robot_view(results, repeat):
+    D, r = 0.25, 0.12
+    for n in PATH_LENGTHS:
+        px, py = sample_path(n)
+        fig, ax = robot_figure()
+
+        def full_redraw():
+            draw_robot(ax, px[-1] if n else 0, py[-1] if n else 0, 0.3, D, r, px, py)
+            fig.canvas.draw()
+        results[f"draw_robot[path={n}]"] = measure(full_redraw, max(repeat // 5, 5))
+
+        fig, ax = robot_figure()
+        renderer = RobotRenderer(ax)
+        state = {"i": 0}
+
+        def blit_update():
+            # Robot di chuyển chậm quanh gốc: phần lớn khung hình là blit
+            state["i"] += 1
+            th = state["i"] * 0.01
+            renderer.update(0.05 * np.cos(th), 0.05 * np.sin(th), th, D, r, px, py)
+        results[f"robot_renderer[path={n}]"] = measure(blit_update, repeat)
+
+        # Toàn bộ quỹ đạo qua PathLOD (lọc theo khung nhìn + giảm chi tiết)
+        lod = PathLOD()
+        for x, y in zip(px, py):
+            lod.append(x, y)
+        fig, ax = robot_figure()
+        renderer = RobotRenderer(ax, path_lod=lod)
+
+        def lod_update():
+            state["i"] += 1
+            th = state["i"] * 0.01
+            renderer.update(0.05 * np.cos(th), 0.05 * np.sin(th), th, D, r)
+        results[f"robot_renderer_lod[path={n}]"] = measure(lod_update, repeat)
+
+
+def bench_graphs(results, repeat):
+    for n in HISTORY_LENGTHS:
+        tel, sim = filled_telemetry(n)
+        fig = plot_figure()
+        plotter = LivePlot(fig)
+
+        def tick():
+            s = sim.step()
+            tel.append(T=s.t, X=s.x, Y=s.y, V=s.v, W=s.w, Theta=s.theta, WL=s.wl, WR=s.wr)
+            plotter.update(tel)
+        plotter.full_redraws = 0
+        stats = measure(tick, repeat)
+        stats["full_redraws"] = plotter.full_redraws
+        results[f"update_graphs[history={n}]"] = stats
+
+
+def demo_world():
+    # Phòng 10 x 10 m có tường bao và vài khối vật cản, robot ở giữa
+    occ = np.zeros((200, 200), dtype=bool)
+    occ[[0, -1], :] = occ[:, [0, -1]] = True
+    occ[40:60, 30:50] = occ[140:170, 120:130] = occ[90:100, 150:190] = True
+    return OccupancyGrid(occ, resolution=0.05, origin=(-5.0, -5.0))
+
+
+def bench_loop_tick(results, repeat):
+    # Đúng thân khung hình của RobotGUI.loop (frame_tick), chỉ bỏ nhãn Tk:
+    # luồng vật lý thật + telemetry + PathLOD + lidar + 2 figure
+    for name, follow in (("loop_tick", False), ("loop_tick[world+path]", True)):
+        sim = SimulationRunner(DifferentialDriveRobot(), dt=SIM_DT)
+        worker = SimulationWorker(sim)
+        tel = TelemetryStore()
+        lod = PathLOD()
+        _, ax = robot_figure()
+        renderer = RobotRenderer(ax, path_lod=lod)
+        plotter = LivePlot(plot_figure())
+        world = lidar = follower = None
+        if follow:
+            world, lidar = demo_world(), RangeSensor()
+            t = np.linspace(0, 2 * np.pi, 400)
+            ctl = PurePursuit(ReferencePath(2 * np.cos(t), 2 * np.sin(t)), sim.robot.r, sim.robot.D)
+            follower = sim.input_source = PathFollowInput(ctl, sim)
+        else:
+            sim.set_input(5.0, 6.0)
+        prof = FrameProfiler()
+        worker.start()
+        try:
+            results[name] = measure(
+                lambda: frame_tick(worker, tel, lod, renderer, sim.robot.params(), prof,
+                                   lambda: plotter.update(tel), follower, world, lidar),
+                repeat)
+        finally:
+            worker.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        base = json.load(f)["results"]
+    print(f"\n{'benchmark':40s} {'trước (µs)':>12s} {'sau (µs)':>12s} {'tỉ lệ':>8s}")
+    for name, stats in current.items():
+        if name in base:
+            old, new = base[name]["p50_us"], stats["p50_us"]
+            print(f"{name:40s} {old:12.1f} {new:12.1f} {new / old:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vật lý và vẽ (backend Agg, không cần màn hình)")
+    parser.add_argument("--repeat", type=int, default=200, help="Số lần đo mỗi mục")
+    parser.add_argument("--only", nargs="*", choices=["physics", "robot_view", "graphs", "loop"],
+                        help="Chỉ chạy một số nhóm")
+    parser.add_argument("--json", default="bench_output.json", help="File kết quả")
+    parser.add_argument("--compare", help="So sánh p50 với một file JSON cũ")
+    args = parser.parse_args()
+
+    groups = {
+        "physics": bench_physics,
+        "robot_view": bench_robot_view,
+        "graphs": bench_graphs,
+        "loop": bench_loop_tick,
+    }
+    results = {}
+    for name in args.only or groups:
+        groups[name](results, args.repeat)
+
+    for name, stats in results.items():
+        print(f"{name:40s} p50 {stats['p50_us']:10.1f} µs   p99 {stats['p99_us']:10.1f} µs")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "machine": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import numpy as np
+
+# Thời gian dùng chung cho GUI và benchmark
+SIM_DT = 0.005    # Bước vật lý cố định (200 Hz), chạy trên luồng riêng, độc lập với tốc độ vẽ
+FRAME_MS = 20     # Chu kỳ vẽ GUI (after)
+
+
+def frame_tick(worker, telemetry, path_lod, view, params, profiler, graphs,
+               follower=None, world=None, lidar=None, labels=None, counter=0):
+    """Thân một khung hình của RobotGUI.loop, không phụ thuộc Tk.
+
+    GUI và benchmark.py cùng gọi hàm này nên số đo luôn khớp với vòng lặp thật.
+    snapshot mới nhất -> telemetry + PathLOD -> lidar (nếu có world) -> vẽ robot
+    -> labels(snap) (nhãn Tk, có thể None) -> graphs(). Trả về snapshot.
+    """
+    profiler.begin_frame()
+
+    # Vật lý chạy trên luồng riêng với bước cố định,
+    # khung hình chỉ lấy snapshot mới nhất ở tốc độ của nó
+    snap = worker.latest()
+    x, y, theta = snap.x, snap.y, snap.theta
+    profiler.mark("physics")
+
+    cte = follower.controller.cte if follower is not None else np.nan
+    telemetry.append(T=snap.t, X=x, Y=y, V=snap.v, W=snap.w, Theta=theta,
+                     WL=snap.wl, WR=snap.wr, CTE=cte)
+    path_lod.append(x, y)
+    profiler.mark("telemetry")
+
+    # Quét theo thời gian mô phỏng (lidar.rate Hz), không theo tốc độ khung hình;
+    # điểm quét giữ toạ độ toàn cục nên vẫn đúng khi robot đi tiếp giữa 2 lần quét
+    if world is not None and lidar is not None and lidar.should_scan(snap.t):
+        lidar.scan(world, x, y, theta, snap.t)
+        view.set_scan(*lidar.points(x, y, theta))
+    profiler.mark("lidar")
+
+    # Quỹ đạo vẽ qua PathLOD: chỉ phần trong khung nhìn, đã giảm chi tiết theo pixel
+    D, r = params
+    view.update(x, y, theta, D, r)
+    profiler.mark("draw_robot")
+
+    if labels is not None:
+        labels(snap)
+    profiler.mark("labels")
+
+    # Đồ thị dùng blitting nên đủ nhẹ để cập nhật mỗi khung hình
+    graphs()
+    profiler.mark("update_graphs")
+    profiler.end_frame(snap.t, counter)
+    return snap
@@ -1,65 +1,275 @@
-import numpy as np
-
-class DifferentialDriveRobot:
-    def __init__(self, wheel_radius=0.12, wheel_distance=0.25, mass=1.2):
-        self.r = wheel_radius
-        self.D = wheel_distance
-        self.M = mass 
-
-        self.x = 0.0
-        self.y = 0.0
-        self.theta = 0.0
-
-        # Lưu vận tốc HIỆN TẠI (Thực tế)
-        self.v = 0.0 
-        self.w = 0.0
-
-        # GIẢ ĐỊNH ĐỘNG CƠ:
-        # Lực đẩy tối đa của động cơ (Newton)
-        self.MAX_FORCE = 5.0 
-        # Mô-men xoắn xoay thân xe tối đa (N.m)
-        self.MAX_TORQUE = 1.0 
-
-    def update(self, wl, wr, dt):
-        # 1. Tính vận tốc ĐÍCH (Target) mong muốn dựa trên input
-        v_target = (self.r / 2) * (wr + wl)
-        w_target = (self.r / self.D) * (wr - wl)
-
-        # 2. Tính gia tốc tối đa cho phép dựa trên Khối lượng M
-        # a = F / m
-        # M càng lớn -> acc_linear càng nhỏ -> Tăng tốc càng chậm
-        acc_linear_max = self.MAX_FORCE / self.M
-        
-        # Gia tốc góc: alpha = Torque / I (Mô-men quán tính)
-        # Mô-men quán tính của hình hộp vuông cạnh D (Square Prism)
-        # J = 1/6 * M * D^2
-        I_robot = (1/6) * self.M * (self.D**2)
-        acc_angular_max = self.MAX_TORQUE / I_robot
-
-        # 3. Cập nhật Vận tốc dài (v) tiến dần tới v_target
-        # Nếu đang chậm hơn đích -> Tăng tốc
-        if self.v < v_target:
-            self.v += acc_linear_max * dt
-            if self.v > v_target: self.v = v_target # Không vượt quá
-        # Nếu đang nhanh hơn đích -> Giảm tốc
-        elif self.v > v_target:
-            self.v -= acc_linear_max * dt
-            if self.v < v_target: self.v = v_target
-
-        # 4. Cập nhật Vận tốc góc (w) tương tự
-        if self.w < w_target:
-            self.w += acc_angular_max * dt
-            if self.w > w_target: self.w = w_target
-        elif self.w > w_target:
-            self.w -= acc_angular_max * dt
-            if self.w < w_target: self.w = w_target
-
-        # 5. Cập nhật vị trí (Kinematics) dùng vận tốc ĐÃ CÓ QUÁN TÍNH
-        self.x += self.v * np.cos(self.theta) * dt
-        self.y += self.v * np.sin(self.theta) * dt
-        self.theta += self.w * dt
-
-        return self.x, self.y, self.theta
-
-    def params(self):
-        return self.D, self.r
\ No newline at end of file
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Quỹ đạo dự đoán: mỗi trường là mảng (T,) hoặc (K, T), trạng thái SAU mỗi bước
+Trajectory = namedtuple("Trajectory", ["x", "y", "theta", "v", "w"])
+
+class DifferentialDriveRobot:
+    def __init__(self, wheel_radius=0.12, wheel_distance=0.25, mass=1.2, integrator="euler"):
+        self.r = wheel_radius
+        self.D = wheel_distance
+        self.M = mass 
+
+        self.x = 0.0
+        self.y = 0.0
+        self.theta = 0.0
+
+        # Lưu vận tốc HIỆN TẠI (Thực tế)
+        self.v = 0.0 
+        self.w = 0.0
+
+        # GIẢ ĐỊNH ĐỘNG CƠ:
+        # Lực đẩy tối đa của động cơ (Newton)
+        self.MAX_FORCE = 5.0 
+        # Mô-men xoắn xoay thân xe tối đa (N.m)
+        self.MAX_TORQUE = 1.0 
+
+        # Cách tích phân vị trí:
+        # "euler": Euler tiến như cũ (cần dt nhỏ)
+        # "arc"  : cung tròn chính xác khi v, w không đổi; chỉ chia nhỏ bước
+        #          trong đoạn v/w còn đang tăng/giảm tốc -> dt lớn vẫn chính xác
+        self.integrator = integrator
+        # Bước con tối đa trong đoạn đang tăng tốc (chế độ "arc")
+        self.ramp_substep = 0.002
+
+    def update(self, wl, wr, dt):
+        if self.integrator == "arc":
+            return self._update_arc(wl, wr, dt)
+
+        # 1. Tính vận tốc ĐÍCH (Target) mong muốn dựa trên input
+        v_target = (self.r / 2) * (wr + wl)
+        w_target = (self.r / self.D) * (wr - wl)
+
+        # 2. Tính gia tốc tối đa cho phép dựa trên Khối lượng M
+        # a = F / m
+        # M càng lớn -> acc_linear càng nhỏ -> Tăng tốc càng chậm
+        acc_linear_max = self.MAX_FORCE / self.M
+        
+        # Gia tốc góc: alpha = Torque / I (Mô-men quán tính)
+        # Mô-men quán tính của hình hộp vuông cạnh D (Square Prism)
+        # J = 1/6 * M * D^2
+        I_robot = (1/6) * self.M * (self.D**2)
+        acc_angular_max = self.MAX_TORQUE / I_robot
+
+        # 3. Cập nhật Vận tốc dài (v) tiến dần tới v_target
+        # Nếu đang chậm hơn đích -> Tăng tốc
+        if self.v < v_target:
+            self.v += acc_linear_max * dt
+            if self.v > v_target: self.v = v_target # Không vượt quá
+        # Nếu đang nhanh hơn đích -> Giảm tốc
+        elif self.v > v_target:
+            self.v -= acc_linear_max * dt
+            if self.v < v_target: self.v = v_target
+
+        # 4. Cập nhật Vận tốc góc (w) tương tự
+        if self.w < w_target:
+            self.w += acc_angular_max * dt
+            if self.w > w_target: self.w = w_target
+        elif self.w > w_target:
+            self.w -= acc_angular_max * dt
+            if self.w < w_target: self.w = w_target
+
+        # 5. Cập nhật vị trí (Kinematics) dùng vận tốc ĐÃ CÓ QUÁN TÍNH
+        self.x += self.v * np.cos(self.theta) * dt
+        self.y += self.v * np.sin(self.theta) * dt
+        self.theta += self.w * dt
+
+        return self.x, self.y, self.theta
+
+    def _update_arc(self, wl, wr, dt):
+        v_target = (self.r / 2) * (wr + wl)
+        w_target = (self.r / self.D) * (wr - wl)
+        acc_linear_max = self.MAX_FORCE / self.M
+        I_robot = (1/6) * self.M * (self.D**2)
+        acc_angular_max = self.MAX_TORQUE / I_robot
+
+        t = 0.0
+        while t < dt:
+            remaining = dt - t
+            # Thời gian còn lại tới khi v, w chạm đích (điểm bão hoà của ramp)
+            tv = abs(v_target - self.v) / acc_linear_max
+            tw = abs(w_target - self.w) / acc_angular_max
+            if tv == 0.0 and tw == 0.0:
+                # v, w hằng: cung tròn chính xác cho phần còn lại của bước
+                self._arc(self.v, self.w, remaining)
+                break
+
+            # Đoạn đang ramp: kết thúc ở điểm bão hoà gần nhất hoặc hết bước
+            seg = min([x for x in (tv, tw) if x > 0.0] + [remaining])
+            av = math.copysign(acc_linear_max, v_target - self.v) if tv > 0.0 else 0.0
+            aw = math.copysign(acc_angular_max, w_target - self.w) if tw > 0.0 else 0.0
+
+            n = max(1, math.ceil(seg / self.ramp_substep))
+            h = seg / n
+            for _ in range(n):
+                # v, w biến thiên tuyến tính: dùng giá trị giữa bước con
+                self._arc(self.v + av * h / 2, self.w + aw * h / 2, h)
+                self.v += av * h
+                self.w += aw * h
+
+            # Chạm đích thì gán đúng giá trị đích (tránh sai số float)
+            if tv > 0.0 and tv <= seg:
+                self.v = v_target
+            if tw > 0.0 and tw <= seg:
+                self.w = w_target
+            t += seg
+
+        return self.x, self.y, self.theta
+
+    def _arc(self, v, w, h):
+        # Nghiệm chính xác với v, w không đổi trong thời gian h
+        th0 = self.theta
+        if abs(w) < 1e-9:
+            self.x += v * math.cos(th0) * h
+            self.y += v * math.sin(th0) * h
+        else:
+            th1 = th0 + w * h
+            self.x += v / w * (math.sin(th1) - math.sin(th0))
+            self.y -= v / w * (math.cos(th1) - math.cos(th0))
+        self.theta = th0 + w * h
+
+    def params(self):
+        return self.D, self.r
+
+
+class RobotFleet:
+    """Mô phỏng N robot cùng lúc (struct-of-arrays).
+
+    Mỗi thông số / trạng thái là một mảng NumPy độ dài N, một lần gọi
+    update() tiến toàn bộ đội xe thêm một bước dt với cùng luật tăng tốc
+    giới hạn như DifferentialDriveRobot.update.
+    """
+
+    def __init__(self, n, wheel_radius=0.12, wheel_distance=0.25, mass=1.2):
+        self.n = int(n)
+
+        # Thông số vật lý (có thể khác nhau cho từng robot)
+        self.r = np.full(self.n, wheel_radius, dtype=float)
+        self.D = np.full(self.n, wheel_distance, dtype=float)
+        self.M = np.full(self.n, mass, dtype=float)
+
+        # Trạng thái
+        self.x = np.zeros(self.n)
+        self.y = np.zeros(self.n)
+        self.theta = np.zeros(self.n)
+        self.v = np.zeros(self.n)
+        self.w = np.zeros(self.n)
+
+        # Giả định động cơ giống DifferentialDriveRobot
+        self.MAX_FORCE = 5.0
+        self.MAX_TORQUE = 1.0
+
+    @classmethod
+    def from_robots(cls, robots):
+        # Gom danh sách DifferentialDriveRobot thành một đội xe
+        fleet = cls(len(robots))
+        for i, rb in enumerate(robots):
+            fleet.r[i], fleet.D[i], fleet.M[i] = rb.r, rb.D, rb.M
+            fleet.x[i], fleet.y[i], fleet.theta[i] = rb.x, rb.y, rb.theta
+            fleet.v[i], fleet.w[i] = rb.v, rb.w
+        if robots:
+            fleet.MAX_FORCE = robots[0].MAX_FORCE
+            fleet.MAX_TORQUE = robots[0].MAX_TORQUE
+        return fleet
+
+    def robot(self, i):
+        # Xuất trạng thái robot thứ i ra một DifferentialDriveRobot độc lập
+        rb = DifferentialDriveRobot(float(self.r[i]), float(self.D[i]), float(self.M[i]))
+        rb.x, rb.y, rb.theta = float(self.x[i]), float(self.y[i]), float(self.theta[i])
+        rb.v, rb.w = float(self.v[i]), float(self.w[i])
+        rb.MAX_FORCE, rb.MAX_TORQUE = self.MAX_FORCE, self.MAX_TORQUE
+        return rb
+
+    def update(self, wl, wr, dt):
+        # wl, wr: số thực hoặc mảng độ dài N
+        # 1. Vận tốc đích
+        v_target = (self.r / 2) * (wr + wl)
+        w_target = (self.r / self.D) * (wr - wl)
+
+        # 2. Gia tốc tối đa (a = F/M, alpha = Torque/I, I = 1/6 * M * D^2)
+        acc_linear_max = self.MAX_FORCE / self.M
+        I_robot = (1/6) * self.M * (self.D**2)
+        acc_angular_max = self.MAX_TORQUE / I_robot
+
+        # 3-4. Tiến dần tới vận tốc đích, không vượt quá
+        self.v = self._ramp(self.v, v_target, acc_linear_max * dt)
+        self.w = self._ramp(self.w, w_target, acc_angular_max * dt)
+
+        # 5. Cập nhật vị trí (dùng theta TRƯỚC khi quay, như bản scalar)
+        self.x += self.v * np.cos(self.theta) * dt
+        self.y += self.v * np.sin(self.theta) * dt
+        self.theta += self.w * dt
+
+        return self.x, self.y, self.theta
+
+    @staticmethod
+    def _ramp(cur, target, step):
+        up = np.minimum(cur + step, target)
+        down = np.maximum(cur - step, target)
+        return np.where(cur < target, up, np.where(cur > target, down, cur))
+
+    def params(self):
+        return self.D, self.r
+
+
+def _ramp_segments(v0, target, step):
+    # Vận tốc sau mỗi bước khi tiến về target (K, T) với bước tối đa step,
+    # target chỉ đổi tại các biên đoạn -> trong mỗi đoạn dùng công thức đóng
+    K, T = target.shape
+    out = np.empty((K, T))
+    changes = np.flatnonzero(np.any(target[:, 1:] != target[:, :-1], axis=0)) + 1
+    bounds = np.concatenate(([0], changes, [T]))
+    cur = v0
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        tgt = target[:, s:s + 1]
+        k = np.arange(1, e - s + 1) * step
+        c = cur[:, None]
+        up = np.minimum(c + k, tgt)
+        down = np.maximum(c - k, tgt)
+        out[:, s:e] = np.where(c < tgt, up, np.where(c > tgt, down, c))
+        cur = out[:, e - 1]
+    return out
+
+
+def predict_trajectory(robot, wl, wr, dt):
+    """Dự đoán quỹ đạo khi áp dụng chuỗi input (wl, wr) trong T bước, KHÔNG đổi robot.
+
+    wl, wr: mảng (T,) hoặc (K, T) cho K chuỗi input ứng viên (broadcast với nhau,
+    một bên có thể là vô hướng).
+    Kết quả giống gọi robot.update(wl[k], wr[k], dt) lần lượt (Euler),
+    nhưng tính một lần bằng NumPy: ramp vận tốc theo công thức đóng trên
+    từng đoạn input không đổi, vị trí bằng tổng tích luỹ (cumsum).
+    Mỗi đoạn vẫn là một vòng Python (vận tốc đầu đoạn phụ thuộc đoạn trước),
+    nên chuỗi input đổi ở mọi bước sẽ chậm như vòng update() T lần.
+    T = 0 -> Trajectory rỗng.
+    """
+    # Broadcast trước khi thêm trục: wl (T,) với wr vô hướng vẫn là một chuỗi (T,)
+    wl, wr = np.broadcast_arrays(np.asarray(wl, dtype=float), np.asarray(wr, dtype=float))
+    single = wl.ndim <= 1
+    wl, wr = np.atleast_2d(wl), np.atleast_2d(wr)
+    K, T = wl.shape
+    if T == 0:
+        # Mỗi trường một mảng riêng (ghi vào một trường không đổi trường khác)
+        shape = (0,) if single else (K, 0)
+        return Trajectory(*(np.empty(shape) for _ in Trajectory._fields))
+
+    v_target = (robot.r / 2) * (wr + wl)
+    w_target = (robot.r / robot.D) * (wr - wl)
+    acc_linear_max = robot.MAX_FORCE / robot.M
+    I_robot = (1/6) * robot.M * (robot.D**2)
+    acc_angular_max = robot.MAX_TORQUE / I_robot
+
+    v = _ramp_segments(np.full(K, robot.v), v_target, acc_linear_max * dt)
+    w = _ramp_segments(np.full(K, robot.w), w_target, acc_angular_max * dt)
+
+    # theta sau mỗi bước; vị trí dùng theta TRƯỚC bước (như update)
+    theta = robot.theta + np.cumsum(w * dt, axis=1)
+    theta_prev = np.concatenate((np.full((K, 1), robot.theta), theta[:, :-1]), axis=1)
+    x = robot.x + np.cumsum(v * np.cos(theta_prev) * dt, axis=1)
+    y = robot.y + np.cumsum(v * np.sin(theta_prev) * dt, axis=1)
+
+    if single:
+        return Trajectory(x[0], y[0], theta[0], v[0], w[0])
+    return Trajectory(x, y, theta, v, w)
@@ -0,0 +1,265 @@
+import numpy as np
+
+# (trục, kênh, màu, nhãn, hàm biến đổi)
+LINE_SPECS = [
+    ("pos", "X", "b", "X", None),
+    ("pos", "Y", "g", "Y", None),
+    ("vel", "V", "r", "v", np.abs),
+    ("vel", "CTE", "c", "e", None),
+    ("angle", "Theta", "purple", "θ", None),
+    ("angle", "W", "orange", "ω", None),
+    ("wheel", "WL", "brown", "L", None),
+    ("wheel", "WR", "black", "R", None),
+]
+
+def _bounds(data):
+    # (min, max) bỏ qua NaN; kênh toàn NaN (ví dụ CTE khi không bám đường) -> (inf, -inf)
+    finite = data[np.isfinite(data)]
+    if not len(finite):
+        return np.inf, -np.inf
+    return finite.min(), finite.max()
+
+
+AXES_LABELS = {
+    "pos": "X, Y (m)",
+    "vel": "v (m/s) | e (m)",
+    "angle": "Rad | Rad/s",
+    "wheel": "wL, wR (rad/s)",
+}
+
+
+class LivePlot:
+    """4 đồ thị telemetry vẽ bằng blitting, trục hoành là thời gian mô phỏng (giây).
+
+    - Nền (trục, nhãn, legend, lưới) được cache; mỗi lần cập nhật chỉ vẽ lại các Line.
+    - Trục chỉ co giãn khi dữ liệu ra khỏi giới hạn hiện tại (có trễ/hysteresis),
+      lúc đó mới vẽ lại toàn bộ figure.
+    - Chế độ "full": vẽ toàn bộ lần chạy từ telemetry.pyramid (MinMaxPyramid), tối đa
+      ~2 điểm mỗi pixel ngang. Lăn chuột để zoom, kéo chuột trái để dời, nhấp đúp để
+      quay lại theo dõi cả lần chạy; mỗi lần zoom/dời dữ liệu được lấy lại ở mức chi tiết phù hợp.
+    """
+
+    def __init__(self, fig, window_s=5.0, x_jump=0.25, y_margin=0.2, y_shrink=0.3, zoom_step=1.25):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.window_s = window_s
+        # Khi t vượt mép phải, dời trục x thêm x_jump * window_s (tránh vẽ lại mỗi khung)
+        self.x_jump = x_jump
+        # Mở rộng trục y thêm y_margin khi dữ liệu vượt giới hạn;
+        # chỉ thu nhỏ khi dữ liệu chiếm ít hơn y_shrink khoảng hiện tại
+        self.y_margin = y_margin
+        self.y_shrink = y_shrink
+        self.zoom_step = zoom_step
+
+        self.mode = "window"
+        self._follow = True     # Chế độ full: trục x tự bám theo cả lần chạy
+        self._drag = None       # (pixel x lúc nhấn, xlim lúc nhấn)
+        self._source = None     # Nguồn dữ liệu lần update gần nhất (để vẽ lại khi zoom)
+        self._full_drawn = None  # (xlim, t_end) lần vẽ full gần nhất
+        self._idle = False
+
+        self.axes = {}
+        for i, name in enumerate(AXES_LABELS):
+            sharex = self.axes["pos"] if self.axes else None
+            self.axes[name] = fig.add_subplot(411 + i, sharex=sharex)
+
+        self._background = None
+        self.full_redraws = 0
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("scroll_event", self._on_scroll)
+        self.canvas.mpl_connect("button_press_event", self._on_press)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+        self.canvas.mpl_connect("button_release_event", self._on_release)
+        self.reset()
+
+    def reset(self):
+        for name, ax in self.axes.items():
+            ax.clear()
+            ax.set_facecolor("#f9f9f9")
+            ax.grid(True, linestyle=':', alpha=0.6)
+            ax.set_ylabel(AXES_LABELS[name])
+            ax.set_ylim(-1, 1)
+        self.axes["pos"].set_xlim(0, self.window_s)
+        self._follow = True
+
+        # --- TẠO CÁC ĐỐI TƯỢNG LINE (Lưu vào biến để dùng lại) ---
+        self.lines = []
+        for ax_name, ch, color, label, fn in LINE_SPECS:
+            line, = self.axes[ax_name].plot([], [], color, label=label, animated=True)
+            self.lines.append((line, ax_name, ch, fn))
+        for name in ("pos", "vel", "angle", "wheel"):
+            self.axes[name].legend(fontsize='x-small', loc='upper left')
+
+        self._background = None
+        self.canvas.draw()
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line, ax_name, _, _ in self.lines:
+            self.axes[ax_name].draw_artist(line)
+
+    def _rescale_x(self, t_last):
+        ax = self.axes["pos"]
+        x0, x1 = ax.get_xlim()
+        if x0 <= t_last <= x1:
+            return False
+        right = max(t_last + self.x_jump * self.window_s, self.window_s)
+        ax.set_xlim(right - self.window_s, right)
+        return True
+
+    def _rescale_x_full(self, t_start, t_end):
+        # Bám cả lần chạy: chỉ nới mép phải khi vượt quá (thêm x_jump * độ dài)
+        ax = self.axes["pos"]
+        x0, x1 = ax.get_xlim()
+        if x0 == t_start and t_end <= x1:
+            return False
+        span = max(t_end - t_start, self.window_s)
+        ax.set_xlim(t_start, t_start + span * (1 + self.x_jump))
+        return True
+
+    def _rescale_y(self, ax, lo, hi):
+        if not (np.isfinite(lo) and np.isfinite(hi)):
+            return False
+        y0, y1 = ax.get_ylim()
+        span = y1 - y0
+        outside = lo < y0 or hi > y1
+        too_loose = (hi - lo) < self.y_shrink * span and span > 2.0
+        if not (outside or too_loose):
+            return False
+        pad = max(hi - lo, 1.0) * self.y_margin
+        ax.set_ylim(lo - pad, hi + pad)
+        return True
+
+    def set_mode(self, mode):
+        # "window": window_s giây cuối; "full": toàn bộ lần chạy
+        self.mode = mode
+        self._follow = True
+        if mode == "window":
+            self.axes["pos"].set_xlim(0, self.window_s)
+        self._background = None
+
+    def refresh(self):
+        # Vẽ lại từ nguồn gần nhất sau zoom/dời; draw_idle gộp nhiều sự kiện chuột liên tiếp
+        if self._source is not None:
+            self._idle = True
+            try:
+                self.update(self._source)
+            finally:
+                self._idle = False
+
+    def _on_scroll(self, event):
+        if self.mode != "full" or event.inaxes is None or event.xdata is None:
+            return
+        scale = 1 / self.zoom_step if event.button == "up" else self.zoom_step
+        x0, x1 = self.axes["pos"].get_xlim()
+        x = event.xdata
+        self.axes["pos"].set_xlim(x - (x - x0) * scale, x + (x1 - x) * scale)
+        self._follow = False
+        self._background = None
+        self.refresh()
+
+    def _on_press(self, event):
+        if self.mode != "full" or event.inaxes is None or event.button != 1:
+            return
+        if event.dblclick:
+            self._follow = True
+            self._background = None
+            self.refresh()
+            return
+        self._drag = (event.x, self.axes["pos"].get_xlim())
+
+    def _on_motion(self, event):
+        if self._drag is None or event.x is None:
+            return
+        px0, (x0, x1) = self._drag
+        shift = (event.x - px0) * (x1 - x0) / max(self.axes["pos"].bbox.width, 1.0)
+        self.axes["pos"].set_xlim(x0 - shift, x1 - shift)
+        self._follow = False
+        self._background = None
+        self.refresh()
+
+    def _on_release(self, event):
+        self._drag = None
+
+    def update(self, telemetry):
+        self._source = telemetry
+        pyramid = getattr(telemetry, "pyramid", None)
+        if self.mode == "full" and pyramid is not None:
+            self._update_full(pyramid)
+            return
+        if not len(telemetry):
+            return
+
+        # Cửa sổ window_s giây cuối: tìm điểm bắt đầu bằng tìm kiếm nhị phân trên T
+        win = telemetry.window()
+        T = win["T"]
+        i0 = np.searchsorted(T, T[-1] - self.window_s)
+        t_view = T[i0:]
+
+        dirty = self._rescale_x(t_view[-1])
+
+        bounds = {}
+        for line, ax_name, ch, fn in self.lines:
+            if ch not in win:
+                # Nguồn không có kênh này (ví dụ bản ghi cũ không có CTE)
+                line.set_data([], [])
+                continue
+            data = win[ch][i0:]
+            if fn is not None:
+                data = fn(data)
+            line.set_data(t_view, data)
+            lo, hi = bounds.get(ax_name, (np.inf, -np.inf))
+            d_lo, d_hi = _bounds(data)
+            bounds[ax_name] = (min(lo, d_lo), max(hi, d_hi))
+
+        for ax_name, (lo, hi) in bounds.items():
+            dirty |= self._rescale_y(self.axes[ax_name], lo, hi)
+        self._present(dirty)
+
+    def _update_full(self, pyramid):
+        if not len(pyramid):
+            return
+        dirty = self._follow and self._rescale_x_full(pyramid.t_start, pyramid.t_end)
+        ax = self.axes["pos"]
+        x0, x1 = ax.get_xlim()
+        # Dữ liệu mới chưa đủ 1 pixel ngang -> hình không đổi, bỏ qua khung này
+        if not dirty and self._background is not None and self._full_drawn is not None:
+            xlim, t_end = self._full_drawn
+            if xlim == (x0, x1) and pyramid.t_end - t_end < (x1 - x0) / max(ax.bbox.width, 1.0):
+                return
+        self._full_drawn = ((x0, x1), pyramid.t_end)
+        # Mỗi ô min/max cho 2 điểm -> lấy số ô bằng số pixel ngang
+        t, ys = pyramid.query(x0, x1, ax.bbox.width)
+
+        bounds = {}
+        for line, ax_name, ch, fn in self.lines:
+            if ch not in ys:
+                line.set_data([], [])
+                continue
+            data = ys[ch]
+            if fn is not None:
+                data = fn(data)
+            line.set_data(t, data)
+            lo, hi = bounds.get(ax_name, (np.inf, -np.inf))
+            d_lo, d_hi = _bounds(data)
+            bounds[ax_name] = (min(lo, d_lo), max(hi, d_hi))
+
+        for ax_name, (lo, hi) in bounds.items():
+            dirty |= self._rescale_y(self.axes[ax_name], lo, hi)
+        self._present(dirty)
+
+    def _present(self, dirty):
+        if dirty or self._background is None:
+            # Trục thay đổi: vẽ lại toàn bộ (hiếm), _on_draw cache nền mới
+            self.full_redraws += 1
+            if self._idle:
+                self.canvas.draw_idle()
+            else:
+                self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.fig.bbox)
@@ -1,382 +1,966 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import numpy as np
-import serial
-import serial.tools.list_ports
-import threading
-import time
-
-# Import file module
-from kinematics import DifferentialDriveRobot
-from robot_draw import draw_robot
-
-# --- MÀU SẮC ---
-BG_COLOR = "white"
-PANEL_BG = "#f5f5f5"
-
-class RobotGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Robot 2 Bánh")
-        self.root.state('zoomed') # Mở toàn màn hình
-        self.root.configure(bg=BG_COLOR)
-
-        # --- TẠO THANH CUỘN (SCROLLBAR) ---
-        # 1. Canvas chính
-        self.main_canvas = tk.Canvas(root, bg=BG_COLOR)
-        self.main_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # 2. Scrollbar dọc
-        self.scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=self.main_canvas.yview)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        # 3. Cấu hình Canvas
-        self.main_canvas.configure(yscrollcommand=self.scrollbar.set)
-        
-        # 4. Frame chứa nội dung (nằm trong Canvas)
-        self.content_frame = tk.Frame(self.main_canvas, bg=BG_COLOR)
-        
-        # --- [QUAN TRỌNG] Lưu ID của window để xử lý resize ---
-        self.frame_id = self.main_canvas.create_window((0, 0), window=self.content_frame, anchor="nw")
-
-        # Bind sự kiện để xử lý cuộn và giãn chiều ngang
-        self.main_canvas.bind('<Configure>', self._on_canvas_configure)
-        self.root.bind_all("<MouseWheel>", self._on_mousewheel)
-
-        # --- BIẾN HỆ THỐNG ---
-        self.robot = DifferentialDriveRobot()
-        self.running = False
-        self.mode_uart = False 
-        self.curr_wl = 0.0
-        self.curr_wr = 0.0
-        self.ser = None
-        self.serial_thread = None
-        self.stop_thread = False
-
-        # --- GIAO DIỆN ---
-        self.setup_ui()
-        self.reset_data()
-        
-        # Vẽ khởi tạo
-        D, r = self.robot.params()
-        draw_robot(self.ax_robot, 0, 0, 0, D, r, [], [])
-        self.canvas_robot.draw()
-        self.setup_initial_axes()
-
-    def _on_canvas_configure(self, event):
-        """Hàm này giúp nội dung luôn giãn đầy chiều ngang màn hình"""
-        # Cập nhật vùng cuộn
-        self.main_canvas.configure(scrollregion=self.main_canvas.bbox("all"))
-        # Ép chiều rộng của frame nội dung bằng chiều rộng canvas
-        self.main_canvas.itemconfig(self.frame_id, width=event.width)
-
-    def _on_mousewheel(self, event):
-        self.main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-
-    def setup_ui(self):
-
-        left_col = tk.Frame(self.content_frame, bg=BG_COLOR, padx=10, pady=10)
-        left_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # 1. Mô phỏng Robot
-        tk.Label(left_col, text="MÔ PHỎNG", bg=BG_COLOR, font=("Arial", 10, "bold")).pack(anchor="w")
-        fig_left = Figure(figsize=(4, 4), dpi=100, facecolor='white')
-        fig_left.subplots_adjust(left=0.18, bottom=0.15)
-        self.ax_robot = fig_left.add_subplot(111)
-        self.canvas_robot = FigureCanvasTkAgg(fig_left, master=left_col)
-        self.canvas_robot.get_tk_widget().pack()
-
-        # 2. Bảng Điều khiển
-    
-        ctrl_group = tk.LabelFrame(left_col, text="BẢNG ĐIỀU KHIỂN", bg=PANEL_BG, padx=5, pady=5, font=("Arial", 9, "bold"), labelanchor='n')
-        ctrl_group.pack(fill=tk.X, pady=10)
-
-        # Thông số vật lý
-        self.add_section_label(ctrl_group, "1. Thông số Vật lý:")
-        phys_row = tk.Frame(ctrl_group, bg=PANEL_BG)
-        phys_row.pack(pady=2) 
-        self.R_entry = self.add_entry_compact(phys_row, "R(mm)", "120")
-        self.D_entry = self.add_entry_compact(phys_row, "D(mm)", "250")
-        self.M_entry = self.add_entry_compact(phys_row, "M(kg)", "1.2")
-
-        # Nhập tay & UART Switch
-        self.add_section_label(ctrl_group, "2. Chế độ điều khiển:")
-        mode_row = tk.Frame(ctrl_group, bg=PANEL_BG)
-        mode_row.pack(pady=2) 
-        self.var_mode = tk.IntVar(value=0)
-        tk.Radiobutton(mode_row, text="Manual", variable=self.var_mode, value=0, bg=PANEL_BG, command=self.toggle_mode).pack(side=tk.LEFT, padx=5)
-        tk.Radiobutton(mode_row, text="UART", variable=self.var_mode, value=1, bg=PANEL_BG, command=self.toggle_mode).pack(side=tk.LEFT, padx=5)
-
-        # Input Manual
-        man_row = tk.Frame(ctrl_group, bg=PANEL_BG)
-        man_row.pack(pady=5)
-        self.wl_entry = self.add_entry_compact(man_row, "wL", "0.0")
-        self.wr_entry = self.add_entry_compact(man_row, "wR", "0.0")
-        tk.Button(man_row, text="GỬI", bg="#FF9800", fg="white", font=("Arial", 8, "bold"), width=6, command=self.update_manual_vel).pack(side=tk.LEFT, padx=5)
-
-        # UART Connect
-        uart_row = tk.Frame(ctrl_group, bg=PANEL_BG)
-        uart_row.pack(pady=5) 
-        self.cbo_port = ttk.Combobox(uart_row, width=8); self.cbo_port.pack(side=tk.LEFT)
-        self.refresh_ports()
-        self.entry_baud = tk.Entry(uart_row, width=6, justify="center"); self.entry_baud.insert(0, "9600"); self.entry_baud.pack(side=tk.LEFT, padx=2)
-        self.btn_connect = tk.Button(uart_row, text="KẾT NỐI", bg="#607D8B", fg="white", font=("Arial", 8), command=self.toggle_uart)
-        self.btn_connect.pack(side=tk.LEFT, padx=2)
-        
-       
-        self.lbl_status = tk.Label(ctrl_group, text="Disconnected", fg="red", bg=PANEL_BG, font=("Arial", 8))
-        self.lbl_status.pack(pady=(0,5))
-
-        # Nút Sim
-        sim_row = tk.Frame(ctrl_group, bg=PANEL_BG)
-        sim_row.pack(pady=10) 
-        tk.Button(sim_row, text="START", bg="green", fg="white", width=8, command=self.start_sim).pack(side=tk.LEFT, padx=5)
-        tk.Button(sim_row, text="STOP", bg="red", fg="white", width=8, command=self.stop_sim).pack(side=tk.LEFT, padx=5)
-        tk.Button(sim_row, text="RESET", bg="blue", fg="white", width=8, command=self.reset_all).pack(side=tk.LEFT, padx=5)
-
-        # Monitor (Hiển thị số)
-        mon_group = tk.LabelFrame(left_col, text="THÔNG SỐ (Realtime)", bg=PANEL_BG, padx=5, pady=5, font=("Arial", 9, "bold"))
-        mon_group.pack(fill=tk.X, pady=5)
-        
-        self.lbl_X = self.add_monitor_row(mon_group, "X (m):")
-        self.lbl_Y = self.add_monitor_row(mon_group, "Y (m):")
-        self.lbl_Theta = self.add_monitor_row(mon_group, "Góc (rad):")
-        self.lbl_V = self.add_monitor_row(mon_group, "Vận tốc (m/s):")
-        self.lbl_Input = self.add_monitor_row(mon_group, "Input (wL, wR):", fg="blue")
-
-
-        # === CỘT PHẢI (Chiếm toàn bộ phần còn lại) ===
-        # Sử dụng expand=True để nó tự giãn ra lấp đầy khoảng trắng
-        right_col = tk.Frame(self.content_frame, bg=BG_COLOR, padx=10, pady=10)
-        right_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        tk.Label(right_col, text="ĐỒ THỊ", bg=BG_COLOR, font=("Arial", 10, "bold")).pack()
-
-        # Tạo 4 đồ thị - Tự động giãn theo kích thước khung chứa
-        fig_right = Figure(figsize=(4.5, 8), dpi=100, facecolor='white')
-        self.ax_pos   = fig_right.add_subplot(411)
-        self.ax_vel   = fig_right.add_subplot(412)
-        self.ax_angle = fig_right.add_subplot(413)
-        self.ax_wheel = fig_right.add_subplot(414)
-        
-        fig_right.subplots_adjust(hspace=0.6, left=0.1, right=0.95, top=0.96, bottom=0.05)
-        
-        self.canvas_plot = FigureCanvasTkAgg(fig_right, master=right_col)
-        self.canvas_plot.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-
-    # --- HELPER FUNCTIONS ---
-    def add_section_label(self, parent, text):
-        tk.Label(parent, text=text, bg=PANEL_BG, font=("Arial", 8, "italic"), fg="#555").pack(pady=(5,0))
-
-    def add_entry_compact(self, parent, label, default):
-        frm = tk.Frame(parent, bg=PANEL_BG)
-        frm.pack(side=tk.LEFT, padx=5) # Tăng padx từ 2 lên 5 cho thoáng
-        tk.Label(frm, text=label, bg=PANEL_BG, font=("Arial", 8)).pack(side=tk.LEFT)
-        e = tk.Entry(frm, width=6, justify="center")
-        e.insert(0, default)
-        e.pack(side=tk.LEFT)
-        return e
-
-    def add_monitor_row(self, parent, label, fg="black"):
-        frm = tk.Frame(parent, bg="white", bd=1, relief=tk.SOLID)
-        frm.pack(fill=tk.X, pady=1)
-        tk.Label(frm, text=label, bg="white", width=12, anchor="w", font=("Arial", 8)).pack(side=tk.LEFT, padx=5)
-        lbl = tk.Label(frm, text="0.00", bg="white", fg=fg, font=("Arial", 9, "bold"))
-        lbl.pack(side=tk.RIGHT, padx=5)
-        return lbl
-
-    def refresh_ports(self):
-        ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.cbo_port['values'] = ports
-        if ports: self.cbo_port.current(0)
-
-    # --- LOGIC ---
-    def setup_initial_axes(self):
-# Cấu hình chung cho các trục
-        for ax in [self.ax_pos, self.ax_vel, self.ax_angle, self.ax_wheel]:
-            ax.set_facecolor("#f9f9f9")
-            ax.grid(True, linestyle=':', alpha=0.6)
-        
-        self.ax_pos.set_ylabel("X, Y (m)")
-        self.ax_vel.set_ylabel("v (m/s)")
-        self.ax_angle.set_ylabel("Rad | Rad/s")
-        self.ax_wheel.set_ylabel("wL, wR (rad/s)")
-
-        # --- TẠO CÁC ĐỐI TƯỢNG LINE (Lưu vào biến để dùng lại) ---
-        # Đồ thị 1: Vị trí X, Y
-        self.line_x, = self.ax_pos.plot([], [], 'b', label="X")
-        self.line_y, = self.ax_pos.plot([], [], 'g', label="Y")
-        self.ax_pos.legend(fontsize='x-small', loc='upper left')
-
-        # Đồ thị 2: Vận tốc dài
-        self.line_v, = self.ax_vel.plot([], [], 'r')
-        
-        # Đồ thị 3: Góc & Vận tốc góc
-        self.line_theta, = self.ax_angle.plot([], [], 'purple', label="θ")
-        self.line_w, = self.ax_angle.plot([], [], 'orange', label="ω")
-        self.ax_angle.legend(fontsize='x-small', loc='upper left')
-
-        # Đồ thị 4: Vận tốc bánh xe
-        self.line_wl, = self.ax_wheel.plot([], [], 'brown', label="L")
-        self.line_wr, = self.ax_wheel.plot([], [], 'black', label="R")
-        self.ax_wheel.legend(fontsize='x-small', loc='upper left')
-        
-        self.canvas_plot.draw()
-
-    def reset_data(self):
-        self.X, self.Y, self.V, self.W, self.Theta = [], [], [], [], []
-        self.WL, self.WR = [], []
-
-    def reset_all(self):
-        self.running = False
-        self.reset_data()
-        self.robot = DifferentialDriveRobot()
-        self.curr_wl = 0.0; self.curr_wr = 0.0
-        
-        D, r = self.robot.params()
-        draw_robot(self.ax_robot, 0, 0, 0, D, r, [], [])
-        self.canvas_robot.draw()
-        
-        self.ax_pos.clear(); self.ax_vel.clear(); self.ax_angle.clear(); self.ax_wheel.clear()
-        self.setup_initial_axes()
-        self.update_monitor_labels(0,0,0,0,0)
-
-    def update_manual_vel(self):
-        if self.var_mode.get() == 0:
-            try:
-                self.curr_wl = float(self.wl_entry.get())
-                self.curr_wr = float(self.wr_entry.get())
-            except: pass
-
-    def toggle_mode(self):
-        if self.var_mode.get() == 1 and not self.ser:
-            messagebox.showwarning("Cảnh báo", "Vui lòng kết nối UART trước!")
-            self.var_mode.set(0)
-
-    # --- UART THREAD ---
-    def toggle_uart(self):
-        if not self.ser:
-            try:
-                port = self.cbo_port.get()
-                baud = int(self.entry_baud.get())
-                self.ser = serial.Serial(port, baud, timeout=1)
-                self.stop_thread = False
-                self.serial_thread = threading.Thread(target=self.uart_read_loop)
-                self.serial_thread.daemon = True
-                self.serial_thread.start()
-                
-                self.lbl_status.config(text=f"Connected", fg="green")
-                self.btn_connect.config(text="NGẮT", bg="#f44336")
-                self.var_mode.set(1) 
-            except Exception as e:
-                messagebox.showerror("Lỗi", str(e))
-        else:
-            self.stop_thread = True
-            if self.ser: self.ser.close()
-            self.ser = None
-            self.lbl_status.config(text="Disconnected", fg="red")
-            self.btn_connect.config(text="KẾT NỐI", bg="#607D8B")
-
-    def uart_read_loop(self):
-        while not self.stop_thread and self.ser and self.ser.is_open:
-            try:
-                line = self.ser.readline().decode('utf-8').strip()
-                if line and self.var_mode.get() == 1:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        self.curr_wl = float(parts[0])
-                        self.curr_wr = float(parts[1])
-            except: pass
-            time.sleep(0.01)
-
-    # --- SIMULATION LOOP ---
-    def start_sim(self):
-        if self.running: return
-        try:
-            R = float(self.R_entry.get())/1000
-            D = float(self.D_entry.get())/1000
-            M = float(self.M_entry.get())
-            cx, cy, cth = self.robot.x, self.robot.y, self.robot.theta
-            self.robot = DifferentialDriveRobot(R, D, M)
-            self.robot.x, self.robot.y, self.robot.theta = cx, cy, cth
-        except: pass
-        
-        self.running = True
-        self.loop()
-
-    def stop_sim(self):
-        self.running = False
-
-    def loop(self):
-        if not self.running: return
-        
-        dt = 0.05
-        x, y, theta = self.robot.update(self.curr_wl, self.curr_wr, dt)
-        
-        self.X.append(x); self.Y.append(y)
-        self.V.append(self.robot.v); self.W.append(self.robot.w)
-        self.Theta.append(theta)
-        self.WL.append(self.curr_wl); self.WR.append(self.curr_wr)
-        
-        D, r = self.robot.params()
-        
-        # --- TỐI ƯU 1: Chỉ truyền 200 điểm quỹ đạo gần nhất vào hàm vẽ robot ---
-        # Giúp robot không bị lag khi chạy lâu (vì vết xanh lá cây quá dài)
-        limit_path = 200
-        draw_robot(self.ax_robot, x, y, theta, D, r, self.X[-limit_path:], self.Y[-limit_path:])
-        self.canvas_robot.draw()
-        
-        self.update_monitor_labels(x, y, theta, self.robot.v, self.robot.w)
-        
-        # Cập nhật đồ thị mỗi 2 vòng lặp (100ms) để nhẹ gánh cho CPU
-        if len(self.X) % 2 == 0:
-            self.update_graphs()
-            
-        # --- TỐI ƯU 2: Giảm thời gian chờ xuống 30ms (khoảng 33 FPS) cho mượt ---
-        self.root.after(20, self.loop)
-
-    def update_monitor_labels(self, x, y, th, v, w):
-        self.lbl_X.config(text=f"{x:.2f}")
-        self.lbl_Y.config(text=f"{y:.2f}")
-        self.lbl_Theta.config(text=f"{th:.2f}")
-        self.lbl_V.config(text=f"{abs(v):.2f}")
-        self.lbl_Input.config(text=f"{self.curr_wl:.1f} | {self.curr_wr:.1f}")
-
-    def update_graphs(self):
-        if not self.X: return
-
-        # --- TỐI ƯU 3: Cắt dữ liệu (Sliding Window) ---
-        # Chỉ lấy 200 mẫu cuối cùng để vẽ
-        limit = 200
-        
-        # Lấy trục thời gian tương ứng (index)
-        t_all = range(len(self.X))
-        t_view = list(t_all)[-limit:]
-        
-        # Cập nhật dữ liệu mới vào các đường Line đã tạo (Thay vì xóa đi vẽ lại)
-        self.line_x.set_data(t_view, self.X[-limit:])
-        self.line_y.set_data(t_view, self.Y[-limit:])
-        
-        self.line_v.set_data(t_view, np.abs(self.V[-limit:]))
-        
-        self.line_theta.set_data(t_view, self.Theta[-limit:])
-        self.line_w.set_data(t_view, self.W[-limit:])
-        
-        self.line_wl.set_data(t_view, self.WL[-limit:])
-        self.line_wr.set_data(t_view, self.WR[-limit:])
-
-        # --- Tự động co giãn trục (Rescale) ---
-        # Vì ta dùng set_data nên trục không tự giãn, phải gọi hàm này
-        for ax in [self.ax_pos, self.ax_vel, self.ax_angle, self.ax_wheel]:
-            ax.relim()           # Tính toán lại giới hạn dữ liệu
-            ax.autoscale_view()  # Cập nhật khung nhìn trục
-
-        self.canvas_plot.draw()
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = RobotGUI(root)
-    root.mainloop()
\ No newline at end of file
+import time
+_T_START = time.perf_counter()  # Mốc đo thời gian khởi động (trước mọi import)
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import sys
+import threading
+
+# Import file module
+from kinematics import DifferentialDriveRobot
+# matplotlib (Tk/Agg), pyserial, process vẽ và hub chỉ import khi dùng lần đầu -> khởi động nhanh
+from robot_draw import RobotRenderer, TkCanvasRenderer, draw_robot, camera_range, footprint_radius, update_photo
+from simulation import SimulationRunner, SimulationWorker
+from telemetry import TelemetryStore
+from live_plot import LivePlot
+from profiler import FrameProfiler, StartupTimer
+from recorder import RunRecorder, RunReplay
+from path_lod import PathLOD
+from world import OccupancyGrid, RangeSensor
+from path_follow import ReferencePath, PurePursuit, PathFollowInput
+from frame_tick import frame_tick, SIM_DT, FRAME_MS
+
+# --- MÀU SẮC ---
+BG_COLOR = "white"
+PANEL_BG = "#f5f5f5"
+# Màu các robot phụ đọc qua SerialHub
+HUB_COLORS = ["#2196F3", "#E91E63", "#9C27B0", "#00BCD4", "#FF5722", "#795548", "#3F51B5", "#CDDC39"]
+
+# --- THỜI GIAN ---
+GRAPH_WINDOW_S = 5.0   # Độ dài cửa sổ đồ thị (s)
+TELEMETRY_MAX_BYTES = 16 * 1024 * 1024  # Giới hạn bộ nhớ cho telemetry
+
+class RobotGUI:
+    def __init__(self, root, startup=None):
+        self.root = root
+        # Đo thời gian khởi động; figure đồ thị và quét cổng làm sau khi cửa sổ hiện lên
+        self.startup = startup if startup is not None else StartupTimer()
+        self.root.title("Robot 2 Bánh")
+        self.root.state('zoomed') # Mở toàn màn hình
+        self.root.configure(bg=BG_COLOR)
+
+        # --- TẠO THANH CUỘN (SCROLLBAR) ---
+        # 1. Canvas chính
+        self.main_canvas = tk.Canvas(root, bg=BG_COLOR)
+        self.main_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # 2. Scrollbar dọc
+        self.scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=self.main_canvas.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # 3. Cấu hình Canvas
+        self.main_canvas.configure(yscrollcommand=self.scrollbar.set)
+        
+        # 4. Frame chứa nội dung (nằm trong Canvas)
+        self.content_frame = tk.Frame(self.main_canvas, bg=BG_COLOR)
+        
+        # --- [QUAN TRỌNG] Lưu ID của window để xử lý resize ---
+        self.frame_id = self.main_canvas.create_window((0, 0), window=self.content_frame, anchor="nw")
+
+        # Bind sự kiện để xử lý cuộn và giãn chiều ngang
+        self.main_canvas.bind('<Configure>', self._on_canvas_configure)
+        self.root.bind_all("<MouseWheel>", self._on_mousewheel)
+
+        # --- BIẾN HỆ THỐNG ---
+        self.robot = DifferentialDriveRobot()
+        self.sim = SimulationRunner(self.robot, dt=SIM_DT)
+        # Luồng vật lý: GUI chỉ đọc snapshot mới nhất và gửi lệnh qua hàng đợi
+        self.worker = SimulationWorker(self.sim)
+        # Ring buffer cố định: bộ nhớ và chi phí mỗi khung hình không tăng theo thời gian
+        # (tầng toàn bộ lần chạy chỉ bật khi tick "Toàn bộ lần chạy")
+        self.telemetry = TelemetryStore(max_bytes=TELEMETRY_MAX_BYTES)
+        self.running = False
+        self.mode_uart = False 
+        self.curr_wl = 0.0
+        self.curr_wr = 0.0
+        self.ser = None
+        self.ingestor = None    # Luồng đọc UART (hàng đợi mẫu có gắn thời gian)
+        self.uart_input = None  # Nguồn input cho mô phỏng ở chế độ UART
+        self._input_key = None  # (runner, nguồn input) đã gửi cho luồng vật lý
+        self.profiler = FrameProfiler()  # Đo thời gian từng công đoạn của loop
+        self.recorder = None    # Ghi phiên chạy ra file
+        self.path_lod = PathLOD()  # Toàn bộ quỹ đạo, nhiều mức chi tiết
+        self.replay = None      # File ghi đang phát lại (memory-map)
+        self.replay_t = 0.0
+        self._replay_clock = None
+        self.offscreen = None   # Vẽ đồ thị trong process riêng (tuỳ chọn)
+        self.hub = None         # Nhiều cổng serial / nhiều robot (asyncio)
+        self._hub_ticks = 0
+        self.plot_photo = None
+        self._plot_size = (450, 800)
+        self.world = None       # Bản đồ vật cản (tuỳ chọn)
+        self.lidar = RangeSensor()  # 360 tia, 20 Hz theo thời gian mô phỏng
+        self.ref_path = None    # Đường tham chiếu cho chế độ bám đường
+        self.ref_lod = None
+        self.plotter = None     # LivePlot, dựng trễ (ensure_plot)
+        self.robot_view_mpl = None  # Backend matplotlib của khung robot, dựng khi bật
+        self.path_input = None  # Nguồn input bám đường (pure pursuit, chạy trên luồng vật lý)
+
+        # --- GIAO DIỆN ---
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.setup_ui()
+        self.reset_data()
+        self.startup.mark("dựng giao diện")
+        
+        # Vẽ khởi tạo (chỉ khung robot trên tk.Canvas; đồ thị dựng sau)
+        D, r = self.robot.params()
+        self.robot_view.reset(D, r)
+        self.setup_initial_axes()
+        self.startup.mark("vẽ ban đầu")
+        self.root.after_idle(self._on_startup_ready)
+
+    def on_close(self):
+        # Dừng luồng vật lý và process vẽ trước khi đóng cửa sổ
+        self.stop_sim()
+        if self.offscreen is not None:
+            self.offscreen.close()
+        if self.hub is not None:
+            self.hub.stop()
+        self.root.destroy()
+
+    def _on_canvas_configure(self, event):
+        """Hàm này giúp nội dung luôn giãn đầy chiều ngang màn hình"""
+        # Cập nhật vùng cuộn
+        self.main_canvas.configure(scrollregion=self.main_canvas.bbox("all"))
+        # Ép chiều rộng của frame nội dung bằng chiều rộng canvas
+        self.main_canvas.itemconfig(self.frame_id, width=event.width)
+
+    def _on_mousewheel(self, event):
+        self.main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    def setup_ui(self):
+
+        left_col = tk.Frame(self.content_frame, bg=BG_COLOR, padx=10, pady=10)
+        left_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # 1. Mô phỏng Robot
+        tk.Label(left_col, text="MÔ PHỎNG", bg=BG_COLOR, font=("Arial", 10, "bold")).pack(anchor="w")
+        robot_holder = tk.Frame(left_col, bg=BG_COLOR)
+        robot_holder.pack()
+        # Mặc định vẽ robot thẳng lên tk.Canvas (nhẹ); matplotlib vẫn dùng được và dùng để xuất ảnh
+        self.canvas_robot_tk = tk.Canvas(robot_holder, width=400, height=400, bg="white", highlightthickness=0)
+        self.canvas_robot_tk.pack()
+        self.robot_view_tk = TkCanvasRenderer(self.canvas_robot_tk, path_lod=self.path_lod)
+        self.robot_holder = robot_holder
+        self.robot_view = self.robot_view_tk
+
+        view_row = tk.Frame(left_col, bg=BG_COLOR)
+        view_row.pack(fill=tk.X)
+        self.var_robot_mpl = tk.IntVar(value=0)
+        tk.Checkbutton(view_row, text="Vẽ bằng matplotlib", variable=self.var_robot_mpl, bg=BG_COLOR,
+                       font=("Arial", 8), command=self.toggle_robot_backend).pack(side=tk.LEFT)
+        tk.Button(view_row, text="XUẤT ẢNH", bg="#607D8B", fg="white", font=("Arial", 8),
+                  command=self.export_robot_image).pack(side=tk.RIGHT)
+
+        # 2. Bảng Điều khiển
+    
+        ctrl_group = tk.LabelFrame(left_col, text="BẢNG ĐIỀU KHIỂN", bg=PANEL_BG, padx=5, pady=5, font=("Arial", 9, "bold"), labelanchor='n')
+        ctrl_group.pack(fill=tk.X, pady=10)
+
+        # Thông số vật lý
+        self.add_section_label(ctrl_group, "1. Thông số Vật lý:")
+        phys_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        phys_row.pack(pady=2) 
+        self.R_entry = self.add_entry_compact(phys_row, "R(mm)", "120")
+        self.D_entry = self.add_entry_compact(phys_row, "D(mm)", "250")
+        self.M_entry = self.add_entry_compact(phys_row, "M(kg)", "1.2")
+
+        # Nhập tay & UART Switch
+        self.add_section_label(ctrl_group, "2. Chế độ điều khiển:")
+        mode_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        mode_row.pack(pady=2) 
+        self.var_mode = tk.IntVar(value=0)
+        tk.Radiobutton(mode_row, text="Manual", variable=self.var_mode, value=0, bg=PANEL_BG, command=self.toggle_mode).pack(side=tk.LEFT, padx=5)
+        tk.Radiobutton(mode_row, text="UART", variable=self.var_mode, value=1, bg=PANEL_BG, command=self.toggle_mode).pack(side=tk.LEFT, padx=5)
+        tk.Radiobutton(mode_row, text="Bám đường", variable=self.var_mode, value=2, bg=PANEL_BG, command=self.toggle_mode).pack(side=tk.LEFT, padx=5)
+
+        # Bám đường: đường tham chiếu (CSV/txt 2 cột x, y hoặc .npy), tầm nhìn trước và tốc độ
+        path_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        path_row.pack(pady=2)
+        tk.Button(path_row, text="MỞ ĐƯỜNG", bg="#607D8B", fg="white", font=("Arial", 8), command=self.load_path).pack(side=tk.LEFT, padx=2)
+        tk.Button(path_row, text="MẪU", bg="#607D8B", fg="white", font=("Arial", 8), command=lambda: self.set_path(ReferencePath.demo())).pack(side=tk.LEFT, padx=2)
+        self.lookahead_entry = self.add_entry_compact(path_row, "L(m)", "0.3")
+        self.path_speed_entry = self.add_entry_compact(path_row, "v(m/s)", "0.3")
+
+        # Input Manual
+        man_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        man_row.pack(pady=5)
+        self.wl_entry = self.add_entry_compact(man_row, "wL", "0.0")
+        self.wr_entry = self.add_entry_compact(man_row, "wR", "0.0")
+        tk.Button(man_row, text="GỬI", bg="#FF9800", fg="white", font=("Arial", 8, "bold"), width=6, command=self.update_manual_vel).pack(side=tk.LEFT, padx=5)
+
+        # UART Connect
+        uart_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        uart_row.pack(pady=5) 
+        self.cbo_port = ttk.Combobox(uart_row, width=8); self.cbo_port.pack(side=tk.LEFT)
+        self.refresh_ports()  # Chạy nền
+        self.entry_baud = tk.Entry(uart_row, width=6, justify="center"); self.entry_baud.insert(0, "9600"); self.entry_baud.pack(side=tk.LEFT, padx=2)
+        self.btn_connect = tk.Button(uart_row, text="KẾT NỐI", bg="#607D8B", fg="white", font=("Arial", 8), command=self.toggle_uart)
+        self.btn_connect.pack(side=tk.LEFT, padx=2)
+        
+       
+        self.lbl_status = tk.Label(ctrl_group, text="Disconnected", fg="red", bg=PANEL_BG, font=("Arial", 8))
+        self.lbl_status.pack(pady=(0,5))
+
+        # Nút Sim
+        sim_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        sim_row.pack(pady=10) 
+        tk.Button(sim_row, text="START", bg="green", fg="white", width=8, command=self.start_sim).pack(side=tk.LEFT, padx=5)
+        tk.Button(sim_row, text="STOP", bg="red", fg="white", width=8, command=self.stop_sim).pack(side=tk.LEFT, padx=5)
+        tk.Button(sim_row, text="RESET", bg="blue", fg="white", width=8, command=self.reset_all).pack(side=tk.LEFT, padx=5)
+
+        # Ghi / Phát lại
+        self.add_section_label(ctrl_group, "3. Ghi / Phát lại:")
+        rec_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        rec_row.pack(pady=2)
+        self.btn_record = tk.Button(rec_row, text="GHI", bg="#607D8B", fg="white", font=("Arial", 8), width=8, command=self.toggle_record)
+        self.btn_record.pack(side=tk.LEFT, padx=2)
+        self.btn_replay = tk.Button(rec_row, text="PHÁT LẠI", bg="#607D8B", fg="white", font=("Arial", 8), width=8, command=self.toggle_replay)
+        self.btn_replay.pack(side=tk.LEFT, padx=2)
+        self.replay_speed_entry = self.add_entry_compact(rec_row, "x", "1.0")
+        self.scale_replay = tk.Scale(ctrl_group, from_=0, to=1, resolution=0.01, orient=tk.HORIZONTAL,
+                                     showvalue=True, bg=PANEL_BG, highlightthickness=0, command=self.seek_replay)
+        self.scale_replay.pack(fill=tk.X, padx=5)
+
+        # Nhiều robot: mỗi cổng một robot, chọn trong danh sách để hiện cùng khung mô phỏng
+        self.add_section_label(ctrl_group, "4. Nhiều robot (Hub):")
+        hub_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        hub_row.pack(pady=2, fill=tk.X)
+        self.hub_ports_entry = tk.Entry(hub_row, width=18)
+        self.hub_ports_entry.pack(side=tk.LEFT, padx=2)
+        self.btn_hub = tk.Button(hub_row, text="MỞ HUB", bg="#607D8B", fg="white", font=("Arial", 8), command=self.toggle_hub)
+        self.btn_hub.pack(side=tk.LEFT, padx=2)
+        self.lst_hub = tk.Listbox(ctrl_group, selectmode=tk.MULTIPLE, height=4, font=("Arial", 8), exportselection=False)
+        self.lst_hub.pack(fill=tk.X, padx=5)
+
+        # Bản đồ ô lưới: va chạm chạy trong bước vật lý, lidar quét trên luồng GUI (20 Hz)
+        self.add_section_label(ctrl_group, "5. Bản đồ / Lidar:")
+        map_row = tk.Frame(ctrl_group, bg=PANEL_BG)
+        map_row.pack(pady=2)
+        tk.Button(map_row, text="MỞ BẢN ĐỒ", bg="#607D8B", fg="white", font=("Arial", 8), command=self.load_world).pack(side=tk.LEFT, padx=2)
+        tk.Button(map_row, text="MẪU", bg="#607D8B", fg="white", font=("Arial", 8), command=lambda: self.set_world(OccupancyGrid.demo())).pack(side=tk.LEFT, padx=2)
+        tk.Button(map_row, text="BỎ", bg="#607D8B", fg="white", font=("Arial", 8), command=lambda: self.set_world(None)).pack(side=tk.LEFT, padx=2)
+        self.map_res_entry = self.add_entry_compact(map_row, "m/ô", "0.05")
+        self.var_lidar = tk.IntVar(value=1)
+        tk.Checkbutton(map_row, text="Lidar", variable=self.var_lidar, bg=PANEL_BG, font=("Arial", 8),
+                       command=lambda: self.robot_view.set_scan(None)).pack(side=tk.LEFT)
+
+        # Monitor (Hiển thị số)
+        mon_group = tk.LabelFrame(left_col, text="THÔNG SỐ (Realtime)", bg=PANEL_BG, padx=5, pady=5, font=("Arial", 9, "bold"))
+        mon_group.pack(fill=tk.X, pady=5)
+        
+        self.lbl_X = self.add_monitor_row(mon_group, "X (m):")
+        self.lbl_Y = self.add_monitor_row(mon_group, "Y (m):")
+        self.lbl_Theta = self.add_monitor_row(mon_group, "Góc (rad):")
+        self.lbl_V = self.add_monitor_row(mon_group, "Vận tốc (m/s):")
+        self.lbl_Input = self.add_monitor_row(mon_group, "Input (wL, wR):", fg="blue")
+        self.lbl_Collisions = self.add_monitor_row(mon_group, "Va chạm (bước):", fg="red")
+        self.lbl_CTE = self.add_monitor_row(mon_group, "Lệch đường (m):")
+
+        # Hiệu năng (profiler)
+        perf_group = tk.LabelFrame(left_col, text="HIỆU NĂNG", bg=PANEL_BG, padx=5, pady=5, font=("Arial", 9, "bold"))
+        perf_group.pack(fill=tk.X, pady=5)
+        self.var_perf = tk.IntVar(value=1)
+        perf_row = tk.Frame(perf_group, bg=PANEL_BG)
+        perf_row.pack(fill=tk.X)
+        tk.Checkbutton(perf_row, text="Hiển thị", variable=self.var_perf, bg=PANEL_BG, font=("Arial", 8),
+                       command=self.toggle_perf_panel).pack(side=tk.LEFT)
+        tk.Button(perf_row, text="XUẤT TRACE", bg="#607D8B", fg="white", font=("Arial", 8), command=self.export_trace).pack(side=tk.RIGHT)
+        # Các dòng số liệu nằm trong 1 khung riêng để ẩn/hiện cả khối
+        self.perf_body = tk.Frame(perf_group, bg=PANEL_BG)
+        self.perf_body.pack(fill=tk.X)
+        self.lbl_FPS = self.add_monitor_row(self.perf_body, "FPS:")
+        self.lbl_Frame = self.add_monitor_row(self.perf_body, "Frame p50|p99 (ms):")
+        self.lbl_Slowest = self.add_monitor_row(self.perf_body, "Chậm nhất (p99):")
+        self.lbl_SimRatio = self.add_monitor_row(self.perf_body, "Sim / thực:")
+        self.lbl_UartRate = self.add_monitor_row(self.perf_body, "UART (mẫu/s):")
+        self.lbl_PlotProc = self.add_monitor_row(self.perf_body, "Đồ thị (ms | bỏ):")
+        self.lbl_Startup = self.add_monitor_row(self.perf_body, "Khởi động (ms):")
+
+
+        # === CỘT PHẢI (Chiếm toàn bộ phần còn lại) ===
+        # Sử dụng expand=True để nó tự giãn ra lấp đầy khoảng trắng
+        right_col = tk.Frame(self.content_frame, bg=BG_COLOR, padx=10, pady=10)
+        right_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        graph_head = tk.Frame(right_col, bg=BG_COLOR)
+        graph_head.pack()
+        tk.Label(graph_head, text="ĐỒ THỊ", bg=BG_COLOR, font=("Arial", 10, "bold")).pack(side=tk.LEFT)
+        # Toàn bộ lần chạy: lăn chuột để zoom, kéo để dời, nhấp đúp để xem lại cả lần chạy
+        self.var_full_history = tk.IntVar(value=0)
+        tk.Checkbutton(graph_head, text="Toàn bộ lần chạy", variable=self.var_full_history, bg=BG_COLOR,
+                       font=("Arial", 8), command=self.toggle_full_history).pack(side=tk.LEFT, padx=10)
+        # Process riêng: Agg vẽ ở lõi khác, GUI chỉ chép ảnh (PPM) vào PhotoImage
+        self.var_offscreen = tk.IntVar(value=0)
+        tk.Checkbutton(graph_head, text="Vẽ ở process riêng", variable=self.var_offscreen, bg=BG_COLOR,
+                       font=("Arial", 8), command=self.toggle_offscreen).pack(side=tk.LEFT)
+
+        # 4 đồ thị dựng trễ (ensure_plot): tới lúc đó chỉ có dòng chữ giữ chỗ
+        self.plot_col = right_col
+        self.plot_placeholder = tk.Label(right_col, text="Đang tải đồ thị...", bg=BG_COLOR, fg="#999",
+                                         font=("Arial", 9, "italic"))
+        self.plot_placeholder.pack(fill=tk.BOTH, expand=True)
+        # Chỗ hiện ảnh từ process vẽ (chỉ pack khi bật "Vẽ ở process riêng")
+        self.plot_image_canvas = tk.Canvas(right_col, bg="white", highlightthickness=0)
+        self.plot_image_canvas.bind("<Configure>", self._on_plot_image_configure)
+
+    # --- KHỞI ĐỘNG TRỄ ---
+    def _on_startup_ready(self):
+        # Vòng sự kiện Tk đã rảnh lần đầu: cửa sổ dùng được
+        self.startup.ready()
+        self.lbl_Startup.config(text=f"{self.startup.ready_s * 1e3:.0f}")
+        # Nạp matplotlib trên luồng nền, rồi dựng figure trên luồng Tk
+        loader = threading.Thread(target=self._import_plot_modules, daemon=True)
+        loader.start()
+        self._wait_thread(loader, self.ensure_plot)
+
+    @staticmethod
+    def _import_plot_modules():
+        import matplotlib.figure  # noqa: F401
+        import matplotlib.backends.backend_tkagg  # noqa: F401
+
+    def _wait_thread(self, thread, then):
+        # Tk không an toàn đa luồng: chờ luồng nền bằng after() rồi làm tiếp trên luồng Tk
+        if thread.is_alive():
+            self.root.after(20, self._wait_thread, thread, then)
+        else:
+            then()
+
+    def ensure_plot(self):
+        # Dựng figure 4 đồ thị (một lần); gọi trễ sau khởi động hoặc lúc cần tới đầu tiên
+        if self.plotter is not None:
+            return self.plotter
+        t0 = time.perf_counter()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from offscreen_plot import FIGURE_ADJUST
+
+        # Tạo 4 đồ thị - Tự động giãn theo kích thước khung chứa
+        fig_right = Figure(figsize=(4.5, 8), dpi=100, facecolor='white')
+        fig_right.subplots_adjust(**FIGURE_ADJUST)
+        self.canvas_plot = FigureCanvasTkAgg(fig_right, master=self.plot_col)
+        self.plot_placeholder.destroy()
+        if self.offscreen is None:
+            self.canvas_plot.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Vẽ bằng blitting, trục thời gian tính theo giây
+        self.plotter = LivePlot(fig_right, window_s=GRAPH_WINDOW_S)
+        self.plotter.set_mode("full" if self.var_full_history.get() else "window")
+        self.startup.record("dựng đồ thị", time.perf_counter() - t0)
+        return self.plotter
+
+    def ensure_robot_mpl(self):
+        # Backend matplotlib của khung robot: chỉ dựng khi người dùng bật
+        if self.robot_view_mpl is not None:
+            return self.robot_view_mpl
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        fig_left = Figure(figsize=(4, 4), dpi=100, facecolor='white')
+        fig_left.subplots_adjust(left=0.18, bottom=0.15)
+        self.ax_robot = fig_left.add_subplot(111)
+        self.canvas_robot = FigureCanvasTkAgg(fig_left, master=self.robot_holder)
+        view = RobotRenderer(self.ax_robot, path_lod=self.path_lod)
+        view.set_world(self.world)
+        view.set_reference(self.ref_lod)
+        self.robot_view_mpl = view
+        return view
+
+    def robot_views(self):
+        # Các backend khung robot đã dựng
+        return [v for v in (self.robot_view_tk, self.robot_view_mpl) if v is not None]
+
+
+    # --- HELPER FUNCTIONS ---
+    def add_section_label(self, parent, text):
+        tk.Label(parent, text=text, bg=PANEL_BG, font=("Arial", 8, "italic"), fg="#555").pack(pady=(5,0))
+
+    def add_entry_compact(self, parent, label, default):
+        frm = tk.Frame(parent, bg=PANEL_BG)
+        frm.pack(side=tk.LEFT, padx=5) # Tăng padx từ 2 lên 5 cho thoáng
+        tk.Label(frm, text=label, bg=PANEL_BG, font=("Arial", 8)).pack(side=tk.LEFT)
+        e = tk.Entry(frm, width=6, justify="center")
+        e.insert(0, default)
+        e.pack(side=tk.LEFT)
+        return e
+
+    def add_monitor_row(self, parent, label, fg="black"):
+        frm = tk.Frame(parent, bg="white", bd=1, relief=tk.SOLID)
+        frm.pack(fill=tk.X, pady=1)
+        tk.Label(frm, text=label, bg="white", width=12, anchor="w", font=("Arial", 8)).pack(side=tk.LEFT, padx=5)
+        lbl = tk.Label(frm, text="0.00", bg="white", fg=fg, font=("Arial", 9, "bold"))
+        lbl.pack(side=tk.RIGHT, padx=5)
+        return lbl
+
+    def refresh_ports(self):
+        # Nạp pyserial + liệt kê cổng trên luồng nền (trên Windows có thể mất vài giây)
+        t0 = time.perf_counter()
+        result = []
+
+        def scan():
+            try:
+                import serial.tools.list_ports
+                result.append([port.device for port in serial.tools.list_ports.comports()])
+            except Exception as e:
+                result.append(e)
+
+        def apply():
+            ports = result[0] if result else []
+            if isinstance(ports, Exception):
+                self.lbl_status.config(text=f"Không liệt kê được cổng: {ports}", fg="red")
+                ports = []
+            self.cbo_port['values'] = ports
+            if ports and not self.cbo_port.get(): self.cbo_port.current(0)
+            self.startup.record("quét cổng (nền)", time.perf_counter() - t0)
+
+        scanner = threading.Thread(target=scan, daemon=True)
+        scanner.start()
+        self._wait_thread(scanner, apply)
+
+    # --- LOGIC ---
+    def setup_initial_axes(self):
+        # Trục, nhãn, legend và các Line do LivePlot tạo một lần
+        if self.plotter is not None:
+            self.plotter.reset()
+            self.plotter.set_mode("full" if self.var_full_history.get() else "window")
+        if self.offscreen is not None:
+            self.offscreen.reset()
+
+    def reset_data(self):
+        self.telemetry.clear()
+        self.path_lod.clear()
+        self.lidar = RangeSensor()
+        for view in self.robot_views():
+            view.set_scan(None)
+
+    def reset_all(self):
+        self.stop_sim()
+        self.reset_data()
+        if self.recorder is not None:
+            self.recorder.new_segment()
+        self.robot = DifferentialDriveRobot()
+        self.sim = SimulationRunner(self.robot, dt=SIM_DT)
+        self.worker.runner = self.sim
+        self.attach_recorder()
+        self.attach_world()
+        self.attach_follower()
+        self.curr_wl = 0.0; self.curr_wr = 0.0
+        self.profiler.reset()
+        
+        D, r = self.robot.params()
+        self.robot_view.reset(D, r)
+        
+        self.setup_initial_axes()
+        self.update_monitor_labels(0,0,0,0,0)
+
+    def update_manual_vel(self):
+        if self.var_mode.get() == 0:
+            try:
+                self.curr_wl = float(self.wl_entry.get())
+                self.curr_wr = float(self.wr_entry.get())
+            except: pass
+            self.worker.set_input(self.curr_wl, self.curr_wr)
+
+    def toggle_mode(self):
+        if self.var_mode.get() == 1 and not self.ser:
+            messagebox.showwarning("Cảnh báo", "Vui lòng kết nối UART trước!")
+            self.var_mode.set(0)
+        elif self.var_mode.get() == 2 and self.ref_path is None:
+            messagebox.showwarning("Cảnh báo", "Vui lòng mở đường tham chiếu trước!")
+            self.var_mode.set(0)
+
+    # --- UART THREAD ---
+    def toggle_uart(self):
+        if not self.ser:
+            try:
+                import serial
+                from uart_ingest import UartIngestor, QueueInput
+                port = self.cbo_port.get()
+                baud = int(self.entry_baud.get())
+                # timeout ngắn: luồng đọc thoát nhanh khi ngắt kết nối
+                self.ser = serial.Serial(port, baud, timeout=0.05)
+                self.ingestor = UartIngestor(self.ser)
+                self.attach_recorder()
+                self.ingestor.start()
+                self.uart_input = QueueInput(self.ingestor.queue, self.sim)
+                
+                self.lbl_status.config(text=f"Connected", fg="green")
+                self.btn_connect.config(text="NGẮT", bg="#f44336")
+                self.var_mode.set(1) 
+            except Exception as e:
+                if self.ser: self.ser.close()
+                self.ser = None
+                messagebox.showerror("Lỗi", str(e))
+        else:
+            if self.ingestor: self.ingestor.stop()
+            if self.ser: self.ser.close()
+            self.ser = None
+            self.ingestor = None
+            self.uart_input = None
+            self.lbl_status.config(text="Disconnected", fg="red")
+            self.btn_connect.config(text="KẾT NỐI", bg="#607D8B")
+
+    def update_uart_status(self):
+        st = self.ingestor.stats()
+        if not self.ingestor.running:
+            self.lbl_status.config(text=f"Mất kết nối: {self.ingestor.last_error}", fg="red")
+            return
+        self.lbl_status.config(
+            text=f"Connected | {st['samples']} mẫu | lỗi {st['parse_errors']} | bỏ {st['dropped']}",
+            fg="green")
+
+    # --- HUB NHIỀU CỔNG ---
+    def toggle_hub(self):
+        if self.hub is not None:
+            self.hub.stop()
+            self.hub = None
+            self.lst_hub.delete(0, tk.END)
+            self.robot_view.set_others([])
+            self.btn_hub.config(text="MỞ HUB", bg="#607D8B")
+            return
+        ports = self.hub_ports_entry.get().replace(",", " ").split()
+        if not ports:
+            messagebox.showwarning("Cảnh báo", "Nhập danh sách cổng, ví dụ: COM3, COM4")
+            return
+        try:
+            from serial_hub import SerialHub
+            baud = int(self.entry_baud.get())
+            R = float(self.R_entry.get())/1000
+            D = float(self.D_entry.get())/1000
+            M = float(self.M_entry.get())
+        except (ImportError, ValueError) as e:
+            messagebox.showerror("Lỗi", str(e))
+            return
+        # Cổng chưa mở được không làm hỏng hub: hub tự thử lại, lỗi hiện trong danh sách
+        self.hub = SerialHub(dt=SIM_DT, robot_factory=lambda: DifferentialDriveRobot(R, D, M))
+        for port in ports:
+            self.hub.add_port(port, baud)
+        self.hub.start()
+        for port in ports:
+            self.lst_hub.insert(tk.END, port)
+        self.lst_hub.selection_set(0, tk.END)
+        self.btn_hub.config(text="ĐÓNG HUB", bg="#f44336")
+        self.hub_tick()
+
+    def hub_tick(self):
+        hub = self.hub
+        if hub is None: return
+        selected = set(self.lst_hub.curselection() or ())
+        others = []
+        for i, rb in enumerate(hub.robots.values()):
+            if i in selected:
+                s = rb.latest
+                others.append((rb.port, s.x, s.y, s.theta, rb.runner.robot.D, HUB_COLORS[i % len(HUB_COLORS)]))
+        self.robot_view.set_others(others)
+        if not self.running:
+            # Mô phỏng chính đang dừng: tự vẽ lại để robot phụ vẫn di chuyển
+            x, y, theta, path_x, path_y = self.current_pose()
+            D, r = self.robot.params()
+            self.robot_view.update(x, y, theta, D, r, path_x, path_y)
+
+        self._hub_ticks += 1
+        if self._hub_ticks % 25 == 0:
+            self.update_hub_list()
+        self.root.after(FRAME_MS, self.hub_tick)
+
+    def update_hub_list(self):
+        # Ghi lại từng dòng, giữ nguyên lựa chọn
+        selected = self.lst_hub.curselection() or ()
+        self.lst_hub.delete(0, tk.END)
+        for port, st in self.hub.stats().items():
+            state = "OK" if st["connected"] else "MẤT"
+            self.lst_hub.insert(tk.END, f"{port} | {state} | {st['samples']} mẫu | lỗi {st['parse_errors']} | nối lại {st['reconnects']}")
+        for i in selected:
+            self.lst_hub.selection_set(i)
+
+    # --- GHI / PHÁT LẠI ---
+    def attach_recorder(self):
+        # Ghi mọi bước vật lý và byte UART thô (nếu đang ghi)
+        rec, sim = self.recorder, self.sim
+        hook = None if rec is None else \
+            (lambda rn: rec.record_tick(rn.t, rn.robot.x, rn.robot.y, rn.robot.theta,
+                                        rn.robot.v, rn.robot.w, rn.wl, rn.wr))
+        # on_step chạy trên luồng vật lý: đổi giữa 2 bước, chờ xong rồi mới đóng file
+        self.worker.call(setattr, sim, "on_step", hook)
+        if self.ingestor is not None:
+            # Byte thô đóng dấu theo thời gian mô phỏng (cùng ánh xạ QueueInput dùng để áp mẫu)
+            self.ingestor.raw_sink = None if rec is None else \
+                (lambda t_recv, data: rec.record_raw(sim.sim_time_of(t_recv), data))
+
+    def toggle_record(self):
+        if self.recorder is None:
+            path = filedialog.asksaveasfilename(defaultextension=".rbrec", filetypes=[("Robot record", "*.rbrec")])
+            if not path: return
+            try:
+                self.recorder = RunRecorder(path)
+            except OSError as e:
+                messagebox.showerror("Lỗi", str(e))
+                return
+            self.btn_record.config(text="DỪNG GHI", bg="#f44336")
+        else:
+            rec, self.recorder = self.recorder, None
+            self.attach_recorder()
+            rec.close()
+            self.btn_record.config(text="GHI", bg="#607D8B")
+            self.lbl_status.config(text=f"Đã ghi {rec.ticks_written} bước", fg="green")
+            return
+        self.attach_recorder()
+
+    def toggle_replay(self):
+        if self.replay is not None:
+            self.stop_replay()
+            return
+        path = filedialog.askopenfilename(filetypes=[("Robot record", "*.rbrec"), ("All", "*.*")])
+        if not path: return
+        try:
+            replay = RunReplay(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Lỗi", str(e))
+            return
+        if not len(replay):
+            messagebox.showwarning("Cảnh báo", "File ghi không có dữ liệu")
+            replay.close()
+            return
+
+        self.stop_sim()
+        self.replay = replay
+        self.replay_t = replay.t_start
+        self._replay_clock = (time.perf_counter(), self.replay_t)
+        self.scale_replay.config(from_=replay.t_start, to=replay.t_end)
+        self.btn_replay.config(text="THOÁT", bg="#f44336")
+        self.setup_initial_axes()
+        self.replay_loop()
+
+    def stop_replay(self):
+        if self.replay is None: return
+        self.replay.close()
+        self.replay = None
+        self.btn_replay.config(text="PHÁT LẠI", bg="#607D8B")
+
+    def seek_replay(self, value):
+        # Bỏ qua callback do chính scale_replay.set() trong show_replay_frame gây ra
+        if self.replay is None or abs(float(value) - self.replay_t) <= 0.01: return
+        self.replay_t = float(value)
+        self._replay_clock = (time.perf_counter(), self.replay_t)
+        self.show_replay_frame()
+
+    def replay_loop(self):
+        if self.replay is None: return
+        try:
+            speed = float(self.replay_speed_entry.get())
+        except ValueError:
+            speed = 1.0
+        # Thời gian phát lại chạy theo đồng hồ thật * tốc độ, dừng ở cuối file
+        wall0, t0 = self._replay_clock
+        t = min(t0 + (time.perf_counter() - wall0) * speed, self.replay.t_end)
+        if t != self.replay_t:
+            self.replay_t = t
+            self.show_replay_frame()
+        self.root.after(FRAME_MS, self.replay_loop)
+
+    def show_replay_frame(self):
+        rp, t = self.replay, self.replay_t
+        tick = rp.sample_at(t)
+        path = rp.last_ticks(t, 200)
+        D, r = self.robot.params()
+        self.robot_view.update(tick["x"], tick["y"], tick["theta"], D, r, path["x"], path["y"])
+        self.curr_wl, self.curr_wr = float(tick["wl"]), float(tick["wr"])
+        self.update_monitor_labels(tick["x"], tick["y"], tick["theta"], tick["v"], tick["w"])
+        self.update_graphs(rp.telemetry_at(t, GRAPH_WINDOW_S))
+        self.scale_replay.set(t)
+
+    # --- SIMULATION LOOP ---
+    def start_sim(self):
+        if self.running: return
+        self.stop_replay()
+        try:
+            R = float(self.R_entry.get())/1000
+            D = float(self.D_entry.get())/1000
+            M = float(self.M_entry.get())
+            cx, cy, cth = self.robot.x, self.robot.y, self.robot.theta
+            self.robot = DifferentialDriveRobot(R, D, M)
+            self.robot.x, self.robot.y, self.robot.theta = cx, cy, cth
+            self.sim.robot = self.robot
+        except: pass
+        self.attach_world()
+        self.attach_follower()
+        self._input_key = None  # Khung đầu tiên gửi lại nguồn input
+        
+        self.worker.start()
+        self.running = True
+        self.loop()
+
+    def stop_sim(self):
+        self.running = False
+        self.worker.stop()
+
+    def loop(self):
+        if not self.running: return
+        if self.worker.last_error is not None:
+            self.stop_sim()
+            messagebox.showerror("Lỗi mô phỏng", str(self.worker.last_error))
+            return
+        # Chế độ UART: mỗi bước vật lý lấy lần lượt các mẫu đã nhận tới thời điểm đó
+        # (hàng đợi của UartIngestor -> QueueInput, đọc trên luồng vật lý)
+        # Chế độ bám đường: pure pursuit tính (wl, wr) từ tư thế ở mỗi bước vật lý
+        # Chế độ Manual: input do GUI giữ, chỉ gửi khi đổi (update_manual_vel / đổi nguồn)
+        mode = self.var_mode.get()
+        follower = self.path_input if mode == 2 else None
+        source = self.uart_input if mode == 1 else follower
+        if (self.sim, source) != self._input_key:
+            self._input_key = (self.sim, source)
+            if source is not None:
+                source.runner = self.sim
+            self.worker.submit(setattr, self.sim, "input_source", source)
+            if source is None:
+                self.worker.set_input(self.curr_wl, self.curr_wr)
+
+        def labels(snap):
+            if source is not None:
+                # Luồng vật lý tự lấy input: hiển thị giá trị nó đang dùng
+                self.curr_wl, self.curr_wr = snap.wl, snap.wr
+            self.update_monitor_labels(snap.x, snap.y, snap.theta, snap.v, snap.w)
+            if self.ingestor is not None and self.telemetry.count % 10 == 0:
+                self.update_uart_status()
+            if self.var_perf.get() and self.telemetry.count % 25 == 0:
+                self.update_perf_labels()
+
+        # Thân khung hình dùng chung với benchmark.py (frame_tick.py)
+        frame_tick(self.worker, self.telemetry, self.path_lod, self.robot_view,
+                   self.robot.params(), self.profiler, self.update_graphs,
+                   follower=follower, world=self.world if self.var_lidar.get() else None,
+                   lidar=self.lidar, labels=labels,
+                   counter=self.ingestor.samples if self.ingestor else 0)
+            
+        # --- TỐI ƯU 2: Giảm thời gian chờ xuống 30ms (khoảng 33 FPS) cho mượt ---
+        self.root.after(FRAME_MS, self.loop)
+
+    def toggle_perf_panel(self):
+        # Tắt "Hiển thị": ẩn các dòng số liệu và ngừng cập nhật nhãn (profiler vẫn đo)
+        if self.var_perf.get():
+            self.perf_body.pack(fill=tk.X)
+            self.update_perf_labels()
+        else:
+            self.perf_body.pack_forget()
+
+    def update_perf_labels(self):
+        prof = self.profiler
+        self.lbl_FPS.config(text=f"{prof.fps:.1f}")
+        self.lbl_Frame.config(text=f"{prof.percentile_ms('frame', 50):.1f} | {prof.percentile_ms('frame', 99):.1f}")
+        slowest = max(prof.stages, key=lambda st: prof.percentile_ms(st, 99))
+        self.lbl_Slowest.config(text=f"{slowest} {prof.percentile_ms(slowest, 99):.1f} ms")
+        self.lbl_SimRatio.config(text=f"{prof.sim_ratio:.2f}")
+        self.lbl_UartRate.config(text=f"{prof.counter_rate:.0f}")
+        off = self.offscreen
+        self.lbl_PlotProc.config(text="-" if off is None else f"{off.render_time * 1e3:.1f} | {off.dropped}")
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path: return
+        try:
+            n = self.profiler.export(path)
+            messagebox.showinfo("Trace", f"Đã ghi {n} khung hình vào {path}")
+        except OSError as e:
+            messagebox.showerror("Lỗi", str(e))
+
+    def update_monitor_labels(self, x, y, th, v, w):
+        self.lbl_X.config(text=f"{x:.2f}")
+        self.lbl_Y.config(text=f"{y:.2f}")
+        self.lbl_Theta.config(text=f"{th:.2f}")
+        self.lbl_V.config(text=f"{abs(v):.2f}")
+        self.lbl_Input.config(text=f"{self.curr_wl:.1f} | {self.curr_wr:.1f}")
+        self.lbl_Collisions.config(text=f"{self.sim.collisions}")
+        ctl = self.path_input.controller if self.path_input is not None and self.var_mode.get() == 2 else None
+        self.lbl_CTE.config(text="-" if ctl is None else ("XONG" if ctl.done else f"{ctl.cte:+.3f}"))
+
+    # --- BẢN ĐỒ / LIDAR ---
+    def load_world(self):
+        path = filedialog.askopenfilename(filetypes=[("Bản đồ", "*.png *.pgm *.npy *.txt"), ("All", "*.*")])
+        if not path: return
+        try:
+            world = OccupancyGrid.load(path, resolution=float(self.map_res_entry.get()))
+        except (OSError, ValueError, SyntaxError) as e:
+            messagebox.showerror("Lỗi", str(e))
+            return
+        self.set_world(world)
+
+    def set_world(self, world):
+        self.world = world
+        self.attach_world()
+        self.lidar = RangeSensor()
+        for view in self.robot_views():
+            view.set_world(world)
+            view.set_scan(None)
+        x, y, theta, path_x, path_y = self.current_pose()
+        D, r = self.robot.params()
+        self.robot_view.update(x, y, theta, D, r, path_x, path_y)
+
+    def attach_world(self):
+        # Va chạm kiểm tra trong bước vật lý: đổi giữa 2 bước qua hàng đợi lệnh
+        D, r = self.robot.params()
+        self.worker.submit(self.sim.set_world, self.world, footprint_radius(D, r))
+
+    # --- BÁM ĐƯỜNG ---
+    def load_path(self):
+        path = filedialog.askopenfilename(filetypes=[("Đường", "*.csv *.txt *.npy"), ("All", "*.*")])
+        if not path: return
+        try:
+            ref = ReferencePath.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Lỗi", str(e))
+            return
+        self.set_path(ref)
+
+    def set_path(self, ref):
+        self.ref_path = ref
+        # Vẽ qua PathLOD như quỹ đạo: đường 100k+ điểm vẫn chỉ tốn theo số pixel
+        lod = self.ref_lod = PathLOD()
+        for px, py in zip(ref.xs.tolist(), ref.ys.tolist()):
+            lod.append(px, py)
+        for view in self.robot_views():
+            view.set_reference(lod)
+        self.attach_follower()
+        x, y, theta, path_x, path_y = self.current_pose()
+        D, r = self.robot.params()
+        self.robot_view.update(x, y, theta, D, r, path_x, path_y)
+
+    def attach_follower(self):
+        # Bộ điều khiển theo thông số robot hiện tại; loop() gắn vào runner ở khung kế tiếp
+        if self.ref_path is None:
+            self.path_input = None
+            return
+        try:
+            lookahead = float(self.lookahead_entry.get())
+            speed = float(self.path_speed_entry.get())
+        except ValueError:
+            lookahead, speed = 0.3, 0.3
+        ctl = PurePursuit(self.ref_path, self.robot.r, self.robot.D, lookahead=lookahead, speed=speed)
+        self.path_input = PathFollowInput(ctl, self.sim)
+
+    # --- KHUNG ROBOT ---
+    def current_pose(self):
+        # (x, y, theta, path_x, path_y) đang hiển thị; path None = lấy từ PathLOD
+        if self.replay is not None:
+            tick = self.replay.sample_at(self.replay_t)
+            path = self.replay.last_ticks(self.replay_t, 200)
+            return tick["x"], tick["y"], tick["theta"], path["x"], path["y"]
+        snap = self.worker.latest()
+        return snap.x, snap.y, snap.theta, None, None
+
+    def toggle_robot_backend(self):
+        old = self.robot_view
+        if self.var_robot_mpl.get():
+            self.ensure_robot_mpl()
+            self.canvas_robot_tk.pack_forget()
+            self.canvas_robot.get_tk_widget().pack()
+            self.robot_view = self.robot_view_mpl
+        else:
+            self.canvas_robot.get_tk_widget().pack_forget()
+            self.canvas_robot_tk.pack()
+            self.robot_view = self.robot_view_tk
+        # Giữ vòng quét lidar gần nhất khi đổi backend
+        self.robot_view.scan = old.scan
+        x, y, theta, path_x, path_y = self.current_pose()
+        D, r = self.robot.params()
+        self.robot_view.invalidate()
+        self.robot_view.update(x, y, theta, D, r, path_x, path_y)
+
+    def export_robot_image(self):
+        path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png"), ("PDF", "*.pdf"), ("SVG", "*.svg")])
+        if not path: return
+        # Xuất bằng matplotlib (draw_robot) trên figure riêng, không ảnh hưởng khung đang chạy
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        x, y, theta, path_x, path_y = self.current_pose()
+        D, r = self.robot.params()
+        if path_x is None:
+            half = camera_range(D) / 2
+            path_x, path_y = self.path_lod.query(x - half, x + half, y - half, y + half, 2 * half / 800)
+        fig = Figure(figsize=(6, 6), dpi=150, facecolor='white')
+        FigureCanvasAgg(fig)
+        draw_robot(fig.add_subplot(111), x, y, theta, D, r, path_x, path_y)
+        try:
+            fig.savefig(path)
+        except OSError as e:
+            messagebox.showerror("Lỗi", str(e))
+
+    def toggle_full_history(self):
+        if self.var_full_history.get() and self.offscreen is not None:
+            # Zoom/dời cần sự kiện chuột của canvas matplotlib -> vẽ lại trong process chính
+            self.var_offscreen.set(0)
+            self.toggle_offscreen()
+            return
+        full = bool(self.var_full_history.get())
+        self.telemetry.set_full_history(full)
+        self.ensure_plot().set_mode("full" if full else "window")
+        if self.replay is not None:
+            self.show_replay_frame()
+        else:
+            self.update_graphs()
+
+    def toggle_offscreen(self):
+        if self.var_offscreen.get():
+            if self.offscreen is not None: return
+            self.var_full_history.set(0)
+            self.telemetry.set_full_history(False)
+            self.ensure_plot().set_mode("window")
+            widget = self.canvas_plot.get_tk_widget()
+            self._plot_size = (max(widget.winfo_width(), 50), max(widget.winfo_height(), 50))
+            try:
+                from offscreen_plot import OffscreenPlot
+                self.offscreen = OffscreenPlot(window_s=GRAPH_WINDOW_S)
+                self.offscreen.start()
+            except (OSError, RuntimeError) as e:
+                self.offscreen = None
+                self.var_offscreen.set(0)
+                messagebox.showerror("Lỗi", str(e))
+                return
+            widget.pack_forget()
+            self.plot_image_canvas.pack(fill=tk.BOTH, expand=True)
+            self.poll_offscreen()
+        else:
+            if self.offscreen is None: return
+            self.offscreen.close()
+            self.offscreen = None
+            self.plot_image_canvas.pack_forget()
+            self.canvas_plot.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.toggle_full_history()
+
+    def _on_plot_image_configure(self, event):
+        self._plot_size = (event.width, event.height)
+
+    def poll_offscreen(self):
+        off = self.offscreen
+        if off is None: return
+        if not off.alive:
+            # Process vẽ chết: quay về vẽ trong process chính
+            self.var_offscreen.set(0)
+            self.toggle_offscreen()
+            return
+        frame = off.poll()
+        if frame is not None:
+            photo = update_photo(self.plot_photo, frame, self.plot_image_canvas)
+            if photo is not self.plot_photo:
+                self.plot_photo = photo
+                self.plot_image_canvas.delete("all")
+                self.plot_image_canvas.create_image(0, 0, anchor=tk.NW, image=photo)
+        self.root.after(5, self.poll_offscreen)
+
+    def update_graphs(self, source=None):
+        source = self.telemetry if source is None else source
+        if self.offscreen is not None:
+            # Chỉ gửi khi process vẽ rảnh; khung cũ bị bỏ chứ không xếp hàng
+            self.offscreen.submit(source, *self._plot_size)
+            return
+        # Chỉ vẽ lại các Line (blit); trục co giãn khi dữ liệu ra khỏi giới hạn
+        self.ensure_plot().update(source)
+
+if __name__ == "__main__":
+    startup = StartupTimer(_T_START)
+    startup.mark("import")
+    root = tk.Tk()
+    startup.mark("tạo cửa sổ Tk")
+    app = RobotGUI(root, startup)
+    root.mainloop()
+    # --startup-report: in thời gian từng giai đoạn khởi động (kể cả việc làm trễ) khi đóng
+    if "--startup-report" in sys.argv[1:]:
+        print(startup.report())
\ No newline at end of file
@@ -0,0 +1,183 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from telemetry import CHANNELS
+
+# Giống figure bên phải của RobotGUI
+FIGURE_ADJUST = dict(hspace=0.6, left=0.1, right=0.95, top=0.96, bottom=0.05)
+
+
+class _SharedWindow:
+    # Phía process vẽ: n mẫu đầu trong shared memory, giao diện window()/__len__ như TelemetryStore
+    def __init__(self, data):
+        self.data = data
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def window(self, n=None):
+        k = self.n if n is None else min(n, self.n)
+        return {ch: self.data[i, self.n - k:self.n] for i, ch in enumerate(CHANNELS)}
+
+
+def _render_main(conn, data_name, frame_name, capacity, window_s, dpi, adjust):
+    # Chạy trong process riêng (spawn): Agg + LivePlot, không có Tk
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from live_plot import LivePlot
+
+    data_shm = shared_memory.SharedMemory(name=data_name)
+    frame_shm = shared_memory.SharedMemory(name=frame_name)
+    try:
+        data = np.ndarray((len(CHANNELS), capacity), dtype=np.float64, buffer=data_shm.buf)
+        frame = np.ndarray(frame_shm.size, dtype=np.uint8, buffer=frame_shm.buf)
+
+        fig = Figure(figsize=(4.5, 8), dpi=dpi, facecolor='white')
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(**adjust)
+        plotter = LivePlot(fig, window_s=window_s)
+        source = _SharedWindow(data)
+        size = None
+        conn.send(("ready",))
+
+        while True:
+            msg = conn.recv()
+            if msg[0] == "stop":
+                break
+            if msg[0] == "reset":
+                plotter.reset()
+                continue
+            _, seq, n, width, height = msg
+            t0 = time.perf_counter()
+            if (width, height) != size:
+                # Đổi kích thước: vẽ lại toàn bộ, LivePlot tự cache nền mới
+                fig.set_size_inches(width / dpi, height / dpi)
+                fig.canvas.draw()
+                size = (width, height)
+            source.n = n
+            plotter.update(source)
+            rgba = np.asarray(fig.canvas.buffer_rgba())
+            h, w = rgba.shape[:2]
+            frame[:h * w * 4] = rgba.reshape(-1)
+            conn.send(("frame", seq, w, h, time.perf_counter() - t0))
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        data_shm.close()
+        frame_shm.close()
+
+
+class OffscreenPlot:
+    """Vẽ 4 đồ thị telemetry bằng Agg trong process riêng (dùng lõi CPU thứ hai).
+
+    - submit(): chép cửa sổ window_s giây cuối vào shared memory rồi gửi yêu cầu vẽ.
+      Mỗi lúc chỉ có 1 khung đang vẽ; process còn bận thì khung mới bị bỏ (dropped),
+      không xếp hàng -> khung nhận về luôn là dữ liệu mới nhất lúc gửi.
+    - poll(): khung RGBA (h, w, 4) đã vẽ xong (view vào shared memory) hoặc None.
+    """
+
+    def __init__(self, window_s=5.0, capacity=8192, max_size=(2000, 2000), dpi=100, adjust=FIGURE_ADJUST):
+        self.window_s = window_s
+        self.capacity = capacity
+        self.max_size = max_size
+        self.dpi = dpi
+        self.adjust = dict(adjust)
+
+        self._proc = None
+        self._conn = None
+        self._data_shm = None
+        self._frame_shm = None
+        self._data = None
+        self._seq = 0
+        self.ready = False
+        self.busy = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.received = 0
+        self.render_time = 0.0   # Thời gian vẽ khung gần nhất trong process (s)
+
+    def start(self):
+        ctx = mp.get_context("spawn")  # Không fork tiến trình đang chạy Tk
+        self._data_shm = shared_memory.SharedMemory(create=True, size=len(CHANNELS) * self.capacity * 8)
+        self._frame_shm = shared_memory.SharedMemory(create=True, size=self.max_size[0] * self.max_size[1] * 4)
+        self._data = np.ndarray((len(CHANNELS), self.capacity), dtype=np.float64, buffer=self._data_shm.buf)
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=_render_main, daemon=True,
+                                 args=(child, self._data_shm.name, self._frame_shm.name,
+                                       self.capacity, self.window_s, self.dpi, self.adjust))
+        self._proc.start()
+        child.close()
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def submit(self, telemetry, width, height):
+        if not self.ready or self.busy:
+            self.dropped += 1
+            return False
+        if not len(telemetry):
+            return False
+        win = telemetry.window()
+        T = win["T"]
+        i0 = max(int(np.searchsorted(T, T[-1] - self.window_s)), len(T) - self.capacity)
+        n = len(T) - i0
+        for i, ch in enumerate(CHANNELS):
+            # Nguồn thiếu kênh (bản ghi không có CTE): để NaN
+            self._data[i, :n] = win[ch][i0:] if ch in win else np.nan
+
+        width = int(min(max(width, 50), self.max_size[0]))
+        height = int(min(max(height, 50), self.max_size[1]))
+        self._seq += 1
+        self._conn.send(("frame", self._seq, n, width, height))
+        self.busy = True
+        self.sent += 1
+        return True
+
+    def poll(self):
+        frame = None
+        try:
+            while self._conn.poll():
+                msg = self._conn.recv()
+                if msg[0] == "ready":
+                    self.ready = True
+                elif msg[0] == "frame":
+                    _, _, w, h, self.render_time = msg
+                    self.busy = False
+                    self.received += 1
+                    frame = np.ndarray((h, w, 4), dtype=np.uint8, buffer=self._frame_shm.buf)
+        except (EOFError, OSError):
+            # Process vẽ đã thoát: GUI kiểm tra alive để quay về vẽ trong process chính
+            self.ready = False
+        return frame
+
+    def reset(self):
+        if self.ready:
+            self._conn.send(("reset",))
+
+    def close(self, timeout=1.0):
+        if self._proc is not None:
+            try:
+                self._conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            self._proc.join(timeout)
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._conn.close()
+            self._proc = None
+        self._data = None
+        for shm in (self._data_shm, self._frame_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._data_shm = self._frame_shm = None
+        self.ready = self.busy = False
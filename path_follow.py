@@ -0,0 +1,211 @@
+import math
+
+import numpy as np
+
+
+class ReferencePath:
+    """Đường tham chiếu (polyline) cho bộ bám đường.
+
+    - s[i]: độ dài cung từ điểm đầu tới điểm i -> điểm tại độ dài cung bất kỳ
+      tìm bằng tìm kiếm nhị phân (point_at).
+    - Chỉ mục ô vuông (tile) trên các đoạn: tìm đoạn gần nhất toàn cục chỉ xét
+      các ô quanh robot, không duyệt cả đường.
+    - nearest(x, y, hint): tìm trong cửa sổ `window` đoạn quanh lần khớp trước;
+      khớp ở mép cửa sổ thì trượt cửa sổ theo, lạc hẳn mới dùng chỉ mục ô.
+      Đường tự cắt (hình số 8) không làm robot "nhảy" sang nhánh khác.
+    """
+
+    def __init__(self, xs, ys, tile=None, window=64, lost_dist=0.5):
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        # Bỏ điểm trùng liên tiếp (đoạn dài 0)
+        keep = np.concatenate(([True], np.hypot(np.diff(xs), np.diff(ys)) > 0))
+        self.xs, self.ys = xs[keep], ys[keep]
+        if len(self.xs) < 2:
+            raise ValueError("Đường tham chiếu cần ít nhất 2 điểm khác nhau")
+        self.seg_len = np.hypot(np.diff(self.xs), np.diff(self.ys))
+        self.s = np.concatenate(([0.0], np.cumsum(self.seg_len)))
+        self.length = float(self.s[-1])
+        self.window = window
+        # Xa đường hơn lost_dist (robot bị dời đi / reset): tìm lại toàn cục
+        self.lost_dist = lost_dist
+        # Cạnh ô mặc định: độ dài / sqrt(số đoạn) -> mỗi ô cỡ sqrt(n) đoạn
+        self.tile = tile if tile is not None else max(self.length / math.sqrt(len(self.seg_len)), 1e-3)
+        self._build_index()
+
+    @classmethod
+    def load(cls, path, **kw):
+        # .npy (N, 2) hoặc file chữ 2 cột x, y (CSV / cách bằng khoảng trắng, dòng tiêu đề bị bỏ)
+        if path.endswith(".npy"):
+            pts = np.load(path)
+        else:
+            delimiter = "," if path.endswith(".csv") else None
+            pts = np.genfromtxt(path, delimiter=delimiter, usecols=(0, 1))
+            pts = pts[~np.isnan(pts).any(axis=1)]
+        pts = np.asarray(pts, dtype=float).reshape(-1, 2)
+        return cls(pts[:, 0], pts[:, 1], **kw)
+
+    @classmethod
+    def demo(cls, n=100_000, a=1.5):
+        # Hình số 8 (lemniscate Gerono) qua gốc toạ độ, n điểm: đường dài, tự cắt
+        t = np.linspace(0, 2 * np.pi, n)
+        return cls(a * np.sin(t), a * np.sin(t) * np.cos(t))
+
+    def _build_index(self):
+        t = self.tile
+        x0, x1 = self.xs[:-1], self.xs[1:]
+        y0, y1 = self.ys[:-1], self.ys[1:]
+        tx0, tx1 = np.floor(np.minimum(x0, x1) / t).astype(int), np.floor(np.maximum(x0, x1) / t).astype(int)
+        ty0, ty1 = np.floor(np.minimum(y0, y1) / t).astype(int), np.floor(np.maximum(y0, y1) / t).astype(int)
+        # Đa số đoạn nằm gọn trong 1 ô: gom bằng NumPy; đoạn dài thì đăng ký mọi ô bbox chạm tới
+        single = (tx0 == tx1) & (ty0 == ty1)
+        keys_x, keys_y, segs = [tx0[single]], [ty0[single]], [np.flatnonzero(single)]
+        for i in np.flatnonzero(~single):
+            gx, gy = np.meshgrid(np.arange(tx0[i], tx1[i] + 1), np.arange(ty0[i], ty1[i] + 1))
+            keys_x.append(gx.ravel())
+            keys_y.append(gy.ravel())
+            segs.append(np.full(gx.size, i))
+        kx, ky, seg = np.concatenate(keys_x), np.concatenate(keys_y), np.concatenate(segs)
+        order = np.lexsort((seg, ky, kx))
+        kx, ky, seg = kx[order], ky[order], seg[order]
+        starts = np.flatnonzero(np.concatenate(([True], (np.diff(kx) != 0) | (np.diff(ky) != 0))))
+        bounds = np.append(starts, len(seg))
+        self.tiles = {(int(kx[a]), int(ky[a])): seg[a:b] for a, b in zip(bounds[:-1], bounds[1:])}
+        self._tile_bounds = (kx.min(), kx.max(), ky.min(), ky.max())
+
+    def _project(self, idx, x, y):
+        # Chiếu (x, y) lên các đoạn idx -> (đoạn gần nhất, tham số u trên đoạn, khoảng cách)
+        ax, ay = self.xs[idx], self.ys[idx]
+        dx, dy = self.xs[idx + 1] - ax, self.ys[idx + 1] - ay
+        u = np.clip(((x - ax) * dx + (y - ay) * dy) / (self.seg_len[idx] ** 2), 0.0, 1.0)
+        d2 = (x - ax - u * dx) ** 2 + (y - ay - u * dy) ** 2
+        k = int(np.argmin(d2))
+        return int(idx[k]), float(u[k]), math.sqrt(d2[k])
+
+    def _nearest_global(self, x, y):
+        # Duyệt các vòng ô quanh robot cho tới khi vòng đã xét phủ hết khoảng cách tốt nhất
+        t = self.tile
+        cx, cy = math.floor(x / t), math.floor(y / t)
+        kx0, kx1, ky0, ky1 = self._tile_bounds
+        max_ring = max(abs(cx - kx0), abs(cx - kx1), abs(cy - ky0), abs(cy - ky1))
+        if max_ring > 64:
+            # Robot ở rất xa đường: duyệt cả đường một lần (vector hoá)
+            return self._project(np.arange(len(self.seg_len)), x, y)
+        best = None
+        for ring in range(max_ring + 1):
+            cand = [self.tiles[(tx, ty)]
+                    for tx in range(cx - ring, cx + ring + 1)
+                    for ty in range(cy - ring, cy + ring + 1)
+                    if max(abs(tx - cx), abs(ty - cy)) == ring and (tx, ty) in self.tiles]
+            if cand:
+                hit = self._project(np.concatenate(cand), x, y)
+                if best is None or hit[2] < best[2]:
+                    best = hit
+            if best is not None and best[2] <= ring * t:
+                break
+        return best
+
+    def nearest(self, x, y, hint=None):
+        """Điểm gần nhất trên đường: (chỉ số đoạn, u trong [0, 1], khoảng cách)."""
+        n = len(self.seg_len)
+        if hint is not None:
+            back = self.window // 4
+            for _ in range(8):
+                lo, hi = max(hint - back, 0), min(hint + self.window, n)
+                i, u, d = self._project(np.arange(lo, hi), x, y)
+                at_edge = (i == lo and lo > 0) or (i == hi - 1 and hi < n)
+                if not at_edge:
+                    if d <= self.lost_dist:
+                        return i, u, d
+                    break
+                hint = i
+        return self._nearest_global(x, y)
+
+    def arc_length(self, i, u):
+        return float(self.s[i] + u * self.seg_len[i])
+
+    def point_at(self, s):
+        # Điểm tại độ dài cung s (tìm kiếm nhị phân trên s)
+        s = min(max(s, 0.0), self.length)
+        i = min(int(np.searchsorted(self.s, s, side="right")) - 1, len(self.seg_len) - 1)
+        u = (s - self.s[i]) / self.seg_len[i]
+        return (self.xs[i] + u * (self.xs[i + 1] - self.xs[i]),
+                self.ys[i] + u * (self.ys[i + 1] - self.ys[i]))
+
+    def cross_track(self, i, u, x, y):
+        # Sai lệch ngang có dấu: dương khi robot ở bên trái hướng đi của đường
+        dx, dy = self.xs[i + 1] - self.xs[i], self.ys[i + 1] - self.ys[i]
+        px, py = self.xs[i] + u * dx, self.ys[i] + u * dy
+        return float((dx * (y - py) - dy * (x - px)) / self.seg_len[i])
+
+
+class PurePursuit:
+    """Bám đường pure pursuit cho robot vi sai: tư thế -> (wl, wr).
+
+    Điểm nhìn trước cách điểm gần nhất `lookahead` m theo độ dài cung;
+    w = 2 v sin(alpha) / L, v giảm theo cos(alpha) (quay tại chỗ khi điểm đích ở phía sau)
+    và giảm dần trong đoạn L cuối đường. Tới cuối đường thì dừng (done).
+    """
+
+    def __init__(self, path, wheel_radius, wheel_distance, lookahead=0.3, speed=0.3,
+                 max_wheel=20.0, goal_tol=0.02):
+        self.path = path
+        self.r = wheel_radius
+        self.D = wheel_distance
+        self.lookahead = lookahead
+        self.speed = speed
+        self.max_wheel = max_wheel
+        self.goal_tol = goal_tol
+        self.reset()
+
+    def reset(self):
+        self.index = None       # Đoạn khớp lần trước (gợi ý cho tìm kiếm theo cửa sổ)
+        self.progress = 0.0     # Độ dài cung đã đi (m)
+        self.cte = math.nan     # Sai lệch ngang gần nhất (m)
+        self.done = False
+
+    def command(self, x, y, theta):
+        path = self.path
+        i, u, _ = path.nearest(x, y, self.index)
+        self.index = i
+        self.progress = path.arc_length(i, u)
+        self.cte = path.cross_track(i, u, x, y)
+
+        remaining = path.length - self.progress
+        gx, gy = path.xs[-1], path.ys[-1]
+        if self.done or (remaining <= self.goal_tol and math.hypot(gx - x, gy - y) <= self.goal_tol):
+            self.done = True
+            return 0.0, 0.0
+
+        lx, ly = path.point_at(self.progress + self.lookahead)
+        if remaining < self.lookahead:
+            # Đoạn cuối: nhắm thẳng vào điểm cuối
+            lx, ly = gx, gy
+        dx, dy = lx - x, ly - y
+        c, s = math.cos(theta), math.sin(theta)
+        alpha = math.atan2(-s * dx + c * dy, c * dx + s * dy)
+        dist = max(math.hypot(dx, dy), 1e-6)
+
+        speed = self.speed * min(1.0, max(remaining, dist) / self.lookahead)
+        v = speed * max(math.cos(alpha), 0.0)
+        w = 2 * speed * math.sin(alpha) / max(dist, self.lookahead * 0.5)
+
+        wr = (v + w * self.D / 2) / self.r
+        wl = (v - w * self.D / 2) / self.r
+        peak = max(abs(wl), abs(wr))
+        if peak > self.max_wheel:
+            # Giữ tỉ lệ 2 bánh (giữ độ cong), chỉ giảm tốc
+            wl, wr = wl * self.max_wheel / peak, wr * self.max_wheel / peak
+        return wl, wr
+
+
+class PathFollowInput:
+    """input_source cho SimulationRunner: mỗi bước vật lý tính (wl, wr) từ tư thế hiện tại."""
+
+    def __init__(self, controller, runner):
+        self.controller = controller
+        self.runner = runner
+
+    def __call__(self, t):
+        rb = self.runner.robot
+        return self.controller.command(rb.x, rb.y, rb.theta)
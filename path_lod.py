@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+
+
+def _tiles_crossed(x0, y0, x1, y1, t):
+    # Các ô cạnh t mà đoạn thẳng đi qua (duyệt lưới Amanatides-Woo): O(độ dài / t), không theo bbox
+    tx, ty = math.floor(x0 / t), math.floor(y0 / t)
+    tx1, ty1 = math.floor(x1 / t), math.floor(y1 / t)
+    dx, dy = x1 - x0, y1 - y0
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    # Tham số (0..1 trên đoạn) tới biên ô kế tiếp theo x / y, và bước tham số khi qua 1 ô
+    next_x = ((tx + (sx > 0)) * t - x0) / dx if dx else math.inf
+    next_y = ((ty + (sy > 0)) * t - y0) / dy if dy else math.inf
+    step_x = t / abs(dx) if dx else math.inf
+    step_y = t / abs(dy) if dy else math.inf
+    cells = [(tx, ty)]
+    for _ in range(abs(tx1 - tx) + abs(ty1 - ty)):
+        # Đã tới cột / hàng cuối thì chỉ còn bước theo trục kia (tránh lệch do làm tròn)
+        if ty == ty1 or (tx != tx1 and next_x < next_y):
+            tx += sx
+            next_x += step_x
+        else:
+            ty += sy
+            next_y += step_y
+        cells.append((tx, ty))
+    return cells
+
+
+class _Level:
+    """Một mức chi tiết: polyline đã đơn giản hoá với sai số `tol` + chỉ mục ô (tile)."""
+
+    def __init__(self, tol, tile):
+        self.tol = tol
+        self.tile = tile
+        self.xs = np.empty(1024)
+        self.ys = np.empty(1024)
+        self.n = 0
+        # (tx, ty) -> danh sách chỉ số đoạn i (đoạn nối đỉnh i-1 -> i)
+        self.tiles = {}
+        # Trạng thái Reumann-Witkam: đỉnh neo A, điểm hướng B, điểm chờ P
+        self._a = None
+        self._b = None
+        self._p = None
+
+    def _push(self, x, y):
+        if self.n == len(self.xs):
+            self.xs = np.resize(self.xs, 2 * self.n)
+            self.ys = np.resize(self.ys, 2 * self.n)
+        i = self.n
+        self.xs[i] = x
+        self.ys[i] = y
+        self.n += 1
+        if i > 0:
+            # Đăng ký đoạn vào các ô nó thực sự đi qua (đoạn thẳng dài không tốn theo diện tích bbox)
+            for key in _tiles_crossed(self.xs[i - 1], self.ys[i - 1], x, y, self.tile):
+                self.tiles.setdefault(key, []).append(i)
+
+    def add(self, x, y):
+        # Trả về đỉnh mới được giữ lại (để đưa tiếp lên mức thô hơn) hoặc None
+        if self._a is None:
+            self._a = (x, y)
+            self._push(x, y)
+            return (x, y)
+        if self._b is None:
+            if (x, y) != self._a:
+                self._b = (x, y)
+            self._p = (x, y)
+            return None
+
+        ax, ay = self._a
+        dx, dy = self._b[0] - ax, self._b[1] - ay
+        norm = math.hypot(dx, dy)
+        # Khoảng cách từ Q tới đường thẳng AB, và Q có đi lùi so với P không
+        dist = abs((x - ax) * dy - (y - ay) * dx) / norm
+        back = ((x - self._p[0]) * dx + (y - self._p[1]) * dy) < 0
+        kept = None
+        if dist > self.tol or back:
+            kept = self._p
+            self._push(*kept)
+            self._a = kept
+            self._b = (x, y) if (x, y) != kept else None
+        self._p = (x, y)
+        return kept
+
+    def tail(self):
+        # Điểm mới nhất chưa được giữ lại (nối từ đỉnh cuối tới vị trí hiện tại)
+        return self._p
+
+
+class PathLOD:
+    """Quỹ đạo đầy đủ nhiều mức chi tiết, vẽ theo khung nhìn.
+
+    - Mỗi mức đơn giản hoá tăng dần (Reumann-Witkam, chạy tăng dần từng điểm),
+      mức k+1 lấy đầu vào là các đỉnh của mức k.
+    - Mỗi mức có chỉ mục ô vuông; query() chọn mức có sai số <= 1 pixel và chỉ
+      lấy các đoạn nằm trong khung nhìn -> chi phí theo số pixel, không theo độ dài quỹ đạo.
+    """
+
+    def __init__(self, base_tol=0.0005, factor=4, levels=8, tile_px=128):
+        # Mức k có sai số base_tol * factor^k, cạnh ô = tile_px * sai số
+        self.base_tol = base_tol
+        self.factor = factor
+        self.n_levels = levels
+        self.tile_px = tile_px
+        self.clear()
+
+    def append(self, x, y):
+        self.count += 1
+        pt = (float(x), float(y))
+        for level in self.levels:
+            pt = level.add(*pt)
+            if pt is None:
+                break
+
+    def clear(self):
+        self.levels = []
+        tol = self.base_tol
+        for _ in range(self.n_levels):
+            self.levels.append(_Level(tol, tol * self.tile_px))
+            tol *= self.factor
+        self.count = 0
+
+    def pick_level(self, pixel_size):
+        # Mức thô nhất mà sai số vẫn không vượt quá 1 pixel
+        best = self.levels[0]
+        for level in self.levels:
+            if level.tol <= pixel_size and level.n > 1:
+                best = level
+        return best
+
+    def query(self, xmin, xmax, ymin, ymax, pixel_size):
+        if self.count == 0:
+            return np.empty(0), np.empty(0)
+        level = self.pick_level(pixel_size)
+        t = level.tile
+        tx0, tx1 = math.floor(xmin / t), math.floor(xmax / t)
+        ty0, ty1 = math.floor(ymin / t), math.floor(ymax / t)
+
+        tiles = level.tiles
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > len(tiles):
+            keys = [k for k in tiles if tx0 <= k[0] <= tx1 and ty0 <= k[1] <= ty1]
+        else:
+            keys = [(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)
+                    if (tx, ty) in tiles]
+
+        n = level.n
+        if keys:
+            seg = np.concatenate([np.asarray(tiles[k]) for k in keys])
+            # Mỗi đoạn i cần 2 đỉnh i-1 và i
+            idx = np.unique(np.concatenate((seg - 1, seg)))
+        else:
+            idx = np.empty(0, dtype=int)
+
+        xs, ys = level.xs[idx], level.ys[idx]
+        # Ngắt nét (NaN) giữa các đoạn không liền nhau
+        gaps = np.flatnonzero(np.diff(idx) > 1) + 1
+        if len(gaps):
+            xs = np.insert(xs, gaps, np.nan)
+            ys = np.insert(ys, gaps, np.nan)
+
+        # Nối đỉnh cuối của mức này tới vị trí hiện tại
+        tail = [level.xs[n - 1], level.ys[n - 1]]
+        p = self.levels[0].tail()
+        if p is not None:
+            if len(idx) == 0 or idx[-1] != n - 1:
+                xs = np.append(xs, [np.nan, tail[0]])
+                ys = np.append(ys, [np.nan, tail[1]])
+            xs = np.append(xs, p[0])
+            ys = np.append(ys, p[1])
+        return xs, ys
@@ -0,0 +1,180 @@
+import math
+import time
+
+import numpy as np
+
+# Các công đoạn trong một vòng RobotGUI.loop
+STAGES = ("physics", "telemetry", "lidar", "draw_robot", "labels", "update_graphs")
+
+
+class LogHistogram:
+    """Histogram thời gian theo thang log (1 µs .. ~17 phút), ghi O(1), không cấp phát.
+
+    Mỗi quãng gấp đôi chia làm `per_octave` ô -> sai số phân vị khoảng 2^(1/per_octave).
+    """
+
+    def __init__(self, base=1e-6, octaves=30, per_octave=8):
+        self.base = base
+        self.per_octave = per_octave
+        self.counts = np.zeros(octaves * per_octave + 1, dtype=np.int64)
+        self.total = 0
+
+    def record(self, seconds):
+        if seconds <= self.base:
+            i = 0
+        else:
+            i = min(int(math.log2(seconds / self.base) * self.per_octave) + 1, len(self.counts) - 1)
+        self.counts[i] += 1
+        self.total += 1
+
+    def percentile(self, q):
+        # Trả về cận trên của ô chứa phân vị q (0..100), đơn vị giây
+        if self.total == 0:
+            return 0.0
+        target = math.ceil(self.total * q / 100)
+        i = int(np.searchsorted(np.cumsum(self.counts), max(target, 1)))
+        return self.base * 2 ** (i / self.per_octave)
+
+    def clear(self):
+        self.counts[:] = 0
+        self.total = 0
+
+
+class FrameProfiler:
+    """Đo thời gian từng công đoạn của mỗi khung hình.
+
+    begin_frame() -> mark("physics") -> mark("draw_robot") ... -> end_frame()
+    mark(stage) tính thời gian từ mốc trước đến hiện tại cho công đoạn đó.
+    Ngoài histogram còn giữ trace `trace_len` khung gần nhất để xuất file.
+    """
+
+    def __init__(self, stages=STAGES, trace_len=20000, rate_window=1.0):
+        self.stages = tuple(stages)
+        self._col = {s: i for i, s in enumerate(self.stages)}
+        self.hist = {s: LogHistogram() for s in self.stages}
+        self.frame_hist = LogHistogram()     # Thời gian làm việc của cả khung
+        self.interval_hist = LogHistogram()  # Khoảng cách giữa 2 khung (-> FPS)
+
+        # Trace vòng: [t_bắt_đầu, sim_t, các công đoạn..., tổng]
+        self.trace = np.zeros((trace_len, len(self.stages) + 3))
+        self.frames = 0
+
+        self.rate_window = rate_window
+        self._t_frame = None
+        self._t_mark = None
+        self._row = None
+        self._rates_ref = None
+        self.fps = 0.0
+        self.sim_ratio = 0.0
+        self.counter_rate = 0.0
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self._t_frame is not None:
+            self.interval_hist.record(now - self._t_frame)
+        self._t_frame = now
+        self._t_mark = now
+        self._row = self.trace[self.frames % len(self.trace)]
+        self._row[:] = 0.0
+        self._row[0] = now
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        dt = now - self._t_mark
+        self._t_mark = now
+        self.hist[stage].record(dt)
+        self._row[2 + self._col[stage]] += dt
+
+    def end_frame(self, sim_t=0.0, counter=0):
+        # counter: bộ đếm tăng dần bất kỳ (ví dụ số mẫu UART) để tính tốc độ/giây
+        now = time.perf_counter()
+        total = now - self._t_frame
+        self.frame_hist.record(total)
+        self._row[1] = sim_t
+        self._row[-1] = total
+        self.frames += 1
+
+        if self._rates_ref is None:
+            self._rates_ref = (now, sim_t, counter, self.frames)
+            return
+        t0, sim0, c0, f0 = self._rates_ref
+        span = now - t0
+        if span >= self.rate_window:
+            self.fps = (self.frames - f0) / span
+            self.sim_ratio = (sim_t - sim0) / span
+            self.counter_rate = (counter - c0) / span
+            self._rates_ref = (now, sim_t, counter, self.frames)
+
+    def percentile_ms(self, stage, q):
+        hist = self.frame_hist if stage == "frame" else self.hist[stage]
+        return hist.percentile(q) * 1e3
+
+    def summary(self):
+        out = {
+            "frames": self.frames,
+            "fps": self.fps,
+            "sim_ratio": self.sim_ratio,
+            "frame_p50_ms": self.percentile_ms("frame", 50),
+            "frame_p99_ms": self.percentile_ms("frame", 99),
+        }
+        for s in self.stages:
+            out[f"{s}_p50_ms"] = self.percentile_ms(s, 50)
+            out[f"{s}_p99_ms"] = self.percentile_ms(s, 99)
+        return out
+
+    def export(self, path):
+        # Ghi trace ra CSV (thời gian theo ms, t_wall tính từ khung đầu tiên còn giữ)
+        n = min(self.frames, len(self.trace))
+        start = self.frames - n
+        rows = self.trace[[(start + i) % len(self.trace) for i in range(n)]].copy()
+        if n:
+            rows[:, 0] -= rows[0, 0]
+        rows[:, 0] *= 1e3
+        rows[:, 2:] *= 1e3
+        header = ",".join(["t_wall_ms", "sim_t"] + [f"{s}_ms" for s in self.stages] + ["frame_ms"])
+        np.savetxt(path, rows, delimiter=",", header=header, comments="", fmt="%.4f")
+        return n
+
+    def reset(self):
+        for h in self.hist.values():
+            h.clear()
+        self.frame_hist.clear()
+        self.interval_hist.clear()
+        self.frames = 0
+        self._t_frame = None
+        self._rates_ref = None
+
+
+class StartupTimer:
+    """Thời gian từng giai đoạn khởi động GUI.
+
+    mark(tên): giai đoạn nối tiếp, tính từ mốc trước (mốc đầu = t0, trước các import).
+    ready(): cửa sổ đã dùng được. record(tên, giây): việc làm trễ / chạy nền sau đó,
+    không tính vào thời gian khởi động.
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._last = self.t0
+        self.phases = []       # [(tên, giây)]
+        self.deferred = []     # [(tên, giây)]
+        self.ready_s = None
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def ready(self, name="hiện cửa sổ"):
+        self.mark(name)
+        self.ready_s = self._last - self.t0
+
+    def record(self, name, seconds):
+        self.deferred.append((name, seconds))
+
+    def report(self):
+        lines = [f"{name:<24}{sec * 1e3:8.1f} ms" for name, sec in self.phases]
+        if self.ready_s is not None:
+            lines.append(f"{'= dùng được sau':<24}{self.ready_s * 1e3:8.1f} ms")
+        lines += [f"{'(sau) ' + name:<24}{sec * 1e3:8.1f} ms" for name, sec in self.deferred]
+        return "\n".join(lines)
@@ -0,0 +1,357 @@
+import struct
+import threading
+
+import numpy as np
+
+from telemetry import MinMaxPyramid
+
+# --- ĐỊNH DẠNG FILE ---
+# MAGIC | chunk | chunk | ... | chunk INDX | TRAILER
+# chunk  = CHUNK_HEADER(kind, count, t0, t1, payload_len) + payload
+#   TICK: count bản ghi TICK_DTYPE
+#   UART: count bản ghi RAW_DTYPE (t, offset, len) + các byte thô nối liền
+#   INDX: count bản ghi INDEX_DTYPE (chỉ mục mọi chunk, ghi lúc đóng file)
+# TRAILER = offset của chunk INDX + END_MAGIC
+# File chỉ ghi nối thêm; nếu chương trình chết giữa chừng (không có INDX),
+# RunReplay quét lại các header chunk để dựng chỉ mục.
+MAGIC = b"RBREC1\0\0"
+END_MAGIC = b"RBRECEND"
+CHUNK_HEADER = struct.Struct("<4sIddQ")
+TRAILER = struct.Struct("<Q8s")
+
+TICK_DTYPE = np.dtype([("t", "<f8"), ("x", "<f8"), ("y", "<f8"), ("theta", "<f8"),
+                       ("v", "<f8"), ("w", "<f8"), ("wl", "<f8"), ("wr", "<f8")])
+RAW_DTYPE = np.dtype([("t", "<f8"), ("offset", "<u4"), ("length", "<u4")])
+INDEX_DTYPE = np.dtype([("kind", "S4"), ("offset", "<u8"), ("count", "<u4"),
+                        ("t0", "<f8"), ("t1", "<f8")])
+
+# Kênh telemetry tương ứng với trường trong TICK_DTYPE
+TELEMETRY_FIELDS = {"T": "t", "X": "x", "Y": "y", "Theta": "theta",
+                    "V": "v", "W": "w", "WL": "wl", "WR": "wr"}
+
+
+class RunRecorder:
+    """Ghi phiên chạy ra file nhị phân theo từng chunk, bộ đệm có giới hạn.
+
+    record_tick() gọi mỗi lần lấy mẫu (luồng GUI); record_raw() nhận byte UART
+    thô (luồng đọc serial). Đệm đầy thì ghi cả chunk xuống file.
+    Cả hai nhận thời gian mô phỏng; new_segment() khi mô phỏng reset (t về 0)
+    cộng thêm độ lệch để thời gian trong file luôn tăng (RunReplay tìm kiếm nhị phân theo t).
+    """
+
+    def __init__(self, path, chunk_ticks=4096, raw_chunk_bytes=64 * 1024):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._index = []
+        self._lock = threading.Lock()
+
+        self._ticks = np.zeros(chunk_ticks, dtype=TICK_DTYPE)
+        self._n_ticks = 0
+
+        self.raw_chunk_bytes = raw_chunk_bytes
+        self._raw = []
+        self._raw_bytes = 0
+        self._raw_lock = threading.Lock()
+
+        self.ticks_written = 0
+        self.raw_bytes_written = 0
+
+        self.t_offset = 0.0
+        self._t_last = 0.0
+
+    def new_segment(self):
+        # Mô phỏng bắt đầu lại từ t = 0: nối tiếp sau mẫu cuối đã ghi
+        self.t_offset = self._t_last
+
+    def record_tick(self, t, x, y, theta, v, w, wl, wr):
+        t += self.t_offset
+        self._t_last = t
+        self._ticks[self._n_ticks] = (t, x, y, theta, v, w, wl, wr)
+        self._n_ticks += 1
+        if self._n_ticks == len(self._ticks):
+            self._flush_ticks()
+
+    def record_raw(self, t, data):
+        t += self.t_offset
+        with self._raw_lock:
+            self._raw.append((t, bytes(data)))
+            self._raw_bytes += len(data)
+            full = self._raw_bytes >= self.raw_chunk_bytes
+        if full:
+            self._flush_raw()
+
+    def _write_chunk(self, kind, count, t0, t1, payload):
+        with self._lock:
+            if self._f is None:
+                return
+            offset = self._f.tell()
+            self._f.write(CHUNK_HEADER.pack(kind, count, t0, t1, len(payload)))
+            self._f.write(payload)
+            self._index.append((kind, offset, count, t0, t1))
+
+    def _flush_ticks(self):
+        n = self._n_ticks
+        if n == 0:
+            return
+        block = self._ticks[:n]
+        self._write_chunk(b"TICK", n, block["t"][0], block["t"][-1], block.tobytes())
+        self.ticks_written += n
+        self._n_ticks = 0
+
+    def _flush_raw(self):
+        with self._raw_lock:
+            items, self._raw, self._raw_bytes = self._raw, [], 0
+        if not items:
+            return
+        table = np.zeros(len(items), dtype=RAW_DTYPE)
+        offset = 0
+        for i, (t, data) in enumerate(items):
+            table[i] = (t, offset, len(data))
+            offset += len(data)
+        payload = table.tobytes() + b"".join(d for _, d in items)
+        self._write_chunk(b"UART", len(items), items[0][0], items[-1][0], payload)
+        self.raw_bytes_written += offset
+
+    def flush(self):
+        self._flush_ticks()
+        self._flush_raw()
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._f is None:
+                return
+            index = np.array(self._index, dtype=INDEX_DTYPE)
+            offset = self._f.tell()
+            t0 = index["t0"].min() if len(index) else 0.0
+            t1 = index["t1"].max() if len(index) else 0.0
+            self._f.write(CHUNK_HEADER.pack(b"INDX", len(index), t0, t1, index.nbytes))
+            self._f.write(index.tobytes())
+            self._f.write(TRAILER.pack(offset, END_MAGIC))
+            self._f.close()
+            self._f = None
+
+
+class RunReplay:
+    """Đọc file ghi bằng memory-map: không nạp cả file vào RAM.
+
+    Chỉ mục thời gian (t0 của từng chunk) + tìm kiếm nhị phân trong chunk
+    cho phép nhảy tới thời điểm bất kỳ ngay lập tức.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self.mm[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path}: không phải file ghi robot")
+        index = self._read_index()
+        self.recovered = index is None
+        if index is None:
+            index = self._scan_index()
+
+        self._ticks = []   # view (không copy) vào memmap của từng chunk TICK
+        self._raw = []     # (bảng RAW_DTYPE, offset byte thô)
+        for kind, offset, count in zip(index["kind"], index["offset"], index["count"]):
+            start = int(offset) + CHUNK_HEADER.size
+            if kind == b"TICK":
+                end = start + int(count) * TICK_DTYPE.itemsize
+                self._ticks.append(self.mm[start:end].view(TICK_DTYPE))
+            elif kind == b"UART":
+                end = start + int(count) * RAW_DTYPE.itemsize
+                self._raw.append((self.mm[start:end].view(RAW_DTYPE), end))
+
+        self._tick_t0 = np.array([c["t"][0] for c in self._ticks])
+        self._tick_counts = np.cumsum([0] + [len(c) for c in self._ticks])
+        self._pyramid = None
+
+    def _read_index(self):
+        if len(self.mm) < len(MAGIC) + TRAILER.size:
+            return None
+        offset, end = TRAILER.unpack(bytes(self.mm[-TRAILER.size:]))
+        if end != END_MAGIC:
+            return None
+        _, _, _, _, size = CHUNK_HEADER.unpack(bytes(self.mm[offset:offset + CHUNK_HEADER.size]))
+        start = offset + CHUNK_HEADER.size
+        return self.mm[start:start + size].view(INDEX_DTYPE)
+
+    def _scan_index(self):
+        # File không đóng đúng cách: đi qua các header, bỏ chunk cuối bị cắt dở
+        entries = []
+        pos = len(MAGIC)
+        n = len(self.mm)
+        while pos + CHUNK_HEADER.size <= n:
+            kind, count, t0, t1, size = CHUNK_HEADER.unpack(bytes(self.mm[pos:pos + CHUNK_HEADER.size]))
+            if kind not in (b"TICK", b"UART") or pos + CHUNK_HEADER.size + size > n:
+                break
+            entries.append((kind, pos, count, t0, t1))
+            pos += CHUNK_HEADER.size + size
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self._tick_counts[-1])
+
+    @property
+    def t_start(self):
+        return float(self._ticks[0]["t"][0]) if self._ticks else 0.0
+
+    @property
+    def t_end(self):
+        return float(self._ticks[-1]["t"][-1]) if self._ticks else 0.0
+
+    def _searchsorted(self, t, side="left"):
+        # Như np.searchsorted trên thời gian của mọi mẫu (các chunk nối lại), không copy
+        c = int(np.searchsorted(self._tick_t0, t, side="right")) - 1
+        if c < 0:
+            return 0
+        return int(self._tick_counts[c]) + int(np.searchsorted(self._ticks[c]["t"], t, side=side))
+
+    def _locate(self, t):
+        # Chỉ số toàn cục của mẫu cuối cùng có thời gian <= t
+        return self._searchsorted(t, side="right") - 1
+
+    def _slice(self, i0, i1):
+        # Mẫu [i0, i1) theo chỉ số toàn cục; chỉ copy khi cắt qua nhiều chunk
+        c0 = int(np.searchsorted(self._tick_counts, i0, side="right")) - 1
+        c1 = int(np.searchsorted(self._tick_counts, i1 - 1, side="right")) - 1
+        parts = []
+        for c in range(c0, c1 + 1):
+            base = int(self._tick_counts[c])
+            parts.append(self._ticks[c][max(i0 - base, 0):min(i1 - base, len(self._ticks[c]))])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def sample_at(self, t):
+        i = max(self._locate(t), 0)
+        return self._slice(i, i + 1)[0]
+
+    def ticks_between(self, t0, t1):
+        i0 = max(self._locate(t0), 0)
+        i1 = self._locate(t1) + 1
+        if i1 <= i0:
+            return np.zeros(0, dtype=TICK_DTYPE)
+        return self._slice(i0, i1)
+
+    def last_ticks(self, t, n):
+        # n mẫu cuối tính tới thời điểm t
+        i1 = self._locate(t) + 1
+        if i1 <= 0:
+            return np.zeros(0, dtype=TICK_DTYPE)
+        return self._slice(max(i1 - n, 0), i1)
+
+    def raw_between(self, t0, t1):
+        out = []
+        for table, data_start in self._raw:
+            if len(table) == 0 or table["t"][-1] < t0 or table["t"][0] > t1:
+                continue
+            for rec in table[(table["t"] >= t0) & (table["t"] <= t1)]:
+                start = data_start + int(rec["offset"])
+                out.append((float(rec["t"]), bytes(self.mm[start:start + int(rec["length"])])))
+        return out
+
+    def pyramid(self):
+        # Kim tự tháp min/max của cả file (dựng một lần) cho đồ thị toàn bộ lần chạy;
+        # mức 0 đọc thẳng từ memmap nên RAM chỉ tốn cho các mức thô
+        if self._pyramid is None:
+            self._pyramid = ReplayPyramid(self)
+        return self._pyramid
+
+    def telemetry_at(self, t, span):
+        # Cửa sổ [t - span, t] với giao diện giống TelemetryStore (dùng cho LivePlot)
+        return ReplayWindow(self.ticks_between(t - span, t), self)
+
+    def close(self):
+        mm = self.mm
+        self.mm = None
+        self._ticks = []
+        self._raw = []
+        self._pyramid = None
+        del mm
+
+
+class ReplayPyramid(MinMaxPyramid):
+    """MinMaxPyramid của một file ghi, chỉ giữ các mức thô trong RAM.
+
+    Các mức >= RAM_LEVEL dựng một lần bằng cách đọc file theo từng khối. Các mức
+    mịn hơn (kể cả mức 0 = mọi mẫu) đọc từ memmap của RunReplay khi query cần:
+    query chỉ lấy <= width_px ô nên đọc tối đa width_px * factor^(RAM_LEVEL-1) mẫu.
+    """
+
+    RAM_LEVEL = 3       # Mức thấp nhất giữ trong RAM (mỗi ô = factor^3 mẫu)
+    BLOCK = 1 << 16     # Số mẫu đọc mỗi lần khi dựng
+
+    def __init__(self, replay):
+        super().__init__([ch for ch in TELEMETRY_FIELDS if ch != "T"])
+        self._replay = replay
+        n = len(replay)
+        self._n[:self.RAM_LEVEL] = [n // self.factor ** k for k in range(self.RAM_LEVEL)]
+        g = self.factor ** self.RAM_LEVEL
+        full = n - n % g
+        block = max(self.BLOCK // g, 1) * g
+        for a in range(0, full, block):
+            t, lo, hi = self._reduce(self.RAM_LEVEL, a, min(a + block, full))
+            self._push(self.RAM_LEVEL, t, lo, hi)
+            self._cascade(self.RAM_LEVEL + 1)
+
+    def _reduce(self, k, a, b):
+        # Ô mức k từ các mẫu [a, b) trên memmap (b - a chia hết cho factor^k)
+        ticks = self._replay._slice(a, b)
+        values = np.column_stack([ticks[TELEMETRY_FIELDS[ch]] for ch in self.channels])
+        g = self.factor ** k
+        if g == 1:
+            return ticks["t"], values, values
+        values = values.reshape(-1, g, len(self.channels))
+        return ticks["t"][::g], np.fmin.reduce(values, axis=1), np.fmax.reduce(values, axis=1)
+
+    @property
+    def t_start(self):
+        return self._replay.t_start
+
+    @property
+    def t_end(self):
+        return self._replay.t_end
+
+    @property
+    def nbytes(self):
+        return sum(self._t[k].nbytes + self._lo[k].nbytes + self._hi[k].nbytes
+                   for k in range(self.RAM_LEVEL, self.n_levels))
+
+    def _search(self, k, t, side="left"):
+        if k >= self.RAM_LEVEL:
+            return super()._search(k, t, side)
+        # Ô i bắt đầu ở mẫu i * g -> số ô có thời gian < t (hoặc <= t) = ceil(số mẫu / g)
+        g = self.factor ** k
+        return min(-(-self._replay._searchsorted(t, side) // g), self._n[k])
+
+    def _cells(self, k, a, b):
+        if k >= self.RAM_LEVEL:
+            return super()._cells(k, a, b)
+        if b <= a:
+            empty = np.empty((0, len(self.channels)))
+            return np.empty(0), empty, empty
+        g = self.factor ** k
+        return self._reduce(k, a * g, b * g)
+
+
+class ReplayWindow:
+    # Bọc một đoạn bản ghi TICK thành đối tượng có window() / __len__ như TelemetryStore
+    def __init__(self, ticks, replay=None):
+        self.ticks = ticks
+        self._replay = replay
+
+    @property
+    def pyramid(self):
+        # Chỉ dựng khi LivePlot ở chế độ toàn bộ lần chạy cần tới
+        return self._replay.pyramid() if self._replay is not None else None
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def window(self, n=None):
+        ticks = self.ticks if n is None else self.ticks[-n:]
+        return {ch: ticks[field] for ch, field in TELEMETRY_FIELDS.items()}
+
+    def last(self, name, n=None):
+        return self.window(n)[name]
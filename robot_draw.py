@@ -1,120 +1,694 @@
-import numpy as np
-import matplotlib.pyplot as plt
-
-def draw_robot(ax, x, y, theta, D, r, path_x=None, path_y=None):
-
-    ax.clear()
-
-    # --- 1. Vẽ Mốc (0,0) & Quỹ đạo ---
-    ax.plot(0, 0, 'rx', markersize=8, label="Start") 
-    ax.grid(True, linestyle=':', alpha=0.6)
-    
-    if path_x is not None and len(path_x) > 1:
-        ax.plot(path_x, path_y, color='green', linestyle='--', linewidth=1)
-
-    # --- 2. Chuẩn bị thông số vẽ ---
-    body_size = D 
-    
-    # Bánh xe
-    wheel_len = r   # Đường kính bánh xe vẽ 
-    wheel_wid = r * 0.5  # Bề rộng bánh xe
-    
-    # Khoảng cách từ tâm xe đến tâm bánh xe (theo trục Y local)
-    wheel_dist_y = body_size / 2 + wheel_wid / 2 + 0.02
-
-    # Ma trận xoay R
-    c, s = np.cos(theta), np.sin(theta)
-    R = np.array([[c, -s], [s, c]])
-
-    def transform(points):
-        # Hàm hỗ trợ xoay và dịch chuyển điểm về toạ độ toàn cục
-        return (R @ points.T).T + np.array([x, y])
-
-    # --- 3. VẼ CÁC CHI TIẾT ---
-
-    # A. KHỚP NỐI (Joints) - Vẽ trước để nó nằm dưới các layer khác
-    # Nối từ tâm thân xe ra tâm bánh xe
-    joint_width = 0.02
-    joint_len = wheel_dist_y * 2
-    joint = np.array([
-        [-joint_width, -joint_len/2], [joint_width, -joint_len/2],
-        [joint_width, joint_len/2], [-joint_width, joint_len/2]
-    ])
-    ax.fill(*transform(joint).T, color="#555555") # Màu xám đậm
-
-    # B. THÂN XE (Hình vuông D x D)
-    body = np.array([
-        [-body_size/2, -body_size/2],
-        [ body_size/2, -body_size/2],
-        [ body_size/2,  body_size/2],
-        [-body_size/2,  body_size/2],
-        [-body_size/2, -body_size/2] # Khép kín
-    ])
-    ax.fill(*transform(body).T, color="#FFC107", edgecolor="black", linewidth=2) # Màu vàng nghệ
-
-    # C. CỤC HÌNH VUÔNG NHỎ (Block) - Trên thân xe, chỗ nối ra bánh
-    block_size = body_size * 0.2 # Kích thước cục nhỏ tỉ lệ theo thân
-    for sign in [-1, 1]: # Vẽ bên trái (-1) và phải (1)
-        # Tọa độ cục nhỏ (nằm sát mép hông)
-        bx = 0
-        by = sign * (body_size/2 - block_size/2)
-        
-        block = np.array([
-            [bx - block_size/2, by - block_size/2],
-            [bx + block_size/2, by - block_size/2],
-            [bx + block_size/2, by + block_size/2],
-            [bx - block_size/2, by + block_size/2]
-        ])
-        ax.fill(*transform(block).T, color="#38FF22", edgecolor="black") # Màu cam đậm
-
-    # D. BÁNH XE (Màu trắng, sọc đen)
-    # Hàm vẽ 1 bánh xe
-    def draw_wheel(center_y):
-        # Hình chữ nhật bánh xe
-        w_poly = np.array([
-            [-wheel_len/2, center_y - wheel_wid/2],
-            [ wheel_len/2, center_y - wheel_wid/2],
-            [ wheel_len/2, center_y + wheel_wid/2],
-            [-wheel_len/2, center_y + wheel_wid/2]
-        ])
-        trans_poly = transform(w_poly)
-        ax.fill(trans_poly[:,0], trans_poly[:,1], color="white", edgecolor="black", linewidth=1.5)
-        
-        # Vẽ sọc đen (Stripes) trên bánh xe
-        num_stripes = 4
-        for i in range(num_stripes):
-            # Tọa độ x dọc theo bánh xe
-            lx = -wheel_len/2 + (i+1) * (wheel_len / (num_stripes + 1))
-            
-            # Tạo đường kẻ ngang
-            stripe = np.array([
-                [lx, center_y - wheel_wid/2],
-                [lx, center_y + wheel_wid/2]
-            ])
-            trans_stripe = transform(stripe)
-            ax.plot(trans_stripe[:,0], trans_stripe[:,1], color="black", linewidth=1.5)
-
-    # Vẽ bánh trái và phải
-    draw_wheel(-wheel_dist_y) # Bánh phải
-    draw_wheel(wheel_dist_y)  # Bánh trái
-
-    # E. MŨI TÊN HƯỚNG (Màu đỏ)
-    heading_start = np.array([0, 0])
-    heading_end = np.array([body_size/2 + 0.2, 0]) # Mũi tên dài hơn thân xe chút
-    
-    p_start = transform(np.array([heading_start]))[0]
-    p_end = transform(np.array([heading_end]))[0]
-    
-    ax.arrow(p_start[0], p_start[1], 
-             p_end[0]-p_start[0], p_end[1]-p_start[1],
-             head_width=0.08, head_length=0.1, fc='red', ec='red', zorder=10)
-
-    # --- 4. Cấu hình Camera ---
-    ax.set_aspect("equal")
-    
-    view_range = max(D, 0.5) * 3 
-    ax.set_xlim(x - view_range/2, x + view_range/2)
-    ax.set_ylim(y - view_range/2, y + view_range/2)
-    
-    ax.set_xlabel("X (m)")
-    ax.set_ylabel("Y (m)")
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+# matplotlib chỉ được import trong RobotRenderer: GUI mặc định vẽ bằng tk.Canvas,
+# khởi động không phải nạp matplotlib
+
+
+@lru_cache(maxsize=16)
+def robot_geometry(D, r):
+    """Hình học robot trong hệ toạ độ LOCAL (tâm xe, trục x hướng đầu xe).
+
+    Chỉ phụ thuộc (D, r) nên được cache, mỗi khung hình chỉ cần 1 phép biến đổi affine.
+    """
+    body_size = D
+
+    # Bánh xe
+    wheel_len = r   # Đường kính bánh xe vẽ
+    wheel_wid = r * 0.5  # Bề rộng bánh xe
+
+    # Khoảng cách từ tâm xe đến tâm bánh xe (theo trục Y local)
+    wheel_dist_y = body_size / 2 + wheel_wid / 2 + 0.02
+
+    # A. Khớp nối: từ tâm thân xe ra tâm bánh xe
+    joint_width = 0.02
+    joint_len = wheel_dist_y * 2
+    joint = np.array([
+        [-joint_width, -joint_len/2], [joint_width, -joint_len/2],
+        [joint_width, joint_len/2], [-joint_width, joint_len/2]
+    ])
+
+    # B. Thân xe (Hình vuông D x D)
+    body = np.array([
+        [-body_size/2, -body_size/2],
+        [ body_size/2, -body_size/2],
+        [ body_size/2,  body_size/2],
+        [-body_size/2,  body_size/2],
+        [-body_size/2, -body_size/2] # Khép kín
+    ])
+
+    # C. Cục hình vuông nhỏ sát mép hông, bên trái (-1) và phải (1)
+    block_size = body_size * 0.2
+    blocks = []
+    for sign in [-1, 1]:
+        bx = 0
+        by = sign * (body_size/2 - block_size/2)
+        blocks.append(np.array([
+            [bx - block_size/2, by - block_size/2],
+            [bx + block_size/2, by - block_size/2],
+            [bx + block_size/2, by + block_size/2],
+            [bx - block_size/2, by + block_size/2]
+        ]))
+
+    # D. Bánh xe + sọc đen
+    wheels, stripes = [], []
+    num_stripes = 4
+    for center_y in [-wheel_dist_y, wheel_dist_y]: # Bánh phải, bánh trái
+        wheels.append(np.array([
+            [-wheel_len/2, center_y - wheel_wid/2],
+            [ wheel_len/2, center_y - wheel_wid/2],
+            [ wheel_len/2, center_y + wheel_wid/2],
+            [-wheel_len/2, center_y + wheel_wid/2]
+        ]))
+        for i in range(num_stripes):
+            lx = -wheel_len/2 + (i+1) * (wheel_len / (num_stripes + 1))
+            stripes.append(np.array([
+                [lx, center_y - wheel_wid/2],
+                [lx, center_y + wheel_wid/2]
+            ]))
+
+    # E. Mũi tên hướng, dài hơn thân xe chút
+    heading_end = np.array([body_size/2 + 0.2, 0])
+
+    return {
+        "joint": joint, "body": body, "blocks": blocks,
+        "wheels": wheels, "stripes": stripes, "heading_end": heading_end,
+    }
+
+
+def camera_range(D):
+    # Kích thước vùng nhìn quanh robot
+    return max(D, 0.5) * 3
+
+
+def footprint_radius(D, r):
+    # Bán kính đường tròn bao thân + bánh xe (kiểm tra va chạm với bản đồ)
+    geom = robot_geometry(D, r)
+    pts = np.vstack([geom["joint"], geom["body"], *geom["wheels"]])
+    return float(np.hypot(pts[:, 0], pts[:, 1]).max())
+
+
+def draw_robot(ax, x, y, theta, D, r, path_x=None, path_y=None):
+    # Vẽ lại toàn bộ (dùng cho xuất ảnh); khi chạy realtime dùng RobotRenderer
+
+    ax.clear()
+
+    # --- 1. Vẽ Mốc (0,0) & Quỹ đạo ---
+    ax.plot(0, 0, 'rx', markersize=8, label="Start")
+    ax.grid(True, linestyle=':', alpha=0.6)
+
+    if path_x is not None and len(path_x) > 1:
+        ax.plot(path_x, path_y, color='green', linestyle='--', linewidth=1)
+
+    # --- 2. Chuẩn bị thông số vẽ ---
+    geom = robot_geometry(D, r)
+
+    # Ma trận xoay R
+    c, s = np.cos(theta), np.sin(theta)
+    R = np.array([[c, -s], [s, c]])
+
+    def transform(points):
+        # Hàm hỗ trợ xoay và dịch chuyển điểm về toạ độ toàn cục
+        return (R @ points.T).T + np.array([x, y])
+
+    # --- 3. VẼ CÁC CHI TIẾT ---
+    ax.fill(*transform(geom["joint"]).T, color="#555555") # Màu xám đậm
+    ax.fill(*transform(geom["body"]).T, color="#FFC107", edgecolor="black", linewidth=2) # Màu vàng nghệ
+    for block in geom["blocks"]:
+        ax.fill(*transform(block).T, color="#38FF22", edgecolor="black")
+
+    for w_poly in geom["wheels"]:
+        trans_poly = transform(w_poly)
+        ax.fill(trans_poly[:,0], trans_poly[:,1], color="white", edgecolor="black", linewidth=1.5)
+    for stripe in geom["stripes"]:
+        trans_stripe = transform(stripe)
+        ax.plot(trans_stripe[:,0], trans_stripe[:,1], color="black", linewidth=1.5)
+
+    p_start = np.array([x, y])
+    p_end = transform(np.array([geom["heading_end"]]))[0]
+    ax.arrow(p_start[0], p_start[1],
+             p_end[0]-p_start[0], p_end[1]-p_start[1],
+             head_width=0.08, head_length=0.1, fc='red', ec='red', zorder=10)
+
+    # --- 4. Cấu hình Camera ---
+    ax.set_aspect("equal")
+
+    view_range = camera_range(D)
+    ax.set_xlim(x - view_range/2, x + view_range/2)
+    ax.set_ylim(y - view_range/2, y + view_range/2)
+
+    ax.set_xlabel("X (m)")
+    ax.set_ylabel("Y (m)")
+
+
+def marker_geometry(x, y, theta, D):
+    # Robot phụ (vẽ đơn giản): thân vuông cạnh D + đoạn chỉ hướng, toạ độ toàn cục
+    c, s = np.cos(theta), np.sin(theta)
+    R = np.array([[c, s], [-s, c]])
+    h = D / 2
+    body = np.array([[-h, -h], [h, -h], [h, h], [-h, h]]) @ R + (x, y)
+    heading = np.array([[0.0, 0.0], [h + 0.1, 0.0]]) @ R + (x, y)
+    return body, heading
+
+
+def nice_step(span, ticks=6):
+    # Bước lưới "đẹp" (1, 2, 5 x 10^k) để có khoảng `ticks` vạch trong span
+    raw = span / ticks
+    base = 10 ** np.floor(np.log10(raw))
+    for m in (1, 2, 5, 10):
+        if m * base >= raw:
+            return m * base
+    return 10 * base
+
+
+def pnm_bytes(img):
+    # Ảnh uint8 (h, w) xám hoặc (h, w, 3|4) màu -> PGM/PPM nhị phân cho tk.PhotoImage(data=...)
+    # (Tk tự đọc, không cần matplotlib / PIL); kênh alpha bị bỏ
+    img = np.ascontiguousarray(img if img.ndim == 2 else img[..., :3], dtype=np.uint8)
+    h, w = img.shape[:2]
+    magic = b"P5" if img.ndim == 2 else b"P6"
+    return b"%s %d %d 255\n" % (magic, w, h) + img.tobytes()
+
+
+def update_photo(photo, img, master):
+    # Chép ảnh vào PhotoImage cũ nếu cùng cỡ, không thì tạo mới; trả về PhotoImage dùng tiếp
+    import tkinter as tk
+
+    data = pnm_bytes(img)
+    h, w = img.shape[:2]
+    if photo is not None and (photo.width(), photo.height()) == (w, h):
+        photo.configure(data=data, format="PPM")
+        return photo
+    return tk.PhotoImage(master=master, data=data, format="PPM")
+
+
+class RobotView(ABC):
+    """Giao diện chung của các backend vẽ robot trong GUI.
+
+    update(x, y, theta, D, r, path_x, path_y) vẽ một khung hình; path_x=None thì
+    lấy quỹ đạo từ path_lod theo viewport() = (xmin, xmax, ymin, ymax, mét/pixel).
+    Camera dời theo robot khi robot lệch khỏi tâm quá follow_margin * view_range.
+    Bản đồ vật cản (set_world) và đường tham chiếu (set_reference) là một phần của nền;
+    điểm quét lidar (set_scan) vẽ mỗi khung.
+    """
+
+    follow_margin = 0.3
+    path_lod = None
+    others = ()
+    world = None
+    scan = None
+    reference = None
+    _center = None
+    _view_range = None
+
+    def set_others(self, robots):
+        # Robot khác vẽ cùng khung (camera vẫn theo robot chính), áp dụng ở lần update kế tiếp:
+        # [(nhãn, x, y, theta, D, màu), ...]
+        self.others = list(robots)
+
+    def set_world(self, world):
+        # world.OccupancyGrid hoặc None; vẽ lại nền ở lần update kế tiếp
+        self.world = world
+        self.invalidate()
+
+    def set_reference(self, lod):
+        # Đường tham chiếu (PathLOD, không đổi khi chạy) hoặc None; chỉ truy vấn khi camera dời
+        self.reference = lod
+        self.invalidate()
+
+    def _reference_in_view(self):
+        if self.reference is None:
+            return np.empty(0), np.empty(0)
+        return self.reference.query(*self.viewport())
+
+    def set_scan(self, xs, ys=None):
+        # Điểm cuối các tia lidar (toạ độ toàn cục); xs=None để ẩn
+        self.scan = None if xs is None else (np.asarray(xs), np.asarray(ys))
+
+    def reset(self, D, r):
+        # Đưa về trạng thái ban đầu: robot tại gốc, không có quỹ đạo
+        self.invalidate()
+        self.update(0, 0, 0, D, r, [], [])
+
+    def invalidate(self):
+        # Bắt buộc đặt lại camera và vẽ lại toàn bộ ở lần update kế tiếp
+        self._center = None
+
+    def _camera_needs_move(self, x, y, view_range):
+        if self._center is None or view_range != self._view_range:
+            return True
+        limit = self.follow_margin * view_range
+        return abs(x - self._center[0]) > limit or abs(y - self._center[1]) > limit
+
+    @abstractmethod
+    def viewport(self):
+        ...
+
+    @abstractmethod
+    def update(self, x, y, theta, D, r, path_x=None, path_y=None):
+        ...
+
+
+class RobotRenderer(RobotView):
+    """Vẽ robot bằng các artist tạo MỘT lần + blitting.
+
+    - Thân, khớp, cục, bánh, sọc, mũi tên nằm ở toạ độ local, dùng chung một
+      Affine2D -> mỗi khung hình chỉ cập nhật 1 phép biến đổi.
+    - Nền (lưới, trục, nhãn) được cache; chỉ khi robot ra khỏi vùng giữa khung
+      nhìn thì camera mới dời.
+    - Tâm camera bám theo lưới thô (bước camera_step * view_range): ảnh nền của
+      `bg_cache` vị trí camera gần nhất được giữ lại, quay lại vị trí cũ chỉ cần
+      chép ảnh nền, không vẽ lại figure. Vẽ lại toàn bộ chỉ xảy ra ở vị trí mới.
+    """
+
+    def __init__(self, ax, follow_margin=0.3, path_lod=None, camera_step=0.25, bg_cache=32):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        # Robot lệch khỏi tâm camera quá follow_margin * view_range -> dời camera
+        self.follow_margin = follow_margin
+        self.camera_step = camera_step
+        # (ô camera, view_range) -> ảnh nền cả figure (gồm nhãn trục nằm ngoài ax.bbox)
+        self._bg_cache = OrderedDict()
+        self._bg_cache_size = bg_cache
+        self._cam_key = None
+        self._fig_size = None
+        # PathLOD: nếu có và update() không nhận path_x/path_y thì vẽ toàn bộ
+        # quỹ đạo, chỉ phần trong khung nhìn, đã giảm chi tiết theo kích thước pixel
+        self.path_lod = path_lod
+
+        from matplotlib.transforms import Affine2D
+        self._tf = Affine2D()
+        self._geom_key = None
+        self._center = None
+        self._view_range = None
+        self._background = None
+
+        self._setup_axes()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _setup_axes(self):
+        from matplotlib.patches import Polygon, FancyArrow
+        ax = self.ax
+        ax.clear()
+        ax.plot(0, 0, 'rx', markersize=8, label="Start")
+        ax.grid(True, linestyle=':', alpha=0.6)
+        ax.set_aspect("equal")
+        ax.set_xlabel("X (m)")
+        ax.set_ylabel("Y (m)")
+
+        tf = self._tf + ax.transData
+        self.path_line, = ax.plot([], [], color='green', linestyle='--', linewidth=1, animated=True)
+        # Đường tham chiếu nằm trong nền (không animated)
+        self.ref_line, = ax.plot([], [], color='#1E88E5', linewidth=1.5, alpha=0.6, zorder=1)
+        self.scan_line, = ax.plot([], [], color='#F44336', marker='.', markersize=2, linewidth=0.5,
+                                  alpha=0.7, animated=True)
+        self._map_image = None
+        self._map_world = None
+
+        def poly(**kw):
+            p = Polygon(np.zeros((3, 2)), closed=True, transform=tf, animated=True, **kw)
+            ax.add_patch(p)
+            return p
+
+        self.joint = poly(color="#555555")
+        self.body = poly(facecolor="#FFC107", edgecolor="black", linewidth=2)
+        self.blocks = [poly(facecolor="#38FF22", edgecolor="black") for _ in range(2)]
+        self.wheels = [poly(facecolor="white", edgecolor="black", linewidth=1.5) for _ in range(2)]
+        # 8 sọc gộp vào 1 Line2D, ngăn cách bằng NaN
+        self.stripes, = ax.plot([], [], color="black", linewidth=1.5, transform=tf, animated=True)
+        self.arrow = FancyArrow(0, 0, 1, 0, head_width=0.08, head_length=0.1,
+                                fc='red', ec='red', zorder=10, transform=tf, animated=True)
+        ax.add_patch(self.arrow)
+
+        self.artists = [self.scan_line, self.path_line, self.joint, self.body, *self.blocks,
+                        *self.wheels, self.stripes, self.arrow]
+        self._other_artists = []
+        self._geom_key = None
+
+    def _set_others(self):
+        from matplotlib.patches import Polygon
+        ax = self.ax
+        for i, (label, x, y, theta, D, color) in enumerate(self.others):
+            if i == len(self._other_artists):
+                group = (Polygon(np.zeros((3, 2)), closed=True, edgecolor="black", animated=True),
+                         ax.plot([], [], color="black", linewidth=2, animated=True)[0],
+                         ax.text(0, 0, "", fontsize=7, ha="center", va="bottom", animated=True))
+                ax.add_patch(group[0])
+                self._other_artists.append(group)
+                self.artists.extend(group)
+            body, head, text = self._other_artists[i]
+            pts, heading = marker_geometry(x, y, theta, D)
+            body.set_xy(pts)
+            body.set_facecolor(color)
+            head.set_data(heading[:, 0], heading[:, 1])
+            text.set_position((x, y + D * 0.8))
+            text.set_text(label)
+            for artist in (body, head, text):
+                artist.set_visible(True)
+        for group in self._other_artists[len(self.others):]:
+            for artist in group:
+                artist.set_visible(False)
+
+    def _set_map(self):
+        # Ảnh bản đồ nằm trong nền (không animated): chỉ vẽ khi dời camera
+        if self._map_image is not None:
+            self._map_image.remove()
+            self._map_image = None
+        world = self._map_world = self.world
+        if world is not None:
+            self._map_image = self.ax.imshow(world.occupied, origin="lower", extent=world.extent,
+                                             cmap="Greys", vmin=0, vmax=1.5, interpolation="nearest",
+                                             zorder=0)
+
+    def _set_geometry(self, D, r):
+        geom = robot_geometry(D, r)
+        self.joint.set_xy(geom["joint"])
+        self.body.set_xy(geom["body"])
+        for patch, pts in zip(self.blocks, geom["blocks"]):
+            patch.set_xy(pts)
+        for patch, pts in zip(self.wheels, geom["wheels"]):
+            patch.set_xy(pts)
+        nan = np.full((1, 2), np.nan)
+        stripes = np.vstack([np.vstack([s, nan]) for s in geom["stripes"]])
+        self.stripes.set_data(stripes[:, 0], stripes[:, 1])
+        self.arrow.set_data(x=0, y=0, dx=geom["heading_end"][0], dy=0)
+        self._geom_key = (D, r)
+
+    def _on_draw(self, event):
+        # Figure vừa vẽ lại toàn bộ (lần đầu, resize, dời camera tới vị trí mới): cache nền mới
+        bbox = self.ax.figure.bbox
+        if (bbox.width, bbox.height) != self._fig_size:
+            # Đổi kích thước: ảnh nền cũ không dùng lại được
+            self._fig_size = (bbox.width, bbox.height)
+            self._bg_cache.clear()
+        if self._cam_key is not None:
+            self._bg_cache[self._cam_key] = self.canvas.copy_from_bbox(bbox)
+            self._bg_cache.move_to_end(self._cam_key)
+            while len(self._bg_cache) > self._bg_cache_size:
+                self._bg_cache.popitem(last=False)
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
+
+    def invalidate(self):
+        # Bản đồ / đường tham chiếu / reset: nền ở mọi vị trí camera đã đổi
+        super().invalidate()
+        self._bg_cache.clear()
+
+    def _move_camera(self, x, y, view_range):
+        # Tâm mới làm tròn theo lưới thô -> robot lệch tâm <= step/2, các lần dời lặp lại cùng vị trí
+        step = self.camera_step * view_range
+        ix, iy = round(x / step), round(y / step)
+        cx, cy = ix * step, iy * step
+        self._center = (cx, cy)
+        self._view_range = view_range
+        self._cam_key = (ix, iy, view_range)
+        self.ax.set_xlim(cx - view_range/2, cx + view_range/2)
+        self.ax.set_ylim(cy - view_range/2, cy + view_range/2)
+        self.ref_line.set_data(*self._reference_in_view())
+        bg = self._bg_cache.get(self._cam_key)
+        if bg is None:
+            self._background = None
+            return False
+        # Đã từng vẽ ở vị trí này: chép lại nền cả figure thay vì canvas.draw()
+        self._bg_cache.move_to_end(self._cam_key)
+        self.canvas.restore_region(bg)
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        return True
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def viewport(self):
+        # (xmin, xmax, ymin, ymax, kích thước 1 pixel theo mét)
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        pixel = (x1 - x0) / max(self.ax.bbox.width, 1.0)
+        return x0, x1, y0, y1, pixel
+
+    def update(self, x, y, theta, D, r, path_x=None, path_y=None):
+        if (D, r) != self._geom_key:
+            self._set_geometry(D, r)
+
+        self._tf.clear().rotate(theta).translate(x, y)
+        if self.world is not self._map_world:
+            self._set_map()
+
+        view_range = camera_range(D)
+        restored = False
+        if self._camera_needs_move(x, y, view_range):
+            restored = self._move_camera(x, y, view_range)
+
+        if path_x is None and self.path_lod is not None:
+            path_x, path_y = self.path_lod.query(*self.viewport())
+        if path_x is not None and len(path_x) > 1:
+            self.path_line.set_data(path_x, path_y)
+        else:
+            self.path_line.set_data([], [])
+        if self.scan is not None:
+            # Khép kín vòng quét
+            self.scan_line.set_data(np.append(self.scan[0], self.scan[0][:1]),
+                                    np.append(self.scan[1], self.scan[1][:1]))
+        else:
+            self.scan_line.set_data([], [])
+        self._set_others()
+
+        if self._background is None:
+            # Vẽ lại toàn bộ; _on_draw sẽ cache nền và vẽ các artist động
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            # Vừa dời camera bằng nền cache: nhãn trục (ngoài ax.bbox) cũng đổi
+            self.canvas.blit(self.ax.figure.bbox if restored else self.ax.bbox)
+
+
+class TkCanvasRenderer(RobotView):
+    """Vẽ robot trực tiếp lên tk.Canvas, không qua matplotlib/Agg.
+
+    - Các item (đa giác, đường) tạo MỘT lần; mỗi khung hình chỉ gọi coords().
+    - Thế giới -> màn hình: dời theo tâm camera, nhân tỉ lệ (pixel/m), lật trục y.
+    - Lưới, nhãn, mốc (0,0) và ảnh bản đồ chỉ vẽ lại khi camera dời, zoom hoặc đổi kích thước.
+    - Lăn chuột để zoom quanh robot.
+    """
+
+    def __init__(self, canvas, follow_margin=0.3, path_lod=None, zoom_step=1.25):
+        self.canvas = canvas
+        self.follow_margin = follow_margin
+        self.path_lod = path_lod
+        self.zoom_step = zoom_step
+        self.zoom = 1.0
+
+        self._scale = None     # pixel / m
+        self._size = None      # (rộng, cao) pixel
+        self._geom_key = None
+        self._last = None      # Tham số update gần nhất (vẽ lại khi zoom / resize)
+        self._path_items = []
+        self._path_shown = 0
+        self._other_items = []
+        self._others_shown = 0
+        self._map_photo = None
+
+        self._create_items()
+        canvas.bind("<Configure>", self._on_configure)
+        # Windows/macOS: <MouseWheel>; X11: nút 4 (lăn lên) / 5 (lăn xuống)
+        canvas.bind("<MouseWheel>", lambda e: self._on_wheel(e.delta > 0))
+        canvas.bind("<Button-4>", lambda e: self._on_wheel(True))
+        canvas.bind("<Button-5>", lambda e: self._on_wheel(False))
+
+    def _create_items(self):
+        c = self.canvas
+        z = (0, 0, 0, 0, 0, 0)
+        self.scan_line = c.create_line(0, 0, 0, 0, fill="#F44336", width=1, state="hidden")
+        self.joint = c.create_polygon(*z, fill="#555555", outline="")
+        self.body = c.create_polygon(*z, fill="#FFC107", outline="black", width=2)
+        self.blocks = [c.create_polygon(*z, fill="#38FF22", outline="black") for _ in range(2)]
+        self.wheels = [c.create_polygon(*z, fill="white", outline="black", width=1.5) for _ in range(2)]
+        self.stripes = [c.create_line(0, 0, 0, 0, fill="black", width=1.5) for _ in range(8)]
+        self.arrow = c.create_line(0, 0, 0, 0, fill="red", width=2, arrow="last")
+        self._polys = [self.joint, self.body, *self.blocks, *self.wheels]
+
+    def _set_geometry(self, D, r):
+        geom = robot_geometry(D, r)
+        # Gộp mọi điểm local vào một mảng -> mỗi khung hình chỉ 1 phép nhân ma trận
+        parts = [geom["joint"], geom["body"], *geom["blocks"], *geom["wheels"],
+                 *geom["stripes"], np.array([[0.0, 0.0], geom["heading_end"]])]
+        self._local = np.vstack(parts)
+        bounds = np.cumsum([0] + [len(p) for p in parts])
+        self._slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+        self._geom_key = (D, r)
+
+    def _canvas_size(self):
+        c = self.canvas
+        w, h = c.winfo_width(), c.winfo_height()
+        if w <= 1 or h <= 1:
+            # Canvas chưa hiện lên màn hình: dùng kích thước khai báo
+            w, h = int(c.cget("width")), int(c.cget("height"))
+        return w, h
+
+    def _to_screen(self, xs, ys):
+        w, h = self._size
+        s = self._scale
+        return (np.asarray(xs) - self._center[0]) * s + w / 2, h / 2 - (np.asarray(ys) - self._center[1]) * s
+
+    def viewport(self):
+        w, h = self._size
+        cx, cy = self._center
+        half_w, half_h = w / 2 / self._scale, h / 2 / self._scale
+        return cx - half_w, cx + half_w, cy - half_h, cy + half_h, 1 / self._scale
+
+    def _on_configure(self, event):
+        self.invalidate()
+        if self._last is not None:
+            self.update(*self._last)
+
+    def _on_wheel(self, zoom_in):
+        self._zoom_by(zoom_in)
+        return "break"  # Không cho sự kiện lăn chuột lan tới binding của widget cha
+
+    def _zoom_by(self, zoom_in):
+        self.zoom = self.zoom * self.zoom_step if zoom_in else self.zoom / self.zoom_step
+        self.invalidate()
+        if self._last is not None:
+            self.update(*self._last)
+
+    def _draw_map(self):
+        # Lấy mẫu bản đồ theo từng pixel của khung nhìn (gần nhất) -> một PhotoImage
+        world = self.world
+        w, h = self._size
+        x0, _, _, y1, px = self.viewport()
+        i, j = world.cell_of(x0 + (np.arange(w) + 0.5) * px, y1 - (np.arange(h) + 0.5) * px)
+        iv = (i >= 0) & (i < world.height)
+        jv = (j >= 0) & (j < world.width)
+        gray = np.full((h, w), 235, dtype=np.uint8)     # Ngoài bản đồ
+        occ = world.occupied[np.ix_(i[iv], j[jv])]
+        gray[np.ix_(iv, jv)] = np.where(occ, 80, 255)
+        self._map_photo = update_photo(self._map_photo, gray, self.canvas)
+        self.canvas.create_image(0, 0, anchor="nw", image=self._map_photo, tags="grid")
+
+    def _draw_grid(self):
+        c = self.canvas
+        c.delete("grid")
+        w, h = self._size
+        if self.world is not None:
+            self._draw_map()
+        x0, x1, y0, y1, _ = self.viewport()
+        step = nice_step(min(x1 - x0, y1 - y0))
+        for gx in np.arange(np.ceil(x0 / step) * step, x1, step):
+            sx, _ = self._to_screen(gx, 0)
+            c.create_line(sx, 0, sx, h, fill="#cccccc", dash=(1, 3), tags="grid")
+            c.create_text(sx, h - 2, text=f"{round(gx, 6):g}", anchor="s", fill="#555555",
+                          font=("Arial", 7), tags="grid")
+        for gy in np.arange(np.ceil(y0 / step) * step, y1, step):
+            _, sy = self._to_screen(0, gy)
+            c.create_line(0, sy, w, sy, fill="#cccccc", dash=(1, 3), tags="grid")
+            c.create_text(2, sy, text=f"{round(gy, 6):g}", anchor="w", fill="#555555",
+                          font=("Arial", 7), tags="grid")
+        # Đường tham chiếu: tĩnh, vẽ cùng nền (tách tại chỗ ngắt nét NaN)
+        ref_x, ref_y = self._reference_in_view()
+        if len(ref_x) > 1:
+            sx, sy = self._to_screen(ref_x, ref_y)
+            pts = np.column_stack((sx, sy))
+            start = 0
+            for b in list(np.flatnonzero(np.isnan(sx))) + [len(pts)]:
+                if b - start > 1:
+                    c.create_line(*pts[start:b].ravel().tolist(), fill="#1E88E5", width=2, tags="grid")
+                start = b + 1
+        # Mốc (0,0): dấu x đỏ cỡ cố định theo pixel
+        ox, oy = self._to_screen(0, 0)
+        for dx in (-4, 4):
+            c.create_line(ox - 4, oy - dx, ox + 4, oy + dx, fill="red", width=2, tags="grid")
+        c.tag_lower("grid")
+
+    def _draw_path(self, path_x, path_y):
+        c = self.canvas
+        runs = []
+        if path_x is not None and len(path_x) > 1:
+            sx, sy = self._to_screen(path_x, path_y)
+            pts = np.column_stack((sx, sy))
+            # Tk không hiểu NaN: tách quỹ đạo thành các đoạn liền tại chỗ ngắt nét
+            breaks = np.flatnonzero(np.isnan(sx))
+            start = 0
+            for b in list(breaks) + [len(pts)]:
+                if b - start > 1:
+                    runs.append(pts[start:b])
+                start = b + 1
+        for i, run in enumerate(runs):
+            if i == len(self._path_items):
+                item = c.create_line(0, 0, 0, 0, fill="green", dash=(4, 2), width=1)
+                c.tag_lower(item, self.joint)
+                self._path_items.append(item)
+            c.coords(self._path_items[i], *run.ravel().tolist())
+        # Ẩn các đoạn thừa của khung trước
+        for i in range(len(runs), self._path_shown):
+            c.itemconfigure(self._path_items[i], state="hidden")
+        for i in range(self._path_shown, len(runs)):
+            c.itemconfigure(self._path_items[i], state="normal")
+        self._path_shown = len(runs)
+
+    def _draw_others(self):
+        c = self.canvas
+        for i, (label, x, y, theta, D, color) in enumerate(self.others):
+            if i == len(self._other_items):
+                self._other_items.append((c.create_polygon(0, 0, 0, 0, 0, 0, outline="black"),
+                                          c.create_line(0, 0, 0, 0, fill="black", width=2),
+                                          c.create_text(0, 0, font=("Arial", 7), anchor="s")))
+            body, head, text = self._other_items[i]
+            pts, heading = marker_geometry(x, y, theta, D)
+            bx, by = self._to_screen(pts[:, 0], pts[:, 1])
+            hx, hy = self._to_screen(heading[:, 0], heading[:, 1])
+            c.coords(body, *np.column_stack((bx, by)).ravel().tolist())
+            c.coords(head, *np.column_stack((hx, hy)).ravel().tolist())
+            c.coords(text, *self._to_screen(x, y + D * 0.8))
+            c.itemconfigure(body, fill=color)
+            c.itemconfigure(text, text=label)
+        for group in self._other_items[len(self.others):self._others_shown]:
+            for item in group:
+                c.itemconfigure(item, state="hidden")
+        for group in self._other_items[self._others_shown:len(self.others)]:
+            for item in group:
+                c.itemconfigure(item, state="normal")
+        self._others_shown = len(self.others)
+
+    def _draw_scan(self):
+        if self.scan is None:
+            self.canvas.itemconfigure(self.scan_line, state="hidden")
+            return
+        sx, sy = self._to_screen(*self.scan)
+        # Khép kín vòng quét
+        pts = np.column_stack((np.append(sx, sx[:1]), np.append(sy, sy[:1])))
+        self.canvas.coords(self.scan_line, *pts.ravel().tolist())
+        self.canvas.itemconfigure(self.scan_line, state="normal")
+
+    def update(self, x, y, theta, D, r, path_x=None, path_y=None):
+        self._last = (x, y, theta, D, r, path_x, path_y)
+        if (D, r) != self._geom_key:
+            self._set_geometry(D, r)
+
+        view_range = camera_range(D) / self.zoom
+        if self._camera_needs_move(x, y, view_range):
+            self._center = (x, y)
+            self._view_range = view_range
+            self._size = self._canvas_size()
+            self._scale = min(self._size) / view_range
+            # Mũi tên cùng kích thước với bản matplotlib (0.1 m dài, 0.08 m rộng)
+            head_len, head_w = 0.1 * self._scale, 0.04 * self._scale
+            self.canvas.itemconfigure(self.arrow, arrowshape=(head_len, head_len, head_w))
+            self._draw_grid()
+
+        if path_x is None and self.path_lod is not None:
+            path_x, path_y = self.path_lod.query(*self.viewport())
+        self._draw_path(path_x, path_y)
+        self._draw_scan()
+
+        c, s = np.cos(theta), np.sin(theta)
+        world = self._local @ np.array([[c, s], [-s, c]]) + (x, y)
+        sx, sy = self._to_screen(world[:, 0], world[:, 1])
+        flat = np.column_stack((sx, sy))
+        items = self._polys + self.stripes + [self.arrow]
+        for item, sl in zip(items, self._slices):
+            self.canvas.coords(item, *flat[sl].ravel().tolist())
+        self._draw_others()
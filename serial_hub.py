@@ -0,0 +1,221 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from kinematics import DifferentialDriveRobot
+from simulation import SimulationRunner
+from telemetry import TelemetryStore
+from uart_ingest import UartIngestor, QueueInput
+
+
+class HubRobot:
+    """Một cổng serial = một robot: bộ tách mẫu + hàng đợi, mô phỏng, telemetry riêng."""
+
+    def __init__(self, port, baud, robot, dt, telemetry_bytes):
+        self.port = port
+        self.baud = baud
+        # Dùng UartIngestor chỉ để tách mẫu / đếm (không chạy luồng đọc của nó)
+        self.ingestor = UartIngestor(None)
+        self.runner = SimulationRunner(robot, dt=dt)
+        self.runner.input_source = QueueInput(self.ingestor.queue, self.runner)
+        # Ghi trên luồng hub mỗi bước vật lý; GUI chỉ đọc `latest`
+        self.telemetry = TelemetryStore(max_bytes=telemetry_bytes)
+        self.latest = self.runner.snapshot()
+
+        self.connected = False
+        self.opens = 0
+        self.reconnects = 0
+        self.last_error = None
+
+    def stats(self):
+        st = self.ingestor.stats()
+        st.update(connected=self.connected, reconnects=self.reconnects,
+                  last_error=None if self.last_error is None else str(self.last_error))
+        return st
+
+
+class SerialHub:
+    """Đọc nhiều cổng serial cùng lúc trên MỘT luồng asyncio.
+
+    - POSIX: loop.add_reader() trên file descriptor -> chỉ thức dậy khi có byte, không
+      cần luồng riêng cho từng cổng hay vòng lặp ngủ/kiểm tra.
+    - Windows (không có fd để chờ): đọc chặn ngắn trong executor dùng chung.
+    - Mất kết nối: đóng cổng, thử mở lại sau reconnect_delay (tăng dần tới reconnect_max).
+    - Vật lý của mọi robot chạy trong cùng event loop với bước dt cố định.
+    """
+
+    def __init__(self, dt=0.005, robot_factory=DifferentialDriveRobot, telemetry_bytes=2 * 1024 * 1024,
+                 reconnect_delay=0.5, reconnect_max=5.0, serial_factory=serial.Serial):
+        self.dt = dt
+        self.robot_factory = robot_factory
+        self.telemetry_bytes = telemetry_bytes
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max = reconnect_max
+        self.serial_factory = serial_factory
+
+        self.robots = {}        # port -> HubRobot (thứ tự thêm vào)
+        self._tasks = {}        # port -> asyncio.Task đọc cổng
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._executor = None
+
+    # --- Gọi từ luồng GUI ---
+    def start(self):
+        if self.running:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._thread_main, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=2.0):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_port(self, port, baud=9600):
+        if port in self.robots:
+            return self.robots[port]
+        rb = HubRobot(port, baud, self.robot_factory(), self.dt, self.telemetry_bytes)
+        self.robots[port] = rb
+        if self.running:
+            self._loop.call_soon_threadsafe(self._start_link, rb)
+        return rb
+
+    def remove_port(self, port):
+        rb = self.robots.pop(port, None)
+        if rb is not None and self.running:
+            self._loop.call_soon_threadsafe(self._cancel_link, port)
+        return rb
+
+    def stats(self):
+        return {port: rb.stats() for port, rb in list(self.robots.items())}
+
+    # --- Chạy trên luồng asyncio ---
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            for rb in list(self.robots.values()):
+                self._start_link(rb)
+            self._physics_task = self._loop.create_task(self._physics())
+            self._ready.set()
+            self._loop.run_forever()
+        finally:
+            self._ready.set()
+            self._loop.close()
+            self._loop = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _shutdown(self):
+        tasks = [*self._tasks.values(), self._physics_task]
+        for task in tasks:
+            task.cancel()
+        self._tasks.clear()
+
+        async def wait_all():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop.stop()
+        self._loop.create_task(wait_all())
+
+    def _start_link(self, rb):
+        self._tasks[rb.port] = self._loop.create_task(self._link(rb))
+
+    def _cancel_link(self, port):
+        task = self._tasks.pop(port, None)
+        if task is not None:
+            task.cancel()
+
+    async def _link(self, rb):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                ser = self.serial_factory(rb.port, rb.baud, timeout=0)
+            except (serial.SerialException, OSError, ValueError) as e:
+                rb.last_error = e
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+                continue
+
+            rb.ingestor.parser.reset()
+            if rb.opens:
+                rb.reconnects += 1
+            rb.opens += 1
+            rb.connected = True
+            delay = self.reconnect_delay
+            try:
+                await self._read(rb, ser)
+            except (serial.SerialException, OSError, TypeError) as e:
+                rb.ingestor.read_errors += 1
+                rb.last_error = e
+            finally:
+                rb.connected = False
+                ser.close()
+            await asyncio.sleep(delay)
+
+    async def _read(self, rb, ser):
+        loop = self._loop
+        fd = ser.fileno() if hasattr(ser, "fileno") and sys.platform != "win32" else None
+        if fd is None:
+            await self._read_blocking(rb, ser)
+            return
+
+        lost = loop.create_future()
+
+        def on_readable():
+            try:
+                data = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                if not lost.done():
+                    lost.set_exception(e)
+                return
+            if data:
+                rb.ingestor.ingest(data, time.perf_counter())
+
+        try:
+            loop.add_reader(fd, on_readable)
+        except NotImplementedError:
+            # Event loop không hỗ trợ add_reader (ví dụ ProactorEventLoop)
+            await self._read_blocking(rb, ser)
+            return
+        try:
+            await lost
+        finally:
+            loop.remove_reader(fd)
+
+    async def _read_blocking(self, rb, ser):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="serial-hub")
+        ser.timeout = 0.05
+        while True:
+            data = await self._loop.run_in_executor(self._executor, ser.read, max(ser.in_waiting, 1))
+            if data:
+                rb.ingestor.ingest(data, time.perf_counter())
+
+    async def _physics(self):
+        synced = set()
+        while True:
+            for port, rb in list(self.robots.items()):
+                runner = rb.runner
+                if port not in synced:
+                    runner.sync_wall()
+                    synced.add(port)
+                snap = runner.advance_realtime()
+                if snap.t != rb.latest.t:
+                    rb.latest = snap
+                    rb.telemetry.append(T=snap.t, X=snap.x, Y=snap.y, V=snap.v, W=snap.w,
+                                        Theta=snap.theta, WL=snap.wl, WR=snap.wr)
+            await asyncio.sleep(self.dt)
@@ -0,0 +1,277 @@
+import argparse
+import bisect
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from kinematics import DifferentialDriveRobot
+
+# Ảnh chụp trạng thái tại một thời điểm mô phỏng (bất biến)
+Snapshot = namedtuple("Snapshot", ["t", "x", "y", "theta", "v", "w", "wl", "wr"])
+
+
+class ScheduleInput:
+    """Kịch bản input dạng bậc thang: [(t_bắt_đầu, wl, wr), ...]."""
+
+    def __init__(self, steps):
+        self.steps = sorted(steps)
+        self.times = [s[0] for s in self.steps]
+
+    def __call__(self, t):
+        i = bisect.bisect_right(self.times, t) - 1
+        if i < 0:
+            return 0.0, 0.0
+        return self.steps[i][1], self.steps[i][2]
+
+
+class SimulationRunner:
+    """Chạy DifferentialDriveRobot với bước thời gian cố định, không cần Tk.
+
+    - step()/run_for(): chạy nhanh nhất có thể (hoặc theo hệ số thời gian thực)
+    - advance_realtime(): GUI gọi mỗi khung hình, mô phỏng đuổi kịp đồng hồ thật
+    """
+
+    def __init__(self, robot=None, dt=0.01, input_source=None, on_step=None):
+        self.robot = robot if robot is not None else DifferentialDriveRobot()
+        self.dt = dt
+        # input_source(t) -> (wl, wr); None thì dùng giá trị set_input()
+        self.input_source = input_source
+        # on_step(runner) được gọi sau mỗi bước (ghi log, telemetry...)
+        self.on_step = on_step
+
+        self.t = 0.0
+        self.steps = 0
+        self.wl = 0.0
+        self.wr = 0.0
+
+        self._wall_ref = None
+        self.dropped_time = 0.0  # Thời gian mô phỏng bị bỏ khi không đuổi kịp
+
+        # Bản đồ vật cản (world.OccupancyGrid): robot là hình tròn bán kính collision_radius
+        self.world = None
+        self.collision_radius = 0.0
+        self.collisions = 0      # Số bước bị vật cản chặn
+
+    def set_input(self, wl, wr):
+        self.wl = wl
+        self.wr = wr
+
+    def set_world(self, world, radius):
+        self.world = world
+        self.collision_radius = radius
+
+    def step(self, n=1):
+        robot = self.robot
+        dt = self.dt
+        for _ in range(n):
+            if self.input_source is not None:
+                self.wl, self.wr = self.input_source(self.t)
+            if self.world is None:
+                robot.update(self.wl, self.wr, dt)
+            else:
+                self._update_blocked(robot, dt)
+            self.steps += 1
+            self.t = self.steps * dt  # Tránh cộng dồn sai số float
+            if self.on_step is not None:
+                self.on_step(self)
+        return self.snapshot()
+
+    def _update_blocked(self, robot, dt):
+        # Chạm vật cản: giữ vị trí cũ, vận tốc dài về 0 (vẫn quay tại chỗ được).
+        # Bước làm khoảng hở tăng lên (đi ra xa vật cản) luôn được phép -> không bị kẹt
+        px, py = robot.x, robot.y
+        robot.update(self.wl, self.wr, dt)
+        world, radius = self.world, self.collision_radius
+        after = world.clearance_at(robot.x, robot.y)
+        if after < radius and after < world.clearance_at(px, py):
+            robot.x, robot.y = px, py
+            robot.v = 0.0
+            self.collisions += 1
+
+    def run_for(self, duration, realtime_factor=None):
+        # realtime_factor = None/0 -> nhanh nhất có thể
+        # realtime_factor = k      -> k giây mô phỏng cho mỗi giây thực
+        n = int(round(duration / self.dt))
+        if not realtime_factor:
+            return self.step(n)
+
+        start_wall = time.perf_counter()
+        start_t = self.t
+        for _ in range(n):
+            self.step()
+            ahead = (self.t - start_t) / realtime_factor - (time.perf_counter() - start_wall)
+            if ahead > 0.001:
+                time.sleep(ahead)
+        return self.snapshot()
+
+    def sync_wall(self):
+        # Gọi khi bắt đầu / tiếp tục chạy để không "bù" khoảng thời gian đã dừng
+        self._wall_ref = (time.perf_counter(), self.t)
+
+    def wall_time_of(self, t, realtime_factor=1.0):
+        # Thời điểm đồng hồ thật (perf_counter) ứng với thời gian mô phỏng t;
+        # chưa gắn với đồng hồ (chạy headless) -> coi như mọi input đã tới
+        if self._wall_ref is None:
+            return float("inf")
+        wall0, sim0 = self._wall_ref
+        return wall0 + (t - sim0) / realtime_factor
+
+    def sim_time_of(self, wall, realtime_factor=1.0):
+        # Ngược lại của wall_time_of: thời gian mô phỏng ứng với thời điểm perf_counter `wall`
+        # (đóng dấu byte UART thô cùng đồng hồ với các bước); chưa gắn đồng hồ -> t hiện tại
+        if self._wall_ref is None:
+            return self.t
+        wall0, sim0 = self._wall_ref
+        return sim0 + (wall - wall0) * realtime_factor
+
+    def advance_realtime(self, realtime_factor=1.0, max_steps=1000):
+        # Chạy đủ số bước để thời gian mô phỏng bắt kịp đồng hồ thật
+        if self._wall_ref is None:
+            self.sync_wall()
+        wall0, sim0 = self._wall_ref
+        target_t = sim0 + (time.perf_counter() - wall0) * realtime_factor
+        n = int((target_t - self.t) / self.dt)
+        if n > max_steps:
+            # Máy quá chậm: bỏ phần thời gian thừa thay vì chạy dồn mãi
+            self.dropped_time += (n - max_steps) * self.dt
+            self._wall_ref = (wall0, sim0 - (n - max_steps) * self.dt)
+            n = max_steps
+        if n > 0:
+            self.step(n)
+        return self.snapshot()
+
+    def snapshot(self):
+        rb = self.robot
+        return Snapshot(self.t, rb.x, rb.y, rb.theta, rb.v, rb.w, self.wl, self.wr)
+
+
+class SimulationWorker:
+    """Chạy SimulationRunner trên luồng riêng với bước thời gian cố định.
+
+    - Lập lịch kiểu tích luỹ (accumulator): phần thời gian thật "nợ" được trả bằng
+      các bước dt cố định (advance_realtime), rồi ngủ tới hạn bước kế tiếp.
+      GUI vẽ chậm không làm lệch hay thay đổi bước vật lý.
+    - Mọi thay đổi runner từ luồng khác đi qua hàng đợi lệnh (submit/call),
+      được thực hiện giữa hai bước vật lý.
+    - Sau mỗi lượt, ảnh chụp Snapshot (bất biến) được công bố bằng một phép gán
+      tham chiếu; latest() đọc ở tốc độ khung hình của GUI, không cần khoá.
+    """
+
+    def __init__(self, runner, realtime_factor=1.0, max_steps=100):
+        self.runner = runner
+        self.realtime_factor = realtime_factor
+        # Số bước tối đa mỗi lượt; thiếu nhiều hơn thì bỏ bớt thời gian (runner.dropped_time)
+        self.max_steps = max_steps
+        self._commands = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._latest = runner.snapshot()
+        self.published = 0      # Số snapshot đã công bố
+        self.last_error = None
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.last_error = None
+        self.runner.sync_wall()
+        self._latest = self.runner.snapshot()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._run_commands()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, fn, *args):
+        # Không chờ: fn(*args) chạy trên luồng vật lý trước bước kế tiếp
+        if self.running:
+            self._commands.put((fn, args, None))
+        else:
+            fn(*args)
+
+    def call(self, fn, *args):
+        # Như submit nhưng chờ thực hiện xong (ví dụ trước khi đóng file ghi)
+        if not self.running:
+            return fn(*args)
+        done = threading.Event()
+        box = []
+        self._commands.put((lambda: box.append(fn(*args)), (), done))
+        # Luồng vật lý có thể vừa dừng: tự thực hiện nốt lệnh còn lại
+        while not done.wait(0.05):
+            if not self.running:
+                self._run_commands()
+        return box[0] if box else None
+
+    def set_input(self, wl, wr):
+        self.submit(self.runner.set_input, wl, wr)
+
+    def latest(self):
+        return self._latest
+
+    def _run_commands(self):
+        while True:
+            try:
+                fn, args, done = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                fn(*args)
+            finally:
+                if done is not None:
+                    done.set()
+
+    def _run(self):
+        runner = self.runner
+        try:
+            while not self._stop.is_set():
+                self._run_commands()
+                snap = runner.advance_realtime(self.realtime_factor, self.max_steps)
+                if snap.t != self._latest.t:
+                    self._latest = snap
+                    self.published += 1
+                # Ngủ tới lúc đủ thời gian cho bước kế tiếp
+                wait = runner.wall_time_of(runner.t + runner.dt, self.realtime_factor) - time.perf_counter()
+                if wait > 0:
+                    self._stop.wait(wait)
+        except Exception as e:
+            # Lỗi trong vật lý / on_step: dừng luồng, GUI đọc last_error
+            self.last_error = e
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mô phỏng robot không giao diện (headless)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Thời gian mô phỏng (s)")
+    parser.add_argument("--dt", type=float, default=0.01, help="Bước thời gian (s)")
+    parser.add_argument("--rtf", type=float, default=0.0, help="Hệ số thời gian thực (0 = nhanh nhất)")
+    parser.add_argument("--wl", type=float, default=5.0)
+    parser.add_argument("--wr", type=float, default=5.0)
+    parser.add_argument("--R", type=float, default=120, help="Bán kính bánh (mm)")
+    parser.add_argument("--D", type=float, default=250, help="Khoảng cách 2 bánh (mm)")
+    parser.add_argument("--M", type=float, default=1.2, help="Khối lượng (kg)")
+    parser.add_argument("--integrator", choices=["euler", "arc"], default="euler",
+                        help="arc: cung tròn chính xác, cho phép dt lớn (vd 0.5)")
+    args = parser.parse_args()
+
+    robot = DifferentialDriveRobot(args.R / 1000, args.D / 1000, args.M, integrator=args.integrator)
+    runner = SimulationRunner(robot, dt=args.dt)
+    runner.set_input(args.wl, args.wr)
+
+    t0 = time.perf_counter()
+    snap = runner.run_for(args.duration, realtime_factor=args.rtf)
+    wall = time.perf_counter() - t0
+
+    print(f"sim {snap.t:.2f}s trong {wall:.3f}s thực ({snap.t / max(wall, 1e-9):.0f}x)")
+    print(f"x={snap.x:.4f} y={snap.y:.4f} theta={snap.theta:.4f} v={snap.v:.4f} w={snap.w:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import csv
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from kinematics import DifferentialDriveRobot
+from simulation import SimulationRunner, ScheduleInput
+
+# Kịch bản input chuẩn: tên -> (danh sách bậc [(t, wl, wr)], thời lượng s)
+SCENARIOS = {
+    "straight": ([(0.0, 10.0, 10.0)], 5.0),
+    "turn": ([(0.0, 5.0, 10.0)], 5.0),
+    "spin": ([(0.0, -5.0, 5.0)], 3.0),
+    "stop": ([(0.0, 10.0, 10.0), (3.0, 0.0, 0.0)], 6.0),
+    "zigzag": ([(0.0, 10.0, 6.0), (1.5, 6.0, 10.0), (3.0, 10.0, 6.0), (4.5, 6.0, 10.0)], 6.0),
+}
+
+COLUMNS = ["R_mm", "D_mm", "M_kg", "scenario",
+           "t_reach_s", "v_max", "turn_radius_m", "final_x", "final_y", "final_theta",
+           "pose_error_m", "heading_error_rad"]
+
+
+def ideal_pose(R, D, steps, duration):
+    # Quỹ đạo lý tưởng (không giới hạn gia tốc): cung tròn chính xác trên từng bậc
+    x = y = th = 0.0
+    bounds = [s[0] for s in steps] + [duration]
+    for (t0, wl, wr), t1 in zip(steps, bounds[1:]):
+        h = t1 - t0
+        v = R / 2 * (wr + wl)
+        w = R / D * (wr - wl)
+        if abs(w) < 1e-9:
+            x += v * math.cos(th) * h
+            y += v * math.sin(th) * h
+        else:
+            x += v / w * (math.sin(th + w * h) - math.sin(th))
+            y -= v / w * (math.cos(th + w * h) - math.cos(th))
+        th += w * h
+    return x, y, th
+
+
+def run_case(case, dt=0.01):
+    R_mm, D_mm, M, scenario = case
+    R, D = R_mm / 1000, D_mm / 1000
+    steps, duration = SCENARIOS[scenario]
+
+    robot = DifferentialDriveRobot(R, D, M, integrator="arc")
+    runner = SimulationRunner(robot, dt=dt, input_source=ScheduleInput(steps))
+
+    # Thời gian đạt 90% vận tốc đích của bậc đầu tiên
+    v_goal = 0.9 * R / 2 * (steps[0][1] + steps[0][2])
+    state = {"t_reach": math.nan, "v_max": 0.0}
+
+    def on_step(rn):
+        v = rn.robot.v
+        state["v_max"] = max(state["v_max"], abs(v))
+        if math.isnan(state["t_reach"]) and v_goal != 0 and abs(v) >= abs(v_goal):
+            state["t_reach"] = rn.t
+
+    runner.on_step = on_step
+    snap = runner.run_for(duration)
+
+    ix, iy, ith = ideal_pose(R, D, steps, duration)
+    turn_radius = abs(snap.v / snap.w) if abs(snap.w) > 1e-9 else math.inf
+    return [R_mm, D_mm, M, scenario,
+            state["t_reach"], state["v_max"], turn_radius, snap.x, snap.y, snap.theta,
+            math.hypot(snap.x - ix, snap.y - iy), snap.theta - ith]
+
+
+def run_chunk(cases, dt):
+    return [run_case(c, dt) for c in cases]
+
+
+def case_key(R_mm, D_mm, M, scenario):
+    return f"{float(R_mm):g}|{float(D_mm):g}|{float(M):g}|{scenario}"
+
+
+def load_done(path):
+    # Đọc các dòng đã có để chạy tiếp sau khi bị ngắt (resume)
+    done = set()
+    if not os.path.exists(path):
+        return done
+    # Cắt bỏ dòng cuối ghi dở lúc crash (không có '\n')
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get(COLUMNS[-1]) is None:
+                continue
+            try:
+                done.add(case_key(row["R_mm"], row["D_mm"], row["M_kg"], row["scenario"]))
+            except (KeyError, ValueError):
+                pass
+    return done
+
+
+def parse_values(text):
+    # "60,80,100" hoặc "start:stop:step" (bao gồm stop)
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        return list(np.round(np.arange(start, stop + step / 2, step), 6))
+    return [float(v) for v in text.split(",")]
+
+
+def sweep(R_list, D_list, M_list, scenarios, out_path, workers=None, chunk=64, dt=0.01):
+    cases = list(itertools.product(R_list, D_list, M_list, scenarios))
+    done = load_done(out_path)
+    todo = [c for c in cases if case_key(*c) not in done]
+    print(f"{len(cases)} trường hợp, đã có {len(cases) - len(todo)}, còn {len(todo)}")
+    if not todo:
+        return
+
+    new_file = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+    t0 = time.perf_counter()
+    finished = 0
+    with open(out_path, "a", newline="") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(COLUMNS)
+        futures = [pool.submit(run_chunk, todo[i:i + chunk], dt) for i in range(0, len(todo), chunk)]
+        for fut in as_completed(futures):
+            rows = fut.result()
+            writer.writerows([[f"{v:.6g}" if isinstance(v, float) else v for v in row] for row in rows])
+            # Ghi xuống đĩa sau mỗi khối -> crash chỉ mất khối đang chạy
+            f.flush()
+            os.fsync(f.fileno())
+            finished += len(rows)
+            rate = finished / (time.perf_counter() - t0)
+            print(f"\r{finished}/{len(todo)} ({rate:.0f} ca/s)", end="", flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quét thông số R, D, M song song trên nhiều lõi")
+    parser.add_argument("--R", default="60:150:10", help="Bán kính bánh (mm): a,b,c hoặc start:stop:step")
+    parser.add_argument("--D", default="150:400:25", help="Khoảng cách 2 bánh (mm)")
+    parser.add_argument("--M", default="0.5:5:0.5", help="Khối lượng (kg)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Danh sách kịch bản")
+    parser.add_argument("--dt", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định = số lõi)")
+    parser.add_argument("--chunk", type=int, default=64, help="Số ca mỗi lần gửi cho 1 process")
+    parser.add_argument("--out", default="sweep.csv", help="File kết quả (chạy lại sẽ tiếp tục)")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    for s in scenarios:
+        if s not in SCENARIOS:
+            parser.error(f"Không có kịch bản '{s}' ({', '.join(SCENARIOS)})")
+    sweep(parse_values(args.R), parse_values(args.D), parse_values(args.M), scenarios,
+          args.out, workers=args.workers, chunk=args.chunk, dt=args.dt)
+
+
+if __name__ == "__main__":
+    main()
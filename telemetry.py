@@ -0,0 +1,258 @@
+import numpy as np
+
+# Các kênh dữ liệu ghi lại mỗi lần lấy mẫu
+# CTE: sai lệch ngang so với đường tham chiếu (chỉ có ở chế độ bám đường, còn lại NaN)
+CHANNELS = ("T", "X", "Y", "V", "W", "Theta", "WL", "WR", "CTE")
+
+
+class RingBuffer:
+    """Bộ đệm vòng dung lượng cố định, cấp phát một lần.
+
+    Mỗi mẫu được ghi vào 2 vị trí (i và i + capacity) nên N mẫu cuối luôn
+    nằm liền nhau trong bộ nhớ -> last(n) là một slice (view), không copy.
+    """
+
+    def __init__(self, capacity, dtype=float):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(2 * self.capacity, dtype=dtype)
+        self._head = 0     # Vị trí ghi tiếp theo (0..capacity-1)
+        self.count = 0     # Tổng số mẫu đã ghi (kể cả đã bị đè)
+
+    def append(self, value):
+        h = self._head
+        self._buf[h] = value
+        self._buf[h + self.capacity] = value
+        self._head = h + 1 if h + 1 < self.capacity else 0
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def last(self, n=None):
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self._head + self.capacity
+        return self._buf[end - n:end]
+
+    def latest(self):
+        if self.count == 0:
+            return None
+        return self._buf[self._head + self.capacity - 1]
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return self._buf.nbytes
+
+
+class MinMaxPyramid:
+    """Toàn bộ lịch sử các kênh dưới dạng kim tự tháp min/max (không giới hạn độ dài).
+
+    - Mức 0: mọi mẫu gốc. Mức k: mỗi ô gộp `factor` ô của mức k-1, giữ (t đầu, min, max).
+    - Ô chỉ được tính khi đủ `factor` ô con -> mỗi mẫu tốn O(1) trung bình.
+    - query(t0, t1, width_px) chọn mức mịn nhất có <= width_px ô trong khoảng nhìn,
+      mỗi ô cho 2 điểm (min, max) -> đỉnh nhọn (ví dụ vận tốc tăng vọt) không bị mất.
+    """
+
+    def __init__(self, channels=CHANNELS[1:], factor=4, levels=10, time_channel="T"):
+        self.channels = tuple(channels)
+        self.time_channel = time_channel
+        self.factor = int(factor)
+        self.n_levels = int(levels)
+        self.clear()
+
+    def clear(self):
+        nch = len(self.channels)
+        self._t = [np.empty(256) for _ in range(self.n_levels)]
+        self._lo = [np.empty((256, nch)) for _ in range(self.n_levels)]
+        # Mức 0: min = max = giá trị gốc (dùng chung một mảng)
+        self._hi = [self._lo[0]] + [np.empty((256, nch)) for _ in range(1, self.n_levels)]
+        self._n = [0] * self.n_levels
+
+    def __len__(self):
+        return self._n[0]
+
+    @property
+    def t_start(self):
+        return float(self._t[0][0]) if self._n[0] else 0.0
+
+    @property
+    def t_end(self):
+        return float(self._t[0][self._n[0] - 1]) if self._n[0] else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self._t) + sum(a.nbytes for a in self._lo) + \
+            sum(a.nbytes for a in self._hi[1:])
+
+    def _push(self, k, t, lo, hi):
+        n, m = self._n[k], len(t)
+        if n + m > len(self._t[k]):
+            size = max(2 * len(self._t[k]), n + m)
+            self._t[k] = np.resize(self._t[k], size)
+            self._lo[k] = np.resize(self._lo[k], (size, len(self.channels)))
+            self._hi[k] = self._lo[k] if k == 0 else np.resize(self._hi[k], (size, len(self.channels)))
+        self._t[k][n:n + m] = t
+        self._lo[k][n:n + m] = lo
+        if k > 0:
+            self._hi[k][n:n + m] = hi
+        self._n[k] = n + m
+
+    def append(self, **values):
+        # Giống TelemetryStore.append: append(T=t, X=x, ...)
+        row = np.array([[values.get(ch, np.nan) for ch in self.channels]])
+        self.extend(np.array([values[self.time_channel]]), row)
+
+    def extend(self, t, values):
+        # Thêm nhiều mẫu một lần: t (n,), values (n, số kênh) -> dựng từ file ghi nhanh
+        t = np.asarray(t, dtype=float)
+        if not len(t):
+            return
+        self._push(0, t, values, None)
+        self._cascade(1)
+
+    def _cascade(self, first):
+        # Dựng các ô mới của mức first.. từ mức ngay dưới
+        f = self.factor
+        for k in range(first, self.n_levels):
+            done, ready = self._n[k], self._n[k - 1] // f
+            if ready == done:
+                break
+            a, b, m = done * f, ready * f, ready - done
+            shape = (m, f, len(self.channels))
+            # fmin/fmax bỏ qua NaN (kênh không có dữ liệu) trừ khi cả ô đều NaN
+            self._push(k, self._t[k - 1][a:b:f],
+                       np.fmin.reduce(self._lo[k - 1][a:b].reshape(shape), axis=1),
+                       np.fmax.reduce(self._hi[k - 1][a:b].reshape(shape), axis=1))
+
+    def _search(self, k, t, side="left"):
+        # Như np.searchsorted trên thời gian các ô mức k
+        return int(np.searchsorted(self._t[k][:self._n[k]], t, side=side))
+
+    def _cells(self, k, a, b):
+        # (t, min, max) của các ô [a, b) mức k
+        return self._t[k][a:b], self._lo[k][a:b], self._hi[k][a:b]
+
+    def query(self, t0, t1, width_px):
+        """Dữ liệu để vẽ khoảng [t0, t1] rộng width_px pixel.
+
+        Trả về (t, {kênh: y}); mỗi ô là 2 điểm liền nhau (min rồi max) cùng thời điểm.
+        """
+        if not self._n[0]:
+            return np.empty(0), {ch: np.empty(0) for ch in self.channels}
+        width_px = max(int(width_px), 1)
+        k = self.n_levels - 1
+        for level in range(self.n_levels):
+            if self._search(level, t1, "right") - self._search(level, t0) <= width_px:
+                k = level
+                break
+
+        # Thêm 1 ô mỗi bên để đường nối liền ra ngoài mép trục
+        i0 = max(self._search(k, t0) - 1, 0)
+        i1 = min(self._search(k, t1, "right") + 1, self._n[k])
+        parts = [(k, i0, i1)]
+        if i1 == self._n[k]:
+            # Phần cuối chưa đủ ô ở mức k: lấy ô lẻ từ các mức mịn hơn (mỗi mức < factor ô)
+            for j in range(k - 1, -1, -1):
+                parts.append((j, self._n[j + 1] * self.factor, self._n[j]))
+
+        cells = [self._cells(j, a, b) for j, a, b in parts]
+        ts, lo, hi = (np.concatenate(c) for c in zip(*cells))
+        ys = np.stack((lo, hi), axis=1)  # (ô, 2, kênh)
+        return np.repeat(ts, 2), {ch: ys[:, :, i].ravel() for i, ch in enumerate(self.channels)}
+
+
+class TelemetryStore:
+    """Lưu telemetry bằng ring buffer NumPy với giới hạn bộ nhớ.
+
+    - Tầng gần (recent): mọi mẫu, dung lượng cố định, cửa sổ N mẫu cuối là view.
+    - Tầng lịch sử (history): cứ `decimation` mẫu giữ lại 1, phủ thời gian dài hơn.
+    Chi phí mỗi khung hình không đổi dù chạy bao lâu.
+    - full_history=True / set_full_history(True): thêm MinMaxPyramid giữ toàn bộ lần
+      chạy (bộ nhớ tăng theo thời gian chạy, không tính vào max_bytes) cho chế độ đồ
+      thị "toàn bộ lần chạy". Tắt thì bộ nhớ lại nằm trong max_bytes.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, decimation=20, channels=CHANNELS,
+                 full_history=False):
+        self.channels = tuple(channels)
+        self.decimation = int(decimation)
+        self.max_bytes = int(max_bytes)
+
+        # Mỗi mẫu tốn 2 (gương) * 8 byte * số kênh; chia đôi bộ nhớ cho 2 tầng
+        per_sample = 2 * 8 * len(self.channels)
+        capacity = max(self.max_bytes // 2 // per_sample, 16)
+
+        self.recent = {ch: RingBuffer(capacity) for ch in self.channels}
+        self.history = {ch: RingBuffer(capacity) for ch in self.channels}
+        self.pyramid = None
+        self.set_full_history(full_history)
+
+    def set_full_history(self, enabled):
+        # Bật giữa chừng: mồi kim tự tháp từ dữ liệu đang có (phần cũ hơn tầng gần
+        # lấy từ tầng lịch sử đã lấy mẫu thưa, rồi tới tầng gần)
+        if not enabled:
+            self.pyramid = None
+            return
+        if self.pyramid is not None:
+            return
+        channels = [ch for ch in self.channels if ch != "T"]
+        self.pyramid = MinMaxPyramid(channels)
+        if not self.count:
+            return
+        recent_t = self.recent["T"].last()
+        old = self.history["T"].last() < recent_t[0]
+        for tier, keep in ((self.history, old), (self.recent, slice(None))):
+            self.pyramid.extend(tier["T"].last()[keep],
+                                np.column_stack([tier[ch].last()[keep] for ch in channels]))
+
+    def append(self, **values):
+        # Ví dụ: append(T=t, X=x, Y=y, V=v, W=w, Theta=th, WL=wl, WR=wr)
+        for ch in self.channels:
+            self.recent[ch].append(values.get(ch, np.nan))
+        if (self.count - 1) % self.decimation == 0:
+            for ch in self.channels:
+                self.history[ch].append(values.get(ch, np.nan))
+        if self.pyramid is not None:
+            self.pyramid.append(**values)
+
+    @property
+    def count(self):
+        # Tổng số mẫu đã ghi từ lúc reset
+        return self.recent[self.channels[0]].count
+
+    @property
+    def capacity(self):
+        return self.recent[self.channels[0]].capacity
+
+    def __len__(self):
+        return len(self.recent[self.channels[0]])
+
+    def window(self, n=None):
+        # N mẫu cuối của tất cả các kênh (view, không copy)
+        return {ch: buf.last(n) for ch, buf in self.recent.items()}
+
+    def last(self, name, n=None):
+        return self.recent[name].last(n)
+
+    def latest(self, name):
+        return self.recent[name].latest()
+
+    def history_window(self, n=None):
+        return {ch: buf.last(n) for ch, buf in self.history.items()}
+
+    def clear(self):
+        for buf in self.recent.values():
+            buf.clear()
+        for buf in self.history.values():
+            buf.clear()
+        if self.pyramid is not None:
+            self.pyramid.clear()
+
+    @property
+    def nbytes(self):
+        return sum(b.nbytes for b in self.recent.values()) + \
+            sum(b.nbytes for b in self.history.values())
@@ -0,0 +1,40 @@
+import numpy as np
+
+from kinematics import DifferentialDriveRobot, predict_trajectory
+
+
+def test_predict_matches_update():
+    robot = DifferentialDriveRobot()
+    wl = np.r_[np.full(30, 4.0), np.full(30, -2.0)]
+    wr = np.r_[np.full(30, 6.0), np.full(30, 5.0)]
+    traj = predict_trajectory(robot, wl, wr, 0.01)
+
+    ref = DifferentialDriveRobot()
+    xs = []
+    for a, b in zip(wl, wr):
+        ref.update(a, b, 0.01)
+        xs.append((ref.x, ref.y, ref.theta))
+    np.testing.assert_allclose(np.c_[traj.x, traj.y, traj.theta], xs, atol=1e-9)
+    assert robot.x == 0.0  # robot không đổi
+
+
+def test_predict_1d_with_scalar():
+    robot = DifferentialDriveRobot()
+    traj = predict_trajectory(robot, np.full(20, 5.0), 6.0, 0.01)
+    assert traj.x.shape == (20,)
+    both = predict_trajectory(robot, np.full(20, 5.0), np.full(20, 6.0), 0.01)
+    np.testing.assert_allclose(traj.x, both.x)
+
+    batch = predict_trajectory(robot, np.full((3, 20), 5.0), 6.0, 0.01)
+    assert batch.x.shape == (3, 20)
+
+
+def test_predict_empty_fields_are_separate():
+    robot = DifferentialDriveRobot()
+    traj = predict_trajectory(robot, np.empty(0), np.empty(0), 0.01)
+    assert all(f.shape == (0,) for f in traj)
+    assert len({id(f) for f in traj}) == len(traj)
+
+    batch = predict_trajectory(robot, np.empty((4, 0)), np.empty((4, 0)), 0.01)
+    assert all(f.shape == (4, 0) for f in batch)
+    assert len({id(f) for f in batch}) == len(batch)
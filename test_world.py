@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+
+import world
+from world import OccupancyGrid, distance_transform
+
+
+def open_map():
+    # 5 x 5 m không có tường bao, một khối vật cản ở góc, robot ở giữa
+    occ = np.zeros((100, 100), dtype=bool)
+    occ[:10, :10] = True
+    return OccupancyGrid(occ, resolution=0.05)
+
+
+def test_raycast_stops_at_map_edge():
+    grid = open_map()
+    angles = np.array([0.0, math.pi / 2, math.pi, -math.pi / 2, math.pi / 4])
+    ranges = grid.raycast(2.5, 2.5, angles, 10.0)
+    np.testing.assert_allclose(ranges, [2.5, 2.5, 2.5, 2.5, 2.5 * math.sqrt(2)], atol=1e-3)
+    # Hướng về khối ở góc (-3pi/4): chạm góc khối tại (0.5, 0.5)
+    hit = grid.raycast(2.5, 2.5, np.array([-3 * math.pi / 4]), 10.0)[0]
+    assert abs(hit - 2.0 * math.sqrt(2)) < 1e-3
+
+
+def test_clearance_bounded_by_map_edge():
+    grid = open_map()
+    for x, y in [(2.5, 2.5), (4.8, 2.5), (2.5, 0.13), (4.9, 4.9), (1.0, 3.7)]:
+        true = min(x, 5.0 - x, y, 5.0 - y, math.hypot(max(x - 0.5, 0), max(y - 0.5, 0)))
+        c = grid.clearance_at(x, y)
+        assert c <= true + 1e-9
+        assert c >= true - 2 * grid.resolution
+        assert grid.clearance(x, y) == c
+    assert not grid.collides(2.5, 2.5, 2.0)
+    assert grid.collides(2.5, 2.5, 2.6)
+
+
+def test_numpy_edt_matches_brute_force(monkeypatch):
+    monkeypatch.setattr(world, "distance_transform_edt", None)
+    rng = np.random.default_rng(0)
+    occ = rng.random((23, 31)) < 0.05
+    i, j = np.nonzero(occ)
+    yy, xx = np.mgrid[:23, :31]
+    ref = np.sqrt(((yy[..., None] - i) ** 2 + (xx[..., None] - j) ** 2).min(axis=2))
+    np.testing.assert_allclose(distance_transform(occ), ref)
@@ -0,0 +1,212 @@
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+import serial
+
+# --- GIAO THỨC ---
+# 1) CSV (cũ):   b"wl,wr\n"
+# 2) Nhị phân:   SYNC(2) | wl float32 LE | wr float32 LE | checksum(1)
+#    checksum = tổng các byte payload & 0xFF
+SYNC = b"\xA5\x5A"
+PAYLOAD = struct.Struct("<ff")
+FRAME_LEN = len(SYNC) + PAYLOAD.size + 1
+
+# Một mẫu input kèm thời điểm nhận (time.perf_counter)
+UartSample = namedtuple("UartSample", ["t_recv", "wl", "wr"])
+
+
+def encode_frame(wl, wr):
+    payload = PAYLOAD.pack(wl, wr)
+    return SYNC + payload + bytes([sum(payload) & 0xFF])
+
+
+def encode_csv(wl, wr):
+    return f"{wl:.4f},{wr:.4f}\n".encode("ascii")
+
+
+class StreamParser:
+    """Tách mẫu (wl, wr) từ luồng byte trộn lẫn CSV và frame nhị phân.
+
+    Dữ liệu đọc dở (nửa dòng, nửa frame) được giữ lại cho lần feed sau;
+    byte rác / checksum sai được đếm vào parse_errors rồi bỏ qua để đồng bộ lại.
+    """
+
+    def __init__(self, max_line=64):
+        self.max_line = max_line
+        self._buf = bytearray()
+        self.parse_errors = 0
+        self.frames = 0
+        self.lines = 0
+
+    def reset(self):
+        self._buf.clear()
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        out = []
+        pos = 0
+        n = len(buf)
+        # Cache vị trí SYNC / '\n' kế tiếp, chỉ tìm lại khi pos vượt qua
+        sync = buf.find(SYNC, pos)
+        nl = buf.find(b"\n", pos)
+
+        while pos < n:
+            if sync != -1 and sync < pos:
+                sync = buf.find(SYNC, pos)
+            if nl != -1 and nl < pos:
+                nl = buf.find(b"\n", pos)
+
+            if sync == pos:
+                # Frame nhị phân
+                if n - pos < FRAME_LEN:
+                    break  # Chưa đủ byte, chờ lần sau
+                payload = bytes(buf[pos + 2:pos + 2 + PAYLOAD.size])
+                if (sum(payload) & 0xFF) == buf[pos + FRAME_LEN - 1]:
+                    out.append(PAYLOAD.unpack(payload))
+                    self.frames += 1
+                    pos += FRAME_LEN
+                else:
+                    self.parse_errors += 1
+                    pos += 1  # Bỏ 1 byte rồi tìm SYNC tiếp
+                continue
+
+            if nl != -1 and (sync == -1 or nl < sync):
+                # Dòng CSV
+                line = bytes(buf[pos:nl]).strip()
+                pos = nl + 1
+                if not line:
+                    continue
+                parts = line.split(b",")
+                try:
+                    out.append((float(parts[0]), float(parts[1])))
+                    self.lines += 1
+                except (ValueError, IndexError):
+                    self.parse_errors += 1
+                continue
+
+            if sync != -1:
+                # Byte rác (không có '\n') đứng trước một SYNC
+                self.parse_errors += 1
+                pos = sync
+                continue
+
+            # Chỉ còn một dòng chưa kết thúc
+            if n - pos > self.max_line:
+                self.parse_errors += 1
+                pos = n
+            break
+
+        del buf[:pos]
+        return out
+
+
+class UartIngestor:
+    """Luồng đọc UART: đọc hết byte đang chờ trong buffer, tách mẫu, gắn thời
+    điểm nhận và đẩy vào hàng đợi có giới hạn (mẫu cũ nhất bị bỏ khi đầy).
+    """
+
+    def __init__(self, ser, maxlen=8192, raw_sink=None):
+        self.ser = ser
+        self.parser = StreamParser()
+        self.queue = deque(maxlen=maxlen)
+        # raw_sink(t_recv, data): nhận byte thô (ví dụ để ghi log)
+        self.raw_sink = raw_sink
+
+        self.bytes_read = 0
+        self.samples = 0
+        self.dropped = 0
+        self.read_errors = 0
+        self.last_error = None
+        self.last_recv = None   # Thời điểm (perf_counter) nhận byte gần nhất
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def parse_errors(self):
+        return self.parser.parse_errors
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        ser = self.ser
+        while not self._stop.is_set():
+            try:
+                # Đọc 1 byte (chặn tối đa ser.timeout) rồi lấy luôn phần còn lại trong buffer
+                data = ser.read(max(ser.in_waiting, 1))
+            except (serial.SerialException, OSError, TypeError) as e:
+                # Cổng bị rút / đóng: ghi lại lỗi và dừng luồng
+                self.read_errors += 1
+                self.last_error = e
+                break
+            if not data:
+                continue
+            self.ingest(data, time.perf_counter())
+
+    def ingest(self, data, t_recv):
+        self.bytes_read += len(data)
+        self.last_recv = t_recv
+        if self.raw_sink is not None:
+            self.raw_sink(t_recv, data)
+        q = self.queue
+        for wl, wr in self.parser.feed(data):
+            if len(q) == q.maxlen:
+                self.dropped += 1
+            q.append(UartSample(t_recv, wl, wr))
+            self.samples += 1
+
+    def drain(self):
+        # Lấy toàn bộ mẫu đang chờ theo đúng thứ tự nhận
+        out = []
+        q = self.queue
+        while q:
+            out.append(q.popleft())
+        return out
+
+    def stats(self):
+        return {
+            "bytes": self.bytes_read,
+            "samples": self.samples,
+            "parse_errors": self.parse_errors,
+            "dropped": self.dropped,
+            "read_errors": self.read_errors,
+            "pending": len(self.queue),
+        }
+
+
+class QueueInput:
+    """input_source cho SimulationRunner: áp dụng lần lượt các mẫu UART theo
+    thời điểm nhận, mỗi bước mô phỏng dùng mẫu mới nhất đã "đến" tại thời điểm đó.
+    """
+
+    def __init__(self, queue, runner):
+        self.queue = queue
+        self.runner = runner
+        self.wl = 0.0
+        self.wr = 0.0
+        self.consumed = 0
+
+    def __call__(self, t):
+        wall = self.runner.wall_time_of(t)
+        q = self.queue
+        while q and q[0].t_recv <= wall:
+            s = q.popleft()
+            self.wl, self.wr = s.wl, s.wr
+            self.consumed += 1
+        return self.wl, self.wr
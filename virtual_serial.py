@@ -0,0 +1,156 @@
+import os
+import random
+import threading
+import time
+import tty
+
+import numpy as np
+
+from uart_ingest import encode_frame, encode_csv
+
+
+def sine_source(amplitude=8.0, period=4.0, rate=1000):
+    # Input tổng hợp: 2 bánh dao động lệch pha
+    def source(i):
+        t = i / rate
+        return (amplitude * np.sin(2 * np.pi * t / period),
+                amplitude * np.cos(2 * np.pi * t / period))
+    return source
+
+
+def sequence_source(i):
+    # wl = số thứ tự mẫu (float32 biểu diễn chính xác tới 2^24) -> dùng đo độ trễ
+    return float(i), -float(i)
+
+
+def load_script(path):
+    # File kịch bản: mỗi dòng "wl,wr"
+    script = []
+    with open(path) as f:
+        for line in f:
+            parts = line.strip().split(",")
+            if len(parts) >= 2:
+                script.append((float(parts[0]), float(parts[1])))
+    return script
+
+
+class VirtualRobotDevice:
+    """Thiết bị serial ảo (pseudo-terminal) giả lập robot gửi wL, wR.
+
+    Mở `device.port` bằng serial.Serial như một cổng thật. Luồng ghi phát
+    mẫu đều đặn `rate` mẫu/s, giới hạn băng thông theo `baud` (10 bit/byte)
+    và có thể chèn nhiễu:
+      - partial: xác suất cắt một gói làm 2 lần ghi cách nhau
+      - garbage: xác suất chèn byte rác trước gói
+      - burst:   xác suất gom nhiều gói gửi cùng lúc
+    Chỉ chạy trên Linux/macOS (cần pty).
+    """
+
+    def __init__(self, source=None, rate=1000, baud=921600, fmt="binary", count=None,
+                 partial=0.0, garbage=0.0, burst=0.0, burst_size=20, seed=0):
+        if source is None:
+            source = sine_source(rate=rate)
+        elif not callable(source):
+            # Kịch bản dạng danh sách [(wl, wr), ...] -> phát lặp lại
+            script = list(source)
+            source = lambda i: script[i % len(script)]
+        self.source = source
+        self.rate = rate
+        self.baud = baud
+        self.encode = encode_frame if fmt == "binary" else encode_csv
+        self.count = count  # None = phát mãi tới khi stop()
+
+        self.partial = partial
+        self.garbage = garbage
+        self.burst = burst
+        self.burst_size = burst_size
+        self._rng = random.Random(seed)
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+        self.sent = 0
+        self.bytes_written = 0
+        self.garbage_bytes = 0
+        # Thời điểm ghi (perf_counter) của từng mẫu, dùng đo độ trễ
+        self.sent_at = []
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def done(self):
+        return self.count is not None and self.sent >= self.count
+
+    def _write(self, data):
+        # Giới hạn băng thông theo baud (8N1 = 10 bit mỗi byte)
+        view = memoryview(data)
+        while view:
+            n = os.write(self.master, view)
+            view = view[n:]
+        self.bytes_written += len(data)
+        time.sleep(len(data) * 10 / self.baud)
+
+    def _run(self):
+        rng = self._rng
+        period = 1.0 / self.rate
+        next_t = time.perf_counter()
+        while not self._stop.is_set() and not self.done:
+            now = time.perf_counter()
+            if now < next_t:
+                time.sleep(next_t - now)
+
+            n = self.burst_size if rng.random() < self.burst else 1
+            if self.count is not None:
+                n = min(n, self.count - self.sent)
+
+            chunk = bytearray()
+            for _ in range(n):
+                if rng.random() < self.garbage:
+                    junk = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+                    chunk += junk
+                    self.garbage_bytes += len(junk)
+                chunk += self.encode(*self.source(len(self.sent_at)))
+                self.sent_at.append(0.0)
+
+            t_write = time.perf_counter()
+            if rng.random() < self.partial and len(chunk) > 1:
+                cut = rng.randint(1, len(chunk) - 1)
+                self._write(chunk[:cut])
+                time.sleep(period / 2)
+                t_write = time.perf_counter()
+                self._write(chunk[cut:])
+            else:
+                self._write(chunk)
+
+            for i in range(self.sent, self.sent + n):
+                self.sent_at[i] = t_write
+            self.sent += n
+            next_t += n * period
@@ -0,0 +1,266 @@
+import math
+
+import numpy as np
+
+try:
+    from scipy.ndimage import distance_transform_edt
+except ImportError:  # scipy không bắt buộc: dùng bản NumPy (cùng kết quả)
+    distance_transform_edt = None
+
+
+def _edt_1d_columns(occupied):
+    # Khoảng cách (số ô) tới ô bị chiếm gần nhất trong CÙNG cột, inf nếu cột trống
+    h, w = occupied.shape
+    rows = np.arange(h)[:, None].repeat(w, axis=1).astype(float)
+    above = np.where(occupied, rows, -np.inf)
+    above = np.maximum.accumulate(above, axis=0)
+    below = np.where(occupied, rows, np.inf)
+    below = np.minimum.accumulate(below[::-1], axis=0)[::-1]
+    return np.minimum(rows - above, below - rows)
+
+
+def _lower_envelope_rows(f):
+    """min_k f[:, k] + (j - k)^2 cho mọi j, từng hàng (Felzenszwalb-Huttenlocher).
+
+    Bao dưới của các parabol dựng trong O(w) mỗi hàng; mọi hàng chạy song song
+    (vector hoá theo hàng), vòng Python chỉ đi theo cột.
+    """
+    h, w = f.shape
+    rows = np.arange(h)
+    v = np.zeros((h, w), dtype=int)     # Đỉnh các parabol trên bao dưới
+    z = np.empty((h, w + 1))            # Biên giữa parabol k-1 và k
+    z[:, 0], z[:, 1] = -np.inf, np.inf
+    k = np.zeros(h, dtype=int)
+    for q in range(1, w):
+        fq = f[:, q] + q * q
+        while True:
+            vk = v[rows, k]
+            s = (fq - (f[rows, vk] + vk * vk)) / (2 * (q - vk))
+            # Parabol q che hết parabol đỉnh stack -> bỏ (z[:, 0] = -inf nên không bỏ quá đáy)
+            drop = s <= z[rows, k]
+            if not drop.any():
+                break
+            k[drop] -= 1
+        k += 1
+        v[rows, k] = q
+        z[rows, k] = s
+        z[rows, k + 1] = np.inf
+
+    out = np.empty((h, w))
+    k[:] = 0
+    for j in range(w):
+        while True:
+            step = z[rows, k + 1] < j
+            if not step.any():
+                break
+            k[step] += 1
+        vk = v[rows, k]
+        out[:, j] = (j - vk) ** 2 + f[rows, vk]
+    return out
+
+
+def distance_transform(occupied):
+    """Khoảng cách Euclid (số ô) từ tâm mỗi ô tới tâm ô bị chiếm gần nhất.
+
+    Có scipy thì dùng distance_transform_edt; không thì tách 2 lượt tuyến tính:
+    khoảng cách trong cột (tích luỹ), rồi bao dưới parabol theo hàng
+    d(i, j)^2 = min_k g(i, k)^2 + (j - k)^2. Vòng Python đi theo cạnh ngắn của bản đồ.
+    """
+    occupied = np.asarray(occupied, dtype=bool)
+    if not occupied.any():
+        return np.full(occupied.shape, np.inf)
+    if distance_transform_edt is not None:
+        return distance_transform_edt(~occupied)
+
+    if occupied.shape[1] > occupied.shape[0]:
+        return distance_transform(occupied.T).T
+    h, w = occupied.shape
+    g2 = _edt_1d_columns(occupied) ** 2
+    # Cột trống (inf) thay bằng số lớn hơn mọi khoảng cách có thể: giữ phép tính parabol hữu hạn
+    g2[np.isinf(g2)] = h * h + w * w + 1
+    return np.sqrt(_lower_envelope_rows(g2))
+
+
+class OccupancyGrid:
+    """Bản đồ ô lưới: occupied[i, j] = True là vật cản.
+
+    Hàng i tăng theo y, cột j tăng theo x; `origin` là toạ độ (m) góc dưới-trái
+    của ô [0, 0], mỗi ô vuông cạnh `resolution` m. Ngoài bản đồ coi như vật cản.
+    Bảng khoảng cách (distance transform) tính một lần khi tạo.
+    """
+
+    def __init__(self, occupied, resolution=0.05, origin=(0.0, 0.0)):
+        self.occupied = np.asarray(occupied, dtype=bool)
+        self.resolution = float(resolution)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.height, self.width = self.occupied.shape
+        # Khoảng cách (m) từ tâm ô tới tâm ô vật cản gần nhất; ngoài bản đồ là vật cản
+        # nên thêm viền 1 ô bị chiếm trước khi tính rồi cắt bỏ (bản đồ không có tường bao)
+        padded = np.pad(self.occupied, 1, constant_values=True)
+        self.distance = distance_transform(padded)[1:-1, 1:-1] * self.resolution
+
+    @classmethod
+    def load(cls, path, resolution=0.05, origin=None, threshold=0.5):
+        """Đọc bản đồ: .npy (mảng bool/0-1), .txt ('#' = vật cản), hoặc ảnh (pixel tối = vật cản).
+
+        origin=None -> đặt bản đồ sao cho điểm (0, 0) nằm giữa.
+        """
+        if path.endswith(".npy"):
+            occupied = np.load(path).astype(bool)
+        elif path.endswith(".txt"):
+            with open(path) as f:
+                rows = [line.rstrip("\n") for line in f if line.strip()]
+            width = max(len(r) for r in rows)
+            occupied = np.array([[c == "#" for c in r.ljust(width)] for r in rows])[::-1]
+        else:
+            import matplotlib.image as mpimg
+            img = mpimg.imread(path).astype(float)
+            if img.max() > 1.0:
+                img /= 255.0
+            if img.ndim == 3:
+                img = img[..., :3].mean(axis=2)
+            # Hàng đầu của ảnh là phía trên (y lớn)
+            occupied = (img < threshold)[::-1]
+        if origin is None:
+            origin = (-occupied.shape[1] * resolution / 2, -occupied.shape[0] * resolution / 2)
+        return cls(occupied, resolution, origin)
+
+    @classmethod
+    def demo(cls, size=8.0, resolution=0.05):
+        # Phòng vuông có tường bao, vài khối vật cản; robot xuất phát ở giữa
+        n = int(round(size / resolution))
+        occ = np.zeros((n, n), dtype=bool)
+        occ[:2, :] = occ[-2:, :] = occ[:, :2] = occ[:, -2:] = True
+        cell = lambda m: int(round(m / resolution))
+        for cx, cy, hw, hh in [(1.5, 0.0, 0.3, 1.0), (-1.5, 1.5, 0.8, 0.3), (-1.0, -2.0, 0.4, 0.4),
+                               (2.5, 2.5, 0.5, 0.5), (0.0, 3.0, 2.0, 0.1)]:
+            i0, i1 = cell(cy - hh + size / 2), cell(cy + hh + size / 2)
+            j0, j1 = cell(cx - hw + size / 2), cell(cx + hw + size / 2)
+            occ[i0:i1, j0:j1] = True
+        return cls(occ, resolution, (-size / 2, -size / 2))
+
+    @property
+    def extent(self):
+        # (xmin, xmax, ymin, ymax) theo mét
+        x0, y0 = self.origin
+        return x0, x0 + self.width * self.resolution, y0, y0 + self.height * self.resolution
+
+    def cell_of(self, x, y):
+        j = np.floor((np.asarray(x) - self.origin[0]) / self.resolution).astype(int)
+        i = np.floor((np.asarray(y) - self.origin[1]) / self.resolution).astype(int)
+        return i, j
+
+    def clearance(self, x, y):
+        """Khoảng cách (m) tới vật cản gần nhất; 0 nếu ở trong vật cản hoặc ngoài bản đồ.
+
+        Bảng khoảng cách đo giữa các TÂM ô: trừ độ lệch của (x, y) so với tâm ô của nó
+        và nửa đường chéo ô (mép ô vật cản) -> luôn <= khoảng cách thật tới mép vật cản.
+        """
+        fj = (np.asarray(x, dtype=float) - self.origin[0]) / self.resolution
+        fi = (np.asarray(y, dtype=float) - self.origin[1]) / self.resolution
+        j, i = np.floor(fj).astype(int), np.floor(fi).astype(int)
+        inside = (i >= 0) & (i < self.height) & (j >= 0) & (j < self.width)
+        d = np.zeros(np.shape(i))
+        d[inside] = self.distance[i[inside], j[inside]]
+        off = np.hypot(fj - j - 0.5, fi - i - 0.5) * self.resolution
+        d = np.where(d > 0, np.maximum(d - off - self.resolution * math.sqrt(0.5), 0.0), 0.0)
+        return d if d.ndim else float(d)
+
+    def clearance_at(self, x, y):
+        # Bản vô hướng của clearance() cho vòng vật lý (không tạo mảng NumPy)
+        fj = (x - self.origin[0]) / self.resolution
+        fi = (y - self.origin[1]) / self.resolution
+        j, i = math.floor(fj), math.floor(fi)
+        if not (0 <= i < self.height and 0 <= j < self.width):
+            return 0.0
+        d = self.distance[i, j]
+        if d == 0:
+            return 0.0
+        off = math.hypot(fj - j - 0.5, fi - i - 0.5) * self.resolution
+        return max(d - off - self.resolution * math.sqrt(0.5), 0.0)
+
+    def collides(self, x, y, radius):
+        # Va chạm nếu hình tròn bán kính radius quanh (x, y) chạm vật cản
+        return self.clearance(x, y) < radius
+
+    def raycast(self, x, y, angles, max_range):
+        """Khoảng cách tới vật cản theo mọi tia cùng lúc (sphere tracing + duyệt ô).
+
+        Mỗi vòng mọi tia còn "sống" tiến max(clearance, quãng tới biên ô kế tiếp):
+        xa vật cản thì nhảy cả đoạn clearance (cận dưới, không xuyên qua vật cản),
+        gần vật cản thì đi đúng từng ô như Amanatides-Woo -> điểm chạm là biên ô chính xác.
+        Trả về mảng cùng cỡ `angles`; tia không chạm gì = max_range.
+        """
+        angles = np.asarray(angles, dtype=float)
+        dx, dy = np.cos(angles), np.sin(angles)
+        res = self.resolution
+        half_diag = res * math.sqrt(0.5)
+        # Biên ô kế tiếp theo mỗi trục: cột j + bx / hàng i + by; đổi 1 ô -> inv_x / inv_y m dọc tia
+        bx, by = (dx >= 0).astype(float), (dy >= 0).astype(float)
+        with np.errstate(divide="ignore"):
+            inv_x, inv_y = res / np.abs(dx), res / np.abs(dy)
+        t = np.zeros(len(angles))
+        hit = np.zeros(len(angles), dtype=bool)
+        alive = np.arange(len(angles))
+        # Mỗi vòng qua ít nhất 1 biên ô -> số vòng bị chặn theo số ô tia đi qua
+        for _ in range(int(2 * max_range / res) + 4):
+            if not len(alive):
+                break
+            ta = t[alive]
+            fj = (x + ta * dx[alive] - self.origin[0]) / res
+            fi = (y + ta * dy[alive] - self.origin[1]) / res
+            j, i = np.floor(fj).astype(int), np.floor(fi).astype(int)
+            inside = (i >= 0) & (i < self.height) & (j >= 0) & (j < self.width)
+            dist = np.zeros(len(alive))
+            dist[inside] = self.distance[i[inside], j[inside]]
+            blocked = dist == 0   # Ô vật cản hoặc ra ngoài bản đồ
+            hit[alive[blocked]] = True
+            clear = dist - np.hypot(fj - j - 0.5, fi - i - 0.5) * res - half_diag
+            # Quãng (m) tới biên ô kế tiếp theo x / y (tia song song trục: inf);
+            # thêm 1e-6 ô để chắc chắn sang ô mới
+            to_x = np.abs(j + bx[alive] - fj) * inv_x[alive]
+            to_y = np.abs(i + by[alive] - fi) * inv_y[alive]
+            step = np.maximum(clear, np.minimum(to_x, to_y) + res * 1e-6)
+            ta = np.where(blocked, ta, ta + step)
+            t[alive] = ta
+            alive = alive[~blocked & (ta < max_range)]
+        return np.where(hit, np.minimum(t, max_range), max_range)
+
+
+class RangeSensor:
+    """Vòng cảm biến khoảng cách (lidar / siêu âm) gắn trên robot.
+
+    n_beams tia chia đều trong fov (rad) quanh hướng đầu xe; quét với tần số `rate` Hz
+    theo thời gian mô phỏng (should_scan).
+    """
+
+    def __init__(self, n_beams=360, fov=2 * math.pi, max_range=4.0, rate=20.0, noise=0.0, seed=0):
+        self.n_beams = n_beams
+        self.fov = fov
+        self.max_range = max_range
+        self.rate = rate
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+        full = math.isclose(fov, 2 * math.pi)
+        # Vòng kín: không lặp tia đầu/cuối
+        self.angles = np.linspace(-fov / 2, fov / 2, n_beams, endpoint=not full)
+        self._last_t = None
+        self.ranges = np.full(n_beams, max_range)
+        self.scans = 0
+
+    def should_scan(self, t):
+        return self._last_t is None or t - self._last_t >= 1.0 / self.rate or t < self._last_t
+
+    def scan(self, world, x, y, theta, t=None):
+        ranges = world.raycast(x, y, theta + self.angles, self.max_range)
+        if self.noise:
+            ranges = np.clip(ranges + self._rng.normal(0, self.noise, len(ranges)), 0, self.max_range)
+        self.ranges = ranges
+        self._last_t = t
+        self.scans += 1
+        return ranges
+
+    def points(self, x, y, theta):
+        # Điểm cuối các tia của lần quét gần nhất (toạ độ toàn cục)
+        a = theta + self.angles
+        return x + self.ranges * np.cos(a), y + self.ranges * np.sin(a)